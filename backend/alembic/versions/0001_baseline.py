@@ -0,0 +1,196 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "organizations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("type", sa.Enum("BUYER", "SUPPLIER", name="organizationtype"), nullable=False),
+        sa.Column("industry", sa.String(100), nullable=True),
+        sa.Column("description", sa.String(1000), nullable=True),
+        sa.Column("website", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_organizations_id", "organizations", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("role", sa.Enum("ADMIN", "BUYER", "SUPPLIER", name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("organization_id", sa.Integer(), sa.ForeignKey("organizations.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "proposals",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "DRAFT", "SUBMITTED", "ANALYZING", "QA_PENDING", "QA_COMPLETED",
+                "EVALUATED", "ACCEPTED", "REJECTED",
+                name="proposalstatus",
+            ),
+            nullable=True,
+        ),
+        sa.Column("supplier_org_id", sa.Integer(), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("supplier_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("buyer_config_id", sa.Integer(), nullable=True),
+        sa.Column("extracted_info", sa.JSON(), nullable=True),
+        sa.Column("points_used", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_proposals_id", "proposals", ["id"])
+
+    op.create_table(
+        "evaluations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id"), nullable=False, unique=True),
+        sa.Column("total_score", sa.Float(), nullable=True),
+        sa.Column("category_scores", sa.JSON(), nullable=True),
+        sa.Column("trust_score", sa.Float(), nullable=True),
+        sa.Column("trust_rank", sa.Enum("A", "B", "C", "D", name="trustrank"), nullable=True),
+        sa.Column("fact_check_results", sa.JSON(), nullable=True),
+        sa.Column(
+            "rank",
+            sa.Enum("CANDIDATE", "CONSIDER", "HOLD", "REJECTED", name="evaluationrank"),
+            nullable=True,
+        ),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("key_points", sa.JSON(), nullable=True),
+        sa.Column("confirmation_items", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_evaluations_id", "evaluations", ["id"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("is_internal", sa.Boolean(), nullable=True),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("comments.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+
+    # create_all と同じく proposals の proposalstatus 型を共有する
+    op.create_table(
+        "proposal_progress",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id"), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="proposalstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("changed_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("note", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_proposal_progress_id", "proposal_progress", ["id"])
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("link", sa.String(500), nullable=True),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("notification_type", sa.String(50), nullable=True),
+        sa.Column("reference_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+    op.create_index(
+        "ix_notifications_user_unread", "notifications", ["user_id"],
+        postgresql_where=sa.text("is_read = false"),
+    )
+
+    op.create_table(
+        "point_balances",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+        sa.Column("balance", sa.Integer(), nullable=False),
+        sa.Column("total_purchased", sa.Integer(), nullable=True),
+        sa.Column("total_used", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_point_balances_id", "point_balances", ["id"])
+
+    op.create_table(
+        "point_transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("point_balance_id", sa.Integer(), sa.ForeignKey("point_balances.id"), nullable=False),
+        sa.Column(
+            "transaction_type",
+            sa.Enum(
+                "PURCHASE", "PROPOSAL_SUBMIT", "REFUND", "BONUS", "EXPIRED",
+                name="transactiontype",
+            ),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("balance_after", sa.Integer(), nullable=False),
+        sa.Column("description", sa.String(255), nullable=True),
+        sa.Column("reference_id", sa.Integer(), nullable=True),
+        sa.Column("payment_id", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_point_transactions_id", "point_transactions", ["id"])
+
+    op.create_table(
+        "point_packages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("bonus_points", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Integer(), nullable=True),
+        sa.Column("sort_order", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_point_packages_id", "point_packages", ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "point_packages", "point_transactions", "point_balances", "notifications",
+        "proposal_progress", "comments", "evaluations", "proposals", "users", "organizations",
+    ):
+        op.drop_table(table)
+    for enum_name in (
+        "transactiontype", "evaluationrank", "trustrank", "proposalstatus",
+        "userrole", "organizationtype",
+    ):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
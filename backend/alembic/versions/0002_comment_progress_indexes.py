@@ -0,0 +1,22 @@
+"""index comments and proposal_progress by proposal
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_comments_proposal_id", "comments", ["proposal_id"])
+    op.create_index("ix_proposal_progress_proposal_id", "proposal_progress", ["proposal_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_proposal_progress_proposal_id", table_name="proposal_progress")
+    op.drop_index("ix_comments_proposal_id", table_name="comments")
@@ -0,0 +1,30 @@
+"""add n-gram search columns to proposals
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+既存行のトークンは python -m scripts.reindex_proposal_search で埋める。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("proposals", sa.Column("search_text", sa.Text(), nullable=True))
+    op.add_column("proposals", sa.Column("search_tokens", postgresql.ARRAY(sa.Text()), nullable=True))
+    op.create_index(
+        "ix_proposals_search_tokens", "proposals", ["search_tokens"], postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_proposals_search_tokens", table_name="proposals")
+    op.drop_column("proposals", "search_tokens")
+    op.drop_column("proposals", "search_text")
@@ -0,0 +1,43 @@
+"""add proposal embeddings with pgvector HNSW index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+既存の提案は python -m scripts.build_proposal_embeddings で埋める。
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 1536
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.create_table(
+        "proposal_embeddings",
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("embedding", Vector(EMBEDDING_DIM), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_proposal_embeddings_hash", "proposal_embeddings", ["model", "content_hash"])
+    op.create_index(
+        "ix_proposal_embeddings_hnsw", "proposal_embeddings", ["embedding"],
+        postgresql_using="hnsw",
+        postgresql_with={"m": 16, "ef_construction": 64},
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_proposal_embeddings_hnsw", table_name="proposal_embeddings")
+    op.drop_index("ix_proposal_embeddings_hash", table_name="proposal_embeddings")
+    op.drop_table("proposal_embeddings")
@@ -0,0 +1,63 @@
+"""add buyer configs and precomputed match candidates
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+既存提案の特徴量と候補は python -m scripts.rebuild_match_candidates で作る。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "buyer_configs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("organization_id", sa.Integer(), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("industries", postgresql.ARRAY(sa.String(100)), nullable=False),
+        sa.Column("categories", postgresql.ARRAY(sa.String(100)), nullable=False),
+        sa.Column("keywords", postgresql.ARRAY(sa.String(100)), nullable=False),
+        sa.Column("mandatory_conditions", sa.JSON(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("features", postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.Column("feature_weight", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_buyer_configs_id", "buyer_configs", ["id"])
+    op.create_index("ix_buyer_configs_organization_id", "buyer_configs", ["organization_id"])
+    op.create_index("ix_buyer_configs_features", "buyer_configs", ["features"], postgresql_using="gin")
+
+    op.add_column("proposals", sa.Column("match_features", postgresql.ARRAY(sa.Text()), nullable=True))
+    op.create_index("ix_proposals_match_features", "proposals", ["match_features"], postgresql_using="gin")
+
+    op.create_table(
+        "match_candidates",
+        sa.Column("buyer_config_id", sa.Integer(), sa.ForeignKey("buyer_configs.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_match_candidates_buyer_score", "match_candidates",
+        ["buyer_config_id", sa.text("score DESC")],
+    )
+    op.create_index(
+        "ix_match_candidates_proposal_score", "match_candidates",
+        ["proposal_id", sa.text("score DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("match_candidates")
+    op.drop_index("ix_proposals_match_features", table_name="proposals")
+    op.drop_column("proposals", "match_features")
+    op.drop_table("buyer_configs")
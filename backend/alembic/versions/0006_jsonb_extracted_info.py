@@ -0,0 +1,71 @@
+"""migrate extracted info and evaluation details to JSONB
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+extracted_info には GIN インデックスと、必須条件でよく使う型付き属性の
+生成カラム（B-tree 部分インデックス付き）を追加する。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+JSONB_COLUMNS = (
+    ("proposals", "extracted_info"),
+    ("evaluations", "category_scores"),
+    ("evaluations", "fact_check_results"),
+)
+
+TYPED_ATTRIBUTES = (
+    ("info_min_lot", "min_lot", "number", "numeric", sa.Numeric()),
+    ("info_lead_time_weeks", "lead_time_weeks", "number", "numeric", sa.Numeric()),
+    ("info_iso_certified", "iso_certified", "boolean", "boolean", sa.Boolean()),
+)
+
+
+def upgrade() -> None:
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(), existing_type=sa.JSON(),
+            postgresql_using=f"{column}::jsonb",
+        )
+    op.create_index("ix_proposals_extracted_info", "proposals", ["extracted_info"], postgresql_using="gin")
+
+    for name, key, json_type, sql_type, type_ in TYPED_ATTRIBUTES:
+        op.add_column("proposals", sa.Column(name, type_, sa.Computed(
+            f"CASE WHEN jsonb_typeof(extracted_info->'{key}') = '{json_type}' "
+            f"THEN (extracted_info->>'{key}')::{sql_type} END", persisted=True,
+        )))
+    op.create_index(
+        "ix_proposals_info_min_lot", "proposals", ["info_min_lot"],
+        postgresql_where=sa.text("info_min_lot IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_proposals_info_lead_time_weeks", "proposals", ["info_lead_time_weeks"],
+        postgresql_where=sa.text("info_lead_time_weeks IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_proposals_info_iso_certified", "proposals", ["info_iso_certified"],
+        postgresql_where=sa.text("info_iso_certified"),
+    )
+
+
+def downgrade() -> None:
+    for index in ("ix_proposals_info_iso_certified", "ix_proposals_info_lead_time_weeks",
+                  "ix_proposals_info_min_lot", "ix_proposals_extracted_info"):
+        op.drop_index(index, table_name="proposals")
+    for name, *_ in TYPED_ATTRIBUTES:
+        op.drop_column("proposals", name)
+    for table, column in JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.JSON(), existing_type=postgresql.JSONB(),
+            postgresql_using=f"{column}::json",
+        )
@@ -0,0 +1,42 @@
+"""add document chunk store for retrieval-based context selection
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 1536
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_chunks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("source", sa.String(255), nullable=False),
+        sa.Column("page", sa.Integer(), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("token_count", sa.Integer(), nullable=False),
+        sa.Column("embedding", Vector(EMBEDDING_DIM), nullable=True),
+        sa.Column("embedding_model", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_document_chunks_proposal", "document_chunks",
+        ["proposal_id", "source", "page", "chunk_index"],
+    )
+    op.create_index("ix_document_chunks_hash", "document_chunks", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_table("document_chunks")
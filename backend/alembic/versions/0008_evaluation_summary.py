@@ -0,0 +1,25 @@
+"""add summary report columns to evaluations
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("evaluations", sa.Column("strengths", sa.JSON(), nullable=True))
+    op.add_column("evaluations", sa.Column("concerns", sa.JSON(), nullable=True))
+    op.add_column("evaluations", sa.Column("summary_hash", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("evaluations", "summary_hash")
+    op.drop_column("evaluations", "concerns")
+    op.drop_column("evaluations", "strengths")
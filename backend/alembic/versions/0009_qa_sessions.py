@@ -0,0 +1,44 @@
+"""add Q&A rounds with answer deadlines
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+qa_session_status = sa.Enum("OPEN", "ANSWERED", "EXPIRED", name="qasessionstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "qa_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("proposal_id", sa.Integer(), sa.ForeignKey("proposals.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("round_number", sa.Integer(), nullable=False),
+        sa.Column("status", qa_session_status, nullable=False),
+        sa.Column("questions", sa.JSON(), nullable=False),
+        sa.Column("answers", sa.JSON(), nullable=True),
+        sa.Column("due_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_reminder_hours", sa.Integer(), nullable=True),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("judgement", sa.String(50), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_qa_sessions_id", "qa_sessions", ["id"])
+    op.create_index("ix_qa_sessions_proposal_id", "qa_sessions", ["proposal_id"])
+    op.create_index(
+        "ix_qa_sessions_open_due", "qa_sessions", ["due_at"],
+        postgresql_where=sa.text("status = 'OPEN'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("qa_sessions")
+    qa_session_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,49 @@
+"""add point lots for FIFO consumption and expiry
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:00
+
+既存の残高は移行時点の残高をそのまま1ロット（付与取引なし）とし、
+移行日から OPENING_LOT_DAYS 日後を有効期限にする。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+OPENING_LOT_DAYS = 365
+
+
+def upgrade() -> None:
+    op.create_table(
+        "point_lots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("point_balance_id", sa.Integer(), sa.ForeignKey("point_balances.id"), nullable=False),
+        sa.Column("transaction_id", sa.Integer(), sa.ForeignKey("point_transactions.id"), nullable=True),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("remaining", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_point_lots_id", "point_lots", ["id"])
+    op.execute(
+        "INSERT INTO point_lots (point_balance_id, amount, remaining, expires_at, created_at) "
+        f"SELECT id, balance, balance, now() + interval '{OPENING_LOT_DAYS} days', now() "
+        "FROM point_balances WHERE balance > 0"
+    )
+    op.create_index(
+        "ix_point_lots_open", "point_lots", ["point_balance_id", "id"],
+        postgresql_where=sa.text("remaining > 0"),
+    )
+    op.create_index(
+        "ix_point_lots_open_expiry", "point_lots", ["expires_at"],
+        postgresql_where=sa.text("remaining > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("point_lots")
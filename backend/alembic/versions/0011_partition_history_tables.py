@@ -0,0 +1,143 @@
+"""partition history tables by month
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:00:00
+
+comments / proposal_progress / notifications / point_transactions を created_at の
+月単位のレンジパーティションに作り直す。既存の行は最古の月から当月の PREMAKE_MONTHS
+か月先までのパーティションに移す（以降の作成は services/partitions.py が行う）。
+主キーは (id, created_at) になり、これらのテーブルの id を参照する外部キー
+（comments.parent_id・point_lots.transaction_id）は削除する。
+
+行をすべて書き写すため、大きなテーブルではメンテナンス時間中に実行する。
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+PREMAKE_MONTHS = 3
+
+# テーブル → (外部キー, インデックス)
+TABLES = {
+    "comments": (
+        [("proposal_id", "proposals"), ("user_id", "users")],
+        [("ix_comments_id", ["id"], None), ("ix_comments_proposal_created", ["proposal_id", "created_at"], None)],
+    ),
+    "proposal_progress": (
+        [("proposal_id", "proposals"), ("changed_by", "users")],
+        [
+            ("ix_proposal_progress_id", ["id"], None),
+            ("ix_proposal_progress_proposal_created", ["proposal_id", "created_at"], None),
+        ],
+    ),
+    "notifications": (
+        [("user_id", "users")],
+        [
+            ("ix_notifications_id", ["id"], None),
+            ("ix_notifications_user_unread", ["user_id"], "is_read = false"),
+            ("ix_notifications_user_created", ["user_id", "created_at"], None),
+        ],
+    ),
+    "point_transactions": (
+        [("point_balance_id", "point_balances")],
+        [
+            ("ix_point_transactions_id", ["id"], None),
+            ("ix_point_transactions_balance_created", ["point_balance_id", "created_at"], None),
+        ],
+    ),
+}
+
+# 分割前のインデックス（downgrade 用）
+UNPARTITIONED_INDEXES = {
+    "comments": [("ix_comments_id", ["id"], None), ("ix_comments_proposal_id", ["proposal_id"], None)],
+    "proposal_progress": [
+        ("ix_proposal_progress_id", ["id"], None),
+        ("ix_proposal_progress_proposal_id", ["proposal_id"], None),
+    ],
+    "notifications": [
+        ("ix_notifications_id", ["id"], None),
+        ("ix_notifications_user_unread", ["user_id"], "is_read = false"),
+    ],
+    "point_transactions": [("ix_point_transactions_id", ["id"], None)],
+}
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _create_indexes(table: str, indexes) -> None:
+    for name, columns, where in indexes:
+        op.create_index(name, table, columns, postgresql_where=sa.text(where) if where else None)
+
+
+def _create_foreign_keys(table: str, foreign_keys) -> None:
+    for column, referent in foreign_keys:
+        op.create_foreign_key(f"{table}_{column}_fkey", table, referent, [column], ["id"])
+
+
+def _partition(table: str) -> None:
+    bind = op.get_bind()
+    old = f"{table}_unpartitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"UPDATE {old} SET created_at = now() WHERE created_at IS NULL")
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL")
+
+    current = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    oldest = bind.scalar(sa.text(f"SELECT date_trunc('month', min(created_at) AT TIME ZONE 'UTC') FROM {old}"))
+    month = min(oldest.replace(tzinfo=timezone.utc), current) if oldest else current
+    while month <= _add_months(current, PREMAKE_MONTHS):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {old}")
+
+    foreign_keys, indexes = TABLES[table]
+    op.create_primary_key(f"{table}_pkey", table, ["id", "created_at"])
+    _create_indexes(table, indexes)
+    _create_foreign_keys(table, foreign_keys)
+
+
+def _unpartition(table: str) -> None:
+    old = f"{table}_partitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {old}")
+
+    foreign_keys, _ = TABLES[table]
+    op.create_primary_key(f"{table}_pkey", table, ["id"])
+    _create_indexes(table, UNPARTITIONED_INDEXES[table])
+    _create_foreign_keys(table, foreign_keys)
+
+
+def upgrade() -> None:
+    op.drop_constraint("point_lots_transaction_id_fkey", "point_lots", type_="foreignkey")
+    for table in TABLES:
+        _partition(table)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        _unpartition(table)
+    op.create_foreign_key("comments_parent_id_fkey", "comments", "comments", ["parent_id"], ["id"])
+    op.create_foreign_key(
+        "point_lots_transaction_id_fkey", "point_lots", "point_transactions", ["transaction_id"], ["id"]
+    )
@@ -0,0 +1,40 @@
+"""proposal status state machine and version column
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:00
+
+ProposalStatus を1つに統合し、バイヤー側のステータス（検討中・面談調整中・保留）を
+proposalstatus 型に追加する。proposals.version は比較交換（compare-and-swap）での
+ステータス更新に使う。パイプラインによる遷移は変更者がいないため
+proposal_progress.changed_by を NULL 可にする。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+NEW_STATUSES = ("UNDER_REVIEW", "MEETING_SCHEDULED", "ON_HOLD")
+
+
+def upgrade() -> None:
+    # ADD VALUE で追加した値は同じトランザクション内で使えないため先にコミットする
+    with op.get_context().autocommit_block():
+        for name in NEW_STATUSES:
+            op.execute(f"ALTER TYPE proposalstatus ADD VALUE IF NOT EXISTS '{name}'")
+
+    op.add_column("proposals", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+    op.alter_column("proposal_progress", "changed_by", existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE proposal_progress pp SET changed_by = p.supplier_user_id "
+        "FROM proposals p WHERE p.id = pp.proposal_id AND pp.changed_by IS NULL"
+    )
+    op.alter_column("proposal_progress", "changed_by", existing_type=sa.Integer(), nullable=False)
+    op.drop_column("proposals", "version")
+    # 列挙型から値は削除できないため、追加したステータスは残す
@@ -0,0 +1,59 @@
+"""
+API共通の依存関係
+"""
+import time
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from app.config import settings
+from app.models.user import User
+from app.services import user_cache
+from app.services.user_cache import TTLCache
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# 検証済みトークン → ユーザーID（トークンの有効期限を超えて保持しない）
+_token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_REDIS_CACHE_TTL_SECONDS)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="認証情報が無効です",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_token(token: str) -> int:
+    """JWTを検証してユーザーIDを返す"""
+    user_id = _token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+
+    ttl = settings.AUTH_REDIS_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(token, user_id, ttl)
+    return user_id
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """現在のユーザーを取得（キャッシュ済みならDBアクセスなし）"""
+    user = await user_cache.get_user(decode_token(token))
+    if user is None:
+        raise _credentials_exception()
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user"
+        )
+    return user
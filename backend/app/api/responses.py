@@ -0,0 +1,70 @@
+"""
+高速JSONレスポンス
+orjson でエンコードし、response_model による再検証・再エンコードを省略する
+
+ハンドラーが Response を返すと FastAPI は response_model の検証を行わないため、
+response_model は OpenAPI のスキーマ定義としてだけ残る。ハンドラー側で
+レスポンスモデルを生成した時点で検証済みになっている経路でのみ使うこと。
+
+    @router.get("/items", response_model=List[ItemResponse])
+    async def list_items(...):
+        return json_array_response([ItemResponse(...) for row in rows])
+"""
+from decimal import Decimal
+from typing import Any, Iterator, Sequence
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from app.config import settings
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # datetime・Enum などは orjson がそのまま扱えるので python モードで展開する
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson でエンコード（pydantic モデルを含んでよい）"""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """orjson でエンコードするJSONレスポンス"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def iter_json_array(items: Sequence[Any], chunk_items: int) -> Iterator[bytes]:
+    """JSON配列を chunk_items 件ずつエンコードして返す"""
+    yield b"["
+    for start in range(0, len(items), chunk_items):
+        # 要素を1つずつではなくまとめてエンコードし、外側の括弧だけ外して連結する
+        chunk = dumps(items[start:start + chunk_items])[1:-1]
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]"
+
+
+def json_array_response(items: Sequence[Any], status_code: int = 200) -> Response:
+    """配列レスポンス
+
+    件数が FAST_JSON_STREAM_THRESHOLD 以上なら分割してストリーミングし、
+    全体を1つのバイト列に展開しないようにする。
+    """
+    if len(items) < settings.FAST_JSON_STREAM_THRESHOLD:
+        return FastJSONResponse(items, status_code=status_code)
+    return StreamingResponse(
+        iter_json_array(items, settings.FAST_JSON_STREAM_CHUNK_ITEMS),
+        status_code=status_code,
+        media_type="application/json",
+    )
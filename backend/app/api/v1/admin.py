@@ -0,0 +1,49 @@
+"""
+管理者向けAPI
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import HTMLResponse, Response
+
+from app.api.deps import get_current_user
+from app.models.user import User, UserRole
+from app.monitoring.profiling import profile_key
+from app.services import storage
+
+router = APIRouter()
+
+
+def require_admin(user: User):
+    """管理者ロールを要求"""
+    if user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+
+@router.get("/profiles/{profile_id}", response_class=HTMLResponse)
+async def download_profile(
+    profile_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """プロファイル結果（フレームグラフHTML）のダウンロード"""
+    require_admin(current_user)
+    
+    data = await storage.get_bytes(profile_key(profile_id, "html"))
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return HTMLResponse(data)
+
+
+@router.get("/profiles/{profile_id}/sql")
+async def download_profile_sql(
+    profile_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """プロファイル対象リクエストのSQL文一覧・メタ情報"""
+    require_admin(current_user)
+    
+    data = await storage.get_bytes(profile_key(profile_id, "json"))
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(data, media_type="application/json")
@@ -2,20 +2,24 @@
 認証API
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.api import deps
+from app.db.session import get_db
+from app.models.user import User, UserRole
+from app.services.password import password_hasher, PasswordHasherBusy
 
 router = APIRouter()
 
-# パスワードハッシュ
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+# 未登録メールアドレスでも検証時間を揃えるためのダミーハッシュ（初回ログイン時に生成）
+_dummy_hash: Optional[str] = None
 
 
 # スキーマ
@@ -55,63 +59,113 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """パスワード検証"""
-    return pwd_context.verify(plain_password, hashed_password)
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="認証処理が混み合っています。しばらくしてから再度お試しください",
+        headers={"Retry-After": "1"},
+    )
 
 
-def get_password_hash(password: str) -> str:
-    """パスワードハッシュ化"""
-    return pwd_context.hash(password)
+def _login_failed_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="メールアドレスまたはパスワードが正しくありません",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """ユーザー登録"""
-    # TODO: DB登録実装
+    try:
+        role = UserRole(user.role)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="無効なロールです")
+    if role == UserRole.ADMIN:
+        raise HTTPException(status_code=400, detail="無効なロールです")
+    
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.scalar_one_or_none() is not None:
+        raise HTTPException(status_code=400, detail="このメールアドレスは既に登録されています")
+    
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+    
+    db_user = User(
+        email=user.email,
+        hashed_password=hashed_password,
+        name=user.name,
+        role=role,
+        is_active=True
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    
     return {
-        "id": 1,
-        "email": user.email,
-        "name": user.name,
-        "role": user.role,
-        "is_active": True
+        "id": db_user.id,
+        "email": db_user.email,
+        "name": db_user.name,
+        "role": db_user.role.value,
+        "is_active": db_user.is_active
     }
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
     """ログイン"""
-    # TODO: 認証ロジック実装
+    global _dummy_hash
+    
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalar_one_or_none()
+    # ハッシュ計算中にDB接続を保持しない
+    await db.commit()
+    
+    try:
+        if user is None:
+            if _dummy_hash is None:
+                _dummy_hash = await password_hasher.hash("dummy-password")
+            await password_hasher.verify(form_data.password, _dummy_hash)
+            raise _login_failed_exception()
+        
+        valid, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    except PasswordHasherBusy:
+        raise _busy_exception()
+    
+    if not valid:
+        raise _login_failed_exception()
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    
+    # 旧コストのハッシュを透過的に更新
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(1)}, expires_delta=access_token_expires
+        data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(current_user: User = Depends(deps.get_current_user)):
     """現在のユーザー情報取得"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="認証情報が無効です",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    # TODO: DBからユーザー取得
     return {
-        "id": int(user_id),
-        "email": "test@example.com",
-        "name": "テストユーザー",
-        "role": "buyer",
-        "is_active": True
+        "id": current_user.id,
+        "email": current_user.email,
+        "name": current_user.name,
+        "role": current_user.role.value,
+        "is_active": current_user.is_active
     }
 
 
@@ -1,13 +1,31 @@
 """
 評価API
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from app.db.session import get_db
+from app.api.deps import get_current_user
+from app.models.user import User, UserRole
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.evaluation import Evaluation
+from app.models.matching import BuyerConfig
+from app.services import proposal_status
+from app.monitoring.query_budget import query_budget
+
 router = APIRouter()
 
+# 採用判断 → 提案ステータス
+DECISION_STATUSES = {
+    "accept": ProposalStatus.ACCEPTED,
+    "reject": ProposalStatus.REJECTED,
+    "hold": ProposalStatus.ON_HOLD,
+}
+
 
 # スキーマ
 class CategoryScore(BaseModel):
@@ -39,6 +57,41 @@ class EvaluationListResponse(BaseModel):
     total: int
 
 
+class BulkDecisionRequest(BaseModel):
+    evaluation_ids: List[int]
+    decision: str
+
+
+class BulkDecisionResponse(BaseModel):
+    decision: str
+    updated: List[int]   # 評価ID
+    invalid: List[int]   # 現在のステータスから判断できない
+    stale: List[int]     # 同時に更新されて判断できなかった
+
+
+# ヘルパー
+def decision_status(decision: str) -> ProposalStatus:
+    if decision not in DECISION_STATUSES:
+        raise HTTPException(status_code=400, detail="無効な判断です")
+    return DECISION_STATUSES[decision]
+
+
+async def get_decidable_proposals(db: AsyncSession, user: User, evaluation_ids: List[int]) -> Dict[int, Proposal]:
+    """判断できる評価の提案（評価ID → 提案）。自組織のバイヤー要件への提案のみ（管理者はすべて）"""
+    if user.role not in (UserRole.BUYER, UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Buyer access required")
+    query = (
+        select(Evaluation.id, Proposal)
+        .join(Proposal, Proposal.id == Evaluation.proposal_id)
+        .where(Evaluation.id.in_(evaluation_ids))
+    )
+    if user.role != UserRole.ADMIN:
+        query = query.join(BuyerConfig, BuyerConfig.id == Proposal.buyer_config_id).where(
+            BuyerConfig.organization_id == user.organization_id
+        )
+    return dict((await db.execute(query)).all())
+
+
 @router.get("/", response_model=EvaluationListResponse)
 async def list_evaluations(
     rank: Optional[str] = None,
@@ -105,15 +158,65 @@ async def get_fact_check_results(evaluation_id: int):
     }
 
 
+@router.post("/decisions", response_model=BulkDecisionResponse)
+@query_budget(11)
+async def make_bulk_decision(
+    request: BulkDecisionRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """複数の評価への採用判断（判断できない評価は除いて残りを更新）"""
+    target = decision_status(request.decision)
+    proposals = await get_decidable_proposals(db, current_user, request.evaluation_ids)
+    evaluation_by_proposal = {proposal.id: evaluation_id for evaluation_id, proposal in proposals.items()}
+
+    result = await proposal_status.bulk_transition(
+        db, evaluation_by_proposal, target, changed_by=current_user.id, note=f"採用判断: {request.decision}"
+    )
+    await db.commit()
+
+    missing = [evaluation_id for evaluation_id in request.evaluation_ids if evaluation_id not in proposals]
+    return BulkDecisionResponse(
+        decision=request.decision,
+        updated=[evaluation_by_proposal[t.proposal_id] for t in result.transitioned],
+        invalid=missing + [evaluation_by_proposal[proposal_id] for proposal_id in result.invalid],
+        stale=[evaluation_by_proposal[proposal_id] for proposal_id in result.stale],
+    )
+
+
 @router.post("/{evaluation_id}/decision")
-async def make_decision(evaluation_id: int, decision: str):
-    """採用判断"""
-    if decision not in ["accept", "reject", "hold"]:
-        raise HTTPException(status_code=400, detail="無効な判断です")
-    
-    # TODO: DB更新実装
+@query_budget(6)
+async def make_decision(
+    evaluation_id: int,
+    decision: str,
+    expected_version: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """採用判断
+
+    expected_version（提案のバージョン）を指定すると、表示した後に提案が更新されていれば 409 を返す。
+    """
+    target = decision_status(decision)
+    proposal = (await get_decidable_proposals(db, current_user, [evaluation_id])).get(evaluation_id)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+
+    try:
+        transition = await proposal_status.transition(
+            db, proposal, target, changed_by=current_user.id,
+            note=f"採用判断: {decision}", expected_version=expected_version
+        )
+    except proposal_status.InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except proposal_status.StaleProposal:
+        raise HTTPException(status_code=409, detail="Proposal was updated by someone else")
+    await db.commit()
+
     return {
         "message": "判断を記録しました",
         "evaluation_id": evaluation_id,
-        "decision": decision
+        "decision": decision,
+        "status": transition.to_status.value,
+        "version": transition.version,
     }
@@ -0,0 +1,50 @@
+"""
+リアルタイムイベントAPI（Server-Sent Events）
+"""
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+
+from app.config import settings
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.services.realtime import hub
+
+router = APIRouter()
+
+# 切断時のクライアント再接続間隔（ミリ秒）
+RETRY_MS = 5000
+
+
+async def _event_stream(request: Request, user_id: int):
+    """SSEストリーム本体"""
+    async with hub.subscribe(user_id) as queue:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(
+                    queue.get(), timeout=settings.REALTIME_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # プロキシのアイドルタイムアウト対策
+                yield ": ping\n\n"
+                continue
+            yield f"data: {data}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """ログインユーザー宛てイベントの購読（通知・コメント・ステータス変更）"""
+    return StreamingResponse(
+        _event_stream(request, current_user.id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
@@ -0,0 +1,218 @@
+"""
+バイヤーマッチングAPI
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Any, List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+from app.db.session import get_db
+from app.api.deps import get_current_user
+from app.models.user import User, UserRole
+from app.models.proposal import Proposal
+from app.models.matching import BuyerConfig
+from app.services import matching as matching_service
+from app.monitoring.query_budget import query_budget
+
+router = APIRouter()
+
+# ============ Schemas ============
+
+class MandatoryCondition(BaseModel):
+    key: str                  # 抽出データのキー
+    op: str = "=="            # ==, !=, <, <=, >, >=, in, contains, exists
+    value: Optional[Any] = None
+
+
+class BuyerConfigRequest(BaseModel):
+    name: str
+    industries: List[str] = []
+    categories: List[str] = []
+    keywords: List[str] = []
+    mandatory_conditions: List[MandatoryCondition] = []
+    is_active: bool = True
+
+
+class BuyerConfigResponse(BaseModel):
+    id: int
+    name: str
+    industries: List[str]
+    categories: List[str]
+    keywords: List[str]
+    mandatory_conditions: List[MandatoryCondition]
+    is_active: bool
+    updated_at: datetime
+
+
+class RecommendedProposalResponse(BaseModel):
+    id: int
+    title: str
+    status: str
+    supplier_name: Optional[str]
+    score: float
+    created_at: datetime
+
+
+class BuyerCandidateResponse(BaseModel):
+    buyer_config_id: int
+    buyer_config_name: str
+    buyer_name: str
+    score: float
+
+
+# ============ Helper Functions ============
+
+def require_buyer(user: User):
+    """バイヤーロール（組織所属）を要求"""
+    if user.role != UserRole.BUYER or user.organization_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Buyer access required"
+        )
+
+
+async def get_own_config(db: AsyncSession, user: User, config_id: int) -> BuyerConfig:
+    config = await db.get(BuyerConfig, config_id)
+    if config is None or config.organization_id != user.organization_id:
+        raise HTTPException(status_code=404, detail="Buyer config not found")
+    return config
+
+
+def to_response(config: BuyerConfig) -> BuyerConfigResponse:
+    return BuyerConfigResponse(
+        id=config.id,
+        name=config.name,
+        industries=config.industries or [],
+        categories=config.categories or [],
+        keywords=config.keywords or [],
+        mandatory_conditions=config.mandatory_conditions or [],
+        is_active=config.is_active,
+        updated_at=config.updated_at,
+    )
+
+
+# ============ Buyer Configs ============
+
+@router.get("/buyer-configs", response_model=List[BuyerConfigResponse])
+@query_budget(1)
+async def list_buyer_configs(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """自組織のバイヤー要件一覧"""
+    require_buyer(current_user)
+
+    result = await db.execute(
+        select(BuyerConfig)
+        .where(BuyerConfig.organization_id == current_user.organization_id)
+        .order_by(BuyerConfig.id)
+    )
+    return [to_response(c) for c in result.scalars().all()]
+
+
+@router.post("/buyer-configs", response_model=BuyerConfigResponse)
+@query_budget(2)
+async def create_buyer_config(
+    request: BuyerConfigRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """バイヤー要件の作成（候補はコミット後にバックグラウンドで計算）"""
+    require_buyer(current_user)
+
+    config = BuyerConfig(
+        organization_id=current_user.organization_id,
+        name=request.name,
+        industries=request.industries,
+        categories=request.categories,
+        keywords=request.keywords,
+        mandatory_conditions=[c.model_dump() for c in request.mandatory_conditions],
+        is_active=request.is_active,
+    )
+    db.add(config)
+    await db.commit()
+
+    return to_response(config)
+
+
+@router.put("/buyer-configs/{config_id}", response_model=BuyerConfigResponse)
+@query_budget(2)
+async def update_buyer_config(
+    config_id: int,
+    request: BuyerConfigRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """バイヤー要件の更新"""
+    require_buyer(current_user)
+
+    config = await get_own_config(db, current_user, config_id)
+    config.name = request.name
+    config.industries = request.industries
+    config.categories = request.categories
+    config.keywords = request.keywords
+    config.mandatory_conditions = [c.model_dump() for c in request.mandatory_conditions]
+    config.is_active = request.is_active
+    await db.commit()
+
+    return to_response(config)
+
+
+# ============ Recommendations ============
+
+@router.get("/buyer-configs/{config_id}/recommendations", response_model=List[RecommendedProposalResponse])
+@query_budget(2)
+async def get_recommendations(
+    config_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """バイヤー要件へのおすすめ提案"""
+    require_buyer(current_user)
+    await get_own_config(db, current_user, config_id)
+
+    rows = await matching_service.recommended_proposals(
+        db, config_id, offset=max(skip, 0), limit=min(max(limit, 1), 100)
+    )
+    return [
+        RecommendedProposalResponse(
+            id=p.id,
+            title=p.title,
+            status=p.status.value,
+            supplier_name=supplier_name,
+            score=score,
+            created_at=p.created_at,
+        )
+        for p, supplier_name, score in rows
+    ]
+
+
+@router.get("/proposals/{proposal_id}/buyers", response_model=List[BuyerCandidateResponse])
+@query_budget(2)
+async def get_buyer_candidates(
+    proposal_id: int,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """提案に合うバイヤー候補（提案者本人・管理者のみ）"""
+    proposal = await db.get(Proposal, proposal_id)
+    if proposal is None or (
+        current_user.role != UserRole.ADMIN and proposal.supplier_user_id != current_user.id
+    ):
+        raise HTTPException(status_code=404, detail="Proposal not found")
+
+    rows = await matching_service.buyer_candidates(db, proposal_id, limit=min(max(limit, 1), 100))
+    return [
+        BuyerCandidateResponse(
+            buyer_config_id=config.id,
+            buyer_config_name=config.name,
+            buyer_name=buyer_name,
+            score=score,
+        )
+        for config, buyer_name, score in rows
+    ]
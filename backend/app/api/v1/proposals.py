@@ -1,11 +1,22 @@
 """
 提案API
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status as http_status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
+from app.config import settings
+from app.db.session import get_db
+from app.api.deps import get_current_user
+from app.models.user import User, UserRole
+from app.models.proposal import Proposal, ProposalStatus
+from app.services import search as search_service
+from app.services import embedding as embedding_service
+from app.services import documents as document_service
+from app.monitoring.query_budget import query_budget
+
 router = APIRouter()
 
 
@@ -15,6 +26,11 @@ class ProposalCreate(BaseModel):
     description: Optional[str] = None
 
 
+class SearchHighlight(BaseModel):
+    title: Optional[str] = None    # 一致箇所を <mark> で囲んだタイトル
+    snippet: Optional[str] = None  # 説明・抽出テキスト中の一致箇所
+
+
 class ProposalResponse(BaseModel):
     id: int
     title: str
@@ -22,6 +38,16 @@ class ProposalResponse(BaseModel):
     status: str
     created_at: datetime
     supplier_name: Optional[str]
+    highlights: Optional[SearchHighlight] = None
+
+
+class SimilarProposalResponse(BaseModel):
+    id: int
+    title: str
+    status: str
+    supplier_name: Optional[str]
+    similarity: float
+    is_duplicate: bool  # 類似度が重複判定の閾値以上
 
 
 class ProposalListResponse(BaseModel):
@@ -31,27 +57,58 @@ class ProposalListResponse(BaseModel):
     per_page: int
 
 
+# ヘルパー
+def require_buyer_or_admin(user: User):
+    """他社の提案を横断して参照する操作はバイヤー・管理者のみ"""
+    if user.role not in (UserRole.BUYER, UserRole.ADMIN):
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Buyer access required")
+
+
 @router.get("/", response_model=ProposalListResponse)
+@query_budget(2)
 async def list_proposals(
     page: int = 1,
     per_page: int = 20,
-    status: Optional[str] = None,
-    search: Optional[str] = None
+    status: Optional[ProposalStatus] = None,
+    search: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
-    """提案一覧取得"""
-    # TODO: DB実装
+    """提案一覧取得（search 指定時は全文検索の関連順）
+
+    サプライヤーは自分の提案だけを検索できる。
+    """
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 100)
+    supplier_user_id = current_user.id if current_user.role == UserRole.SUPPLIER else None
+    rows, total, terms = await search_service.search_proposals(
+        db, search, status=status, offset=(page - 1) * per_page, limit=per_page,
+        supplier_user_id=supplier_user_id,
+    )
+    
+    items = []
+    for p, supplier_name in rows:
+        highlights = None
+        if terms:
+            title = search_service.normalize(p.title)
+            body = (p.search_text or "")[len(title):]
+            highlights = SearchHighlight(
+                title=search_service.highlight(title, terms, width=None),
+                snippet=search_service.highlight(body, terms),
+            )
+        items.append(ProposalResponse(
+            id=p.id,
+            title=p.title,
+            description=p.description,
+            status=p.status.value,
+            created_at=p.created_at,
+            supplier_name=supplier_name,
+            highlights=highlights,
+        ))
+    
     return {
-        "items": [
-            {
-                "id": 1,
-                "title": "新型IoTセンサーの提案",
-                "description": "製造現場向けIoTセンサーの提案です",
-                "status": "submitted",
-                "created_at": datetime.now(),
-                "supplier_name": "ABC株式会社"
-            }
-        ],
-        "total": 1,
+        "items": items,
+        "total": total,
         "page": page,
         "per_page": per_page
     }
@@ -71,6 +128,37 @@ async def get_proposal(proposal_id: int):
     }
 
 
+@router.get("/{proposal_id}/similar", response_model=List[SimilarProposalResponse])
+@query_budget(2)
+async def get_similar_proposals(
+    proposal_id: int,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """類似提案（同一商品の別代理店提案・重複提案の確認用）
+
+    下書きの提案は対象にも結果にも含めない。埋め込みが未作成の提案は空の一覧を返す。
+    """
+    require_buyer_or_admin(current_user)
+    proposal = await db.get(Proposal, proposal_id)
+    if proposal is None or proposal.status == ProposalStatus.DRAFT:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    rows = await embedding_service.find_similar(db, proposal_id, limit=min(max(limit, 1), 50))
+    threshold = settings.DUPLICATE_SIMILARITY_THRESHOLD
+    return [
+        SimilarProposalResponse(
+            id=p.id,
+            title=p.title,
+            status=p.status.value,
+            supplier_name=supplier_name,
+            similarity=similarity,
+            is_duplicate=similarity >= threshold,
+        )
+        for p, supplier_name, similarity in rows
+    ]
+
+
 @router.post("/", response_model=ProposalResponse)
 async def create_proposal(proposal: ProposalCreate):
     """提案作成"""
@@ -86,19 +174,37 @@ async def create_proposal(proposal: ProposalCreate):
 
 
 @router.post("/{proposal_id}/upload")
+@query_budget(6)
 async def upload_document(
     proposal_id: int,
     file: UploadFile = File(...),
-    document_type: str = Form(default="main")
+    document_type: str = Form(default="main"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
-    """資料アップロード"""
-    # TODO: ファイル保存・解析実装
+    """資料アップロード（保存してチャンクストアに登録し、要約・文脈の選択で使えるようにする）"""
+    proposal = await db.get(Proposal, proposal_id)
+    if proposal is None or proposal.supplier_user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Filename is required")
+
+    data = await file.read(settings.DOCUMENT_MAX_BYTES + 1)
+    if len(data) > settings.DOCUMENT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Document is too large")
+    try:
+        chunks = await document_service.ingest_document(db, proposal_id, file.filename, data)
+    except document_service.UnsupportedDocument as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
     return {
         "message": "ファイルをアップロードしました",
         "proposal_id": proposal_id,
         "filename": file.filename,
         "document_type": document_type,
-        "size": file.size
+        "size": len(data),
+        "chunks": chunks,
     }
 
 
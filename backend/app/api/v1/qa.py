@@ -0,0 +1,193 @@
+"""
+Q&A API
+リアルタイムQ&A（WebSocket）と、回答期限つきのQ&Aラウンド
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.api import deps
+from app.db.session import async_session_maker, get_db
+from app.models.user import User, UserRole
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.matching import BuyerConfig
+from app.models.qa import QASession
+from app.monitoring.query_budget import query_budget
+from app.services import qa_rounds, user_cache
+from app.services.asr import TranscriptEvent, create_adapter
+from app.services.realtime_qa import RealtimeQASession, build_gaps
+
+router = APIRouter()
+
+
+# ============ Schemas ============
+
+class QAQuestion(BaseModel):
+    key: str
+    question: str
+
+
+class QARoundCreate(BaseModel):
+    questions: List[QAQuestion] = Field(min_length=1)
+
+
+class QAAnswer(BaseModel):
+    answers: Dict[str, Any]
+
+
+class QARoundResponse(BaseModel):
+    id: int
+    proposal_id: int
+    round_number: int
+    status: str
+    questions: List[QAQuestion]
+    answers: Optional[Dict[str, Any]]
+    due_at: datetime
+    closed_at: Optional[datetime]
+    judgement: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
+def _can_view(user: User, proposal: Optional[Proposal]) -> bool:
+    """提案者本人、または提出済みならバイヤー・管理者"""
+    return proposal is not None and (
+        proposal.supplier_user_id == user.id
+        or (user.role in (UserRole.BUYER, UserRole.ADMIN) and proposal.status != ProposalStatus.DRAFT)
+    )
+
+
+async def _load_gaps(token: str, proposal_id: int):
+    """認証・権限確認をして確認項目を返す（DB接続はセッション開始前に返す）"""
+    user = await user_cache.get_user(deps.decode_token(token))
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="認証情報が無効です")
+
+    async with async_session_maker() as db:
+        proposal = await db.get(Proposal, proposal_id)
+        # 発表者（提案者本人）・同席するバイヤー・管理者のみ
+        if not _can_view(user, proposal):
+            raise HTTPException(status_code=404, detail="Proposal not found")
+        config = None
+        if proposal.buyer_config_id is not None:
+            config = await db.get(BuyerConfig, proposal.buyer_config_id)
+        return build_gaps(config)
+
+
+@router.websocket("/sessions/{proposal_id}")
+async def qa_session(websocket: WebSocket, proposal_id: int, token: str = ""):
+    """リアルタイムプレゼンのQ&Aセッション
+
+    受信: ASRアダプタ（QA_ASR_BACKEND）が解釈するフレーム。fake では文字起こしのJSON
+        {"type": "transcript", "text": "...", "is_final": true} / {"type": "end_of_utterance"}
+    送信:
+        {"type": "state", "extracted": {...}, "open_gaps": [...]}  抽出データの更新
+        {"type": "question", "key", "label", "question", "source", "latency_ms": {...}}
+        {"type": "no_question"} / {"type": "error", "detail": ...}
+
+    発言の後 QA_SILENCE_MS の無音が続いた場合も発話終了として扱う。
+    """
+    try:
+        gaps = await _load_gaps(token, proposal_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        adapter = create_adapter(settings.QA_ASR_BACKEND)
+    except ValueError:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    await websocket.accept()
+    session = RealtimeQASession(gaps, websocket.send_json)
+    silence = settings.QA_SILENCE_MS / 1000
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=silence)
+            except asyncio.TimeoutError:
+                if session.speaking:
+                    await session.handle(TranscriptEvent("end_of_utterance", "", time.perf_counter()))
+                continue
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+            try:
+                events = await adapter.feed(frame)
+            except (ValueError, TypeError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            for event in events:
+                await session.handle(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        await adapter.close()
+
+
+# ============ Q&Aラウンド ============
+
+@router.post("/proposals/{proposal_id}/rounds", response_model=QARoundResponse, status_code=201)
+@query_budget(3)
+async def open_round(
+    proposal_id: int,
+    body: QARoundCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Q&Aラウンドを開く（バイヤー・管理者）
+
+    回答期限は QA_ROUND_DEADLINE_HOURS 後。期限前のリマインドと期限切れはスケジューラが処理する。
+    """
+    if current_user.role not in (UserRole.BUYER, UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Buyer access required")
+    if not _can_view(current_user, await db.get(Proposal, proposal_id)):
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return await qa_rounds.open_round(db, proposal_id, [q.model_dump() for q in body.questions])
+
+
+@router.get("/proposals/{proposal_id}/rounds", response_model=List[QARoundResponse])
+@query_budget(2)
+async def list_rounds(
+    proposal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """提案のQ&Aラウンド一覧（古い順）"""
+    if not _can_view(current_user, await db.get(Proposal, proposal_id)):
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    result = await db.scalars(
+        select(QASession).where(QASession.proposal_id == proposal_id).order_by(QASession.round_number)
+    )
+    return result.all()
+
+
+@router.post("/rounds/{round_id}/answers", response_model=QARoundResponse)
+@query_budget(4)
+async def answer_round(
+    round_id: int,
+    body: QAAnswer,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Q&Aラウンドに回答する（提案者本人）
+
+    回答済み・期限切れのラウンドには 409 を返す。
+    """
+    qa_round = await db.get(QASession, round_id)
+    proposal = await db.get(Proposal, qa_round.proposal_id) if qa_round is not None else None
+    if proposal is None or proposal.supplier_user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Q&A round not found")
+    try:
+        return await qa_rounds.answer_round(db, qa_round, body.answers)
+    except qa_rounds.RoundClosed as e:
+        raise HTTPException(status_code=409, detail=str(e))
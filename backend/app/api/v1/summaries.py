@@ -1,12 +1,30 @@
 """
 要約API
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+from contextlib import aclosing
 from datetime import datetime
+import json
+import logging
+
+from app.db.session import get_db, async_session_maker
+from app.api.deps import get_current_user
+from app.models.user import User, UserRole
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.evaluation import Evaluation
+from app.services import summarizer
+from app.services.llm import LLMBusy
+from app.monitoring.query_budget import query_budget
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 1件ずつ表示するレポートの項目（保存済みの要約を返す場合の順序）
+REPORT_FIELDS = ("three_line_summary", "key_points", "strengths", "concerns", "confirmation_items")
 
 
 # スキーマ
@@ -22,88 +40,174 @@ class SummaryResponse(BaseModel):
     proposal_id: int
     three_line_summary: str
     key_points: List[KeyPoint]
-    trust_score: float
-    trust_rank: str
-    recommendation_rank: str
+    trust_score: Optional[float]
+    trust_rank: Optional[str]
+    recommendation_rank: Optional[str]
     confirmation_items: List[str]
     strengths: List[str]
     concerns: List[str]
     created_at: datetime
 
 
+# ヘルパー
+async def get_viewable_proposal(db: AsyncSession, user: User, proposal_id: int) -> Proposal:
+    """要約を閲覧できる提案（提案者本人、または提出済みならバイヤー・管理者）"""
+    proposal = await db.get(Proposal, proposal_id)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    if proposal.supplier_user_id == user.id:
+        return proposal
+    if user.role in (UserRole.BUYER, UserRole.ADMIN) and proposal.status != ProposalStatus.DRAFT:
+        return proposal
+    raise HTTPException(status_code=404, detail="Proposal not found")
+
+
+async def generate_or_raise(db: AsyncSession, proposal_id: int, force: bool) -> Evaluation:
+    try:
+        evaluation = await summarizer.generate_summary(db, proposal_id, force=force)
+    except LLMBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Summary generation is busy, please retry later",
+            headers={"Retry-After": "30"},
+        )
+    if evaluation is None:
+        raise HTTPException(status_code=404, detail="No documents to summarize")
+    return evaluation
+
+
+def to_response(evaluation: Evaluation) -> SummaryResponse:
+    return SummaryResponse(
+        id=evaluation.id,
+        proposal_id=evaluation.proposal_id,
+        three_line_summary=evaluation.summary or "",
+        key_points=evaluation.key_points or [],
+        trust_score=evaluation.trust_score,
+        trust_rank=evaluation.trust_rank.value if evaluation.trust_rank else None,
+        recommendation_rank=evaluation.rank.value if evaluation.rank else None,
+        confirmation_items=evaluation.confirmation_items or [],
+        strengths=evaluation.strengths or [],
+        concerns=evaluation.concerns or [],
+        created_at=evaluation.created_at,
+    )
+
+
 @router.get("/{proposal_id}", response_model=SummaryResponse)
-async def get_summary(proposal_id: int):
-    """要約レポート取得"""
-    # TODO: DB実装・AI生成実装
-    return {
-        "id": 1,
-        "proposal_id": proposal_id,
-        "three_line_summary": (
-            "製造現場向けIoTセンサーの提案。従来比30%のコスト削減を実現し、"
-            "大手自動車メーカー3社への導入実績あり。"
-            "最小ロット100個から対応可能で、納期は4週間。"
-        ),
-        "key_points": [
-            {
-                "category": "価格",
-                "point": "従来製品比30%削減",
-                "verification_status": "verified",
-                "detail": "比較条件が明確で検証済み"
-            },
-            {
-                "category": "品質",
-                "point": "ISO9001認証取得",
-                "verification_status": "verified",
-                "detail": "認証番号確認済み"
-            },
-            {
-                "category": "実績",
-                "point": "大手3社導入",
-                "verification_status": "warning",
-                "detail": "2社は確認済み、1社は未確認"
-            },
-            {
-                "category": "納期",
-                "point": "4週間",
-                "verification_status": "info",
-                "detail": "繁忙期は要確認"
-            },
-            {
-                "category": "サポート",
-                "point": "24時間対応",
-                "verification_status": "info",
-                "detail": "対応範囲の詳細確認推奨"
-            }
-        ],
-        "trust_score": 87.0,
-        "trust_rank": "A",
-        "recommendation_rank": "A",
-        "confirmation_items": [
-            "導入実績の未確認1社について具体的な情報を要求",
-            "繁忙期の具体的な納期延長リスクを確認",
-            "24時間サポートの具体的な対応範囲を確認"
-        ],
-        "strengths": [
-            "価格競争力が高い（30%削減）",
-            "品質認証取得済み",
-            "大手企業への導入実績"
-        ],
-        "concerns": [
-            "導入実績の一部が未確認",
-            "繁忙期の納期リスク"
-        ],
-        "created_at": datetime.now()
-    }
+@query_budget(2)
+async def get_summary(
+    proposal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """保存済みの要約レポート取得（LLMは呼ばない。未作成なら 404）"""
+    await get_viewable_proposal(db, current_user, proposal_id)
+    evaluation = await summarizer.get_evaluation(db, proposal_id)
+    if evaluation is None or evaluation.summary_hash is None:
+        raise HTTPException(status_code=404, detail="Summary has not been generated")
+    return to_response(evaluation)
 
 
-@router.post("/{proposal_id}/regenerate")
-async def regenerate_summary(proposal_id: int):
-    """要約再生成"""
-    # TODO: AI再生成実装
-    return {
-        "message": "要約を再生成しました",
-        "proposal_id": proposal_id
-    }
+@router.post("/{proposal_id}", response_model=SummaryResponse)
+@query_budget(4)
+async def generate_summary(
+    proposal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """要約レポート作成（資料が変わっていれば、変わった部分だけ要約し直す）"""
+    await get_viewable_proposal(db, current_user, proposal_id)
+    evaluation = await generate_or_raise(db, proposal_id, force=False)
+    return to_response(evaluation)
+
+
+@router.post("/{proposal_id}/regenerate", response_model=SummaryResponse)
+@query_budget(4)
+async def regenerate_summary(
+    proposal_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """要約再生成（キャッシュを使わずにすべて要約し直す）"""
+    await get_viewable_proposal(db, current_user, proposal_id)
+    evaluation = await generate_or_raise(db, proposal_id, force=True)
+    return to_response(evaluation)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _stored_summary_stream(evaluation: Evaluation) -> AsyncIterator[str]:
+    response = to_response(evaluation)
+    for field in REPORT_FIELDS:
+        values = getattr(response, field)
+        for value in values if isinstance(values, list) else [values]:
+            yield _sse("item", {"field": field, "value": value.model_dump() if isinstance(value, BaseModel) else value})
+    yield _sse("done", response.model_dump(mode="json"))
+
+
+async def _summary_stream(proposal_id: int, summary_plan, force: bool) -> AsyncIterator[str]:
+    """要約生成のイベントをSSEに変換（保存はストリーム専用のセッションで行う）
+
+    クライアントが切断した場合も、要約の生成（LLMのストリーム）をこの場で閉じる。
+    """
+    try:
+        async with aclosing(summarizer.stream_summary(summary_plan, use_cache=not force)) as events:
+            async for event, data in events:
+                if event == "result":
+                    async with async_session_maker() as db:
+                        evaluation = await summarizer.save_report(db, proposal_id, data)
+                        yield _sse("done", to_response(evaluation).model_dump(mode="json"))
+                elif event == "token":
+                    yield _sse("token", {"text": data})
+                else:
+                    yield _sse(event, data)
+    except LLMBusy:
+        yield _sse("error", {"detail": "Summary generation is busy, please retry later"})
+    except Exception:
+        logger.exception("要約のストリーミング生成に失敗しました proposal_id=%s", proposal_id)
+        yield _sse("error", {"detail": "Summary generation failed"})
+
+
+@router.post("/{proposal_id}/stream")
+@query_budget(3)
+async def stream_summary(
+    proposal_id: int,
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """要約生成のストリーミング（Server-Sent Events）
+
+    - progress: 資料の各部分の要約の進み具合
+    - token: 最終レポートの生成中のテキスト
+    - item: 完成したレポートの項目（要点・確認事項などを1件ずつ）
+    - done: 保存した要約（GET /{proposal_id} と同じ形）
+    - error: 失敗
+
+    クライアントは done / error を受け取ったら接続を閉じる。途中で切断すると
+    生成中のLLM呼び出しも取り消す（要約済みの部分は次回に再利用される）。
+    LLMを呼び出すため POST で受け付ける（EventSource ではなく fetch のストリームで読む）。
+    """
+    await get_viewable_proposal(db, current_user, proposal_id)
+    chunks, hashes = await summarizer.load_chunks(db, proposal_id)
+    if not chunks:
+        raise HTTPException(status_code=404, detail="No documents to summarize")
+    summary_plan = summarizer.plan(chunks, hashes)
+    evaluation = await summarizer.get_evaluation(db, proposal_id)
+
+    if evaluation is not None and evaluation.summary_hash == summary_plan.root_key and not regenerate:
+        stream = _stored_summary_stream(evaluation)
+    else:
+        stream = _summary_stream(proposal_id, summary_plan, force=regenerate)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
 
 
 @router.get("/{proposal_id}/export")
@@ -3,20 +3,32 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, Integer
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
 from app.db.session import get_db
 from app.api.deps import get_current_user
+from app.api.responses import json_array_response
 from app.models.user import User, UserRole
 from app.models.proposal import Proposal, ProposalStatus
 from app.models.point import PointBalance, PointTransaction, TransactionType, PointPackage
 from app.models.comment import Comment, ProposalProgress, Notification
+from app.services import notification as notification_service
+from app.services import embedding as embedding_service
+from app.services import points as points_service
+from app.services import partitions
+from app.services import outbox
+from app.services import proposal_status
+from app.monitoring.query_budget import query_budget
 
 router = APIRouter()
 
+# 変更者のいない（パイプラインによる）進捗履歴の表示名
+SYSTEM_USER_NAME = "システム"
+
 # ============ Schemas ============
 
 class PointBalanceResponse(BaseModel):
@@ -154,6 +166,7 @@ async def get_or_create_point_balance(db: AsyncSession, user_id: int) -> PointBa
 # ============ Dashboard ============
 
 @router.get("/dashboard", response_model=DashboardStatsResponse)
+@query_budget(5)
 async def get_dashboard_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -183,13 +196,8 @@ async def get_dashboard_stats(
     # ポイント残高
     point_balance = await get_or_create_point_balance(db, current_user.id)
     
-    # 未読通知数
-    notif_result = await db.execute(
-        select(func.count(Notification.id))
-        .where(Notification.user_id == current_user.id)
-        .where(Notification.is_read == False)
-    )
-    unread_count = notif_result.scalar() or 0
+    # 未読通知数（Redisカウンタ）
+    unread_count = await notification_service.get_unread_count(db, current_user.id)
     
     return DashboardStatsResponse(
         total_proposals=stats.total or 0,
@@ -204,6 +212,7 @@ async def get_dashboard_stats(
 # ============ Points ============
 
 @router.get("/points/balance", response_model=PointBalanceResponse)
+@query_budget(3)
 async def get_point_balance(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -215,6 +224,7 @@ async def get_point_balance(
 
 
 @router.get("/points/transactions", response_model=List[PointTransactionResponse])
+@query_budget(6)
 async def get_point_transactions(
     skip: int = 0,
     limit: int = 50,
@@ -226,17 +236,21 @@ async def get_point_transactions(
     
     balance = await get_or_create_point_balance(db, current_user.id)
     
-    result = await db.execute(
+    # 直近の月次パーティションから検索（古いページのみ過去のパーティションを参照）
+    transactions = await partitions.recent_page(
+        db,
         select(PointTransaction)
         .where(PointTransaction.point_balance_id == balance.id)
-        .order_by(PointTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(PointTransaction.created_at.desc()),
+        PointTransaction.created_at, skip, limit
+    )
+    return json_array_response(
+        [PointTransactionResponse.model_validate(t) for t in transactions]
     )
-    return result.scalars().all()
 
 
 @router.get("/points/packages", response_model=List[PointPackageResponse])
+@query_budget(1)
 async def get_point_packages(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -253,6 +267,7 @@ async def get_point_packages(
 
 
 @router.post("/points/purchase/{package_id}")
+@query_budget(7)
 async def purchase_points(
     package_id: int,
     db: AsyncSession = Depends(get_db),
@@ -273,21 +288,13 @@ async def purchase_points(
     # ポイント残高取得
     balance = await get_or_create_point_balance(db, current_user.id)
     
-    # ポイント付与
+    # ポイント付与（有効期限付きのロットを作成）
     total_points = package.points + package.bonus_points
-    balance.balance += total_points
-    balance.total_purchased += total_points
-    
-    # 取引履歴作成
-    transaction = PointTransaction(
-        point_balance_id=balance.id,
-        transaction_type=TransactionType.PURCHASE,
-        amount=total_points,
-        balance_after=balance.balance,
+    await points_service.credit_points(
+        db, balance, TransactionType.PURCHASE, total_points,
         description=f"{package.name} ({package.points}pt + ボーナス{package.bonus_points}pt)",
         payment_id=f"demo-{datetime.utcnow().timestamp()}"
     )
-    db.add(transaction)
     
     await db.commit()
     
@@ -301,6 +308,7 @@ async def purchase_points(
 # ============ Proposals ============
 
 @router.get("/proposals", response_model=List[SupplierProposalResponse])
+@query_budget(1)
 async def list_supplier_proposals(
     status: Optional[str] = None,
     skip: int = 0,
@@ -311,7 +319,14 @@ async def list_supplier_proposals(
     """サプライヤーの提案一覧"""
     require_supplier(current_user)
     
-    query = select(Proposal).where(Proposal.supplier_user_id == current_user.id)
+    # コメント数は相関サブクエリで同時に取得（提案ごとの追加クエリを発行しない）
+    comment_count = (
+        select(func.count(Comment.id))
+        .where(Comment.proposal_id == Proposal.id)
+        .correlate(Proposal)
+        .scalar_subquery()
+    )
+    query = select(Proposal, comment_count).where(Proposal.supplier_user_id == current_user.id)
     
     if status:
         query = query.where(Proposal.status == status)
@@ -319,16 +334,9 @@ async def list_supplier_proposals(
     query = query.order_by(Proposal.created_at.desc()).offset(skip).limit(limit)
     
     result = await db.execute(query)
-    proposals = result.scalars().all()
     
-    # コメント数を追加
     response_list = []
-    for p in proposals:
-        comment_result = await db.execute(
-            select(func.count(Comment.id)).where(Comment.proposal_id == p.id)
-        )
-        comment_count = comment_result.scalar() or 0
-        
+    for p, comment_count in result.all():
         response_list.append(SupplierProposalResponse(
             id=p.id,
             title=p.title,
@@ -337,13 +345,14 @@ async def list_supplier_proposals(
             points_used=p.points_used or 300,
             created_at=p.created_at,
             updated_at=p.updated_at,
-            comment_count=comment_count
+            comment_count=comment_count or 0
         ))
     
-    return response_list
+    return json_array_response(response_list)
 
 
 @router.post("/proposals", response_model=SupplierProposalResponse)
+@query_budget(2)
 async def create_proposal(
     request: ProposalCreateRequest,
     db: AsyncSession = Depends(get_db),
@@ -378,6 +387,7 @@ async def create_proposal(
 
 
 @router.post("/proposals/{proposal_id}/submit")
+@query_budget(16)
 async def submit_proposal(
     proposal_id: int,
     db: AsyncSession = Depends(get_db),
@@ -404,50 +414,60 @@ async def submit_proposal(
     balance = await get_or_create_point_balance(db, current_user.id)
     points_required = proposal.points_used or 300
     
-    if balance.balance < points_required:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Insufficient points. Required: {points_required}, Available: {balance.balance}"
+    # ポイント消費（有効なロットから古い順に充当）
+    try:
+        await points_service.consume_points(
+            db, balance, points_required,
+            description=f"提案提出: {proposal.title}",
+            reference_id=proposal.id
         )
+    except points_service.InsufficientPoints as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # ステータス更新（進捗履歴・変更イベントも追加）。同時に提出された場合は後から来た方を取り消す
+    try:
+        await proposal_status.transition(
+            db, proposal, ProposalStatus.SUBMITTED,
+            changed_by=current_user.id, note="提案を提出しました"
+        )
+    except (proposal_status.InvalidTransition, proposal_status.StaleProposal):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Proposal already submitted")
+    
+    # 副作用（バイヤーへの通知など）は同じトランザクションでアウトボックスに積み、コミット後に配信
+    outbox.add_event(db, outbox.PROPOSAL_SUBMITTED, {
+        "proposal_id": proposal.id,
+        "supplier_user_id": current_user.id,
+        "buyer_config_id": proposal.buyer_config_id,
+        "points_used": points_required,
+    }, key=proposal.id)
     
-    # ポイント消費
-    balance.balance -= points_required
-    balance.total_used += points_required
-    
-    # 取引履歴
-    transaction = PointTransaction(
-        point_balance_id=balance.id,
-        transaction_type=TransactionType.PROPOSAL_SUBMIT,
-        amount=-points_required,
-        balance_after=balance.balance,
-        description=f"提案提出: {proposal.title}",
-        reference_id=proposal.id
-    )
-    db.add(transaction)
-    
-    # ステータス更新
-    proposal.status = ProposalStatus.SUBMITTED
-    
-    # 進捗履歴
-    progress = ProposalProgress(
-        proposal_id=proposal.id,
-        status=ProposalStatus.SUBMITTED,
-        changed_by=current_user.id,
-        note="提案を提出しました"
-    )
-    db.add(progress)
+    await db.commit()
     
+    # 重複候補の検出（提出自体は成功させ、結果を返すだけ）
+    duplicates = await embedding_service.find_duplicates(db, proposal)
     await db.commit()
     
     return {
         "success": True,
         "points_used": points_required,
         "remaining_balance": balance.balance,
-        "status": "submitted"
+        "status": "submitted",
+        "possible_duplicates": [
+            {
+                "id": p.id,
+                "title": p.title,
+                "supplier_name": supplier_name,
+                "similarity": similarity,
+                "same_supplier": p.supplier_org_id == proposal.supplier_org_id,
+            }
+            for p, supplier_name, similarity in duplicates
+        ]
     }
 
 
 @router.get("/proposals/{proposal_id}")
+@query_budget(2)
 async def get_proposal_detail(
     proposal_id: int,
     db: AsyncSession = Depends(get_db),
@@ -458,6 +478,7 @@ async def get_proposal_detail(
     
     result = await db.execute(
         select(Proposal)
+        .options(selectinload(Proposal.evaluation))
         .where(Proposal.id == proposal_id)
         .where(Proposal.supplier_user_id == current_user.id)
     )
@@ -470,9 +491,9 @@ async def get_proposal_detail(
     evaluation = None
     if proposal.evaluation:
         evaluation = {
-            "overall_score": proposal.evaluation.overall_score,
-            "ai_summary": proposal.evaluation.ai_summary,
-            "reliability_rank": proposal.evaluation.reliability_rank
+            "overall_score": proposal.evaluation.total_score,
+            "ai_summary": proposal.evaluation.summary,
+            "reliability_rank": proposal.evaluation.trust_rank.value if proposal.evaluation.trust_rank else None
         }
     
     return {
@@ -491,6 +512,7 @@ async def get_proposal_detail(
 # ============ Comments ============
 
 @router.get("/proposals/{proposal_id}/comments", response_model=List[CommentResponse])
+@query_budget(2)
 async def get_proposal_comments(
     proposal_id: int,
     db: AsyncSession = Depends(get_db),
@@ -505,38 +527,39 @@ async def get_proposal_comments(
         .where(Proposal.id == proposal_id)
         .where(Proposal.supplier_user_id == current_user.id)
     )
-    if not proposal_result.scalar_one_or_none():
+    proposal = proposal_result.scalar_one_or_none()
+    if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
     # コメント取得（内部コメントは除外）
+    # 提案の作成月より前のパーティションは検索しない
     result = await db.execute(
-        select(Comment)
+        select(Comment, User.name, User.role)
+        .join(User, User.id == Comment.user_id)
         .where(Comment.proposal_id == proposal_id)
+        .where(Comment.created_at >= partitions.month_start(proposal.created_at))
         .where(Comment.parent_id == None)
         .where(Comment.is_internal == False)
         .order_by(Comment.created_at.desc())
     )
-    comments = result.scalars().all()
     
     response_list = []
-    for c in comments:
-        user_result = await db.execute(select(User).where(User.id == c.user_id))
-        user = user_result.scalar_one()
-        
+    for c, user_name, user_role in result.all():
         response_list.append(CommentResponse(
             id=c.id,
             content=c.content,
-            user_name=user.name,
-            user_role=user.role.value,
+            user_name=user_name,
+            user_role=user_role.value,
             is_internal=c.is_internal,
             created_at=c.created_at,
             replies=[]  # TODO: 返信の取得
         ))
     
-    return response_list
+    return json_array_response(response_list)
 
 
 @router.post("/proposals/{proposal_id}/comments")
+@query_budget(3)
 async def add_comment(
     proposal_id: int,
     request: CommentCreateRequest,
@@ -572,6 +595,7 @@ async def add_comment(
 # ============ Progress ============
 
 @router.get("/proposals/{proposal_id}/progress", response_model=List[ProposalProgressResponse])
+@query_budget(2)
 async def get_proposal_progress(
     proposal_id: int,
     db: AsyncSession = Depends(get_db),
@@ -586,35 +610,36 @@ async def get_proposal_progress(
         .where(Proposal.id == proposal_id)
         .where(Proposal.supplier_user_id == current_user.id)
     )
-    if not proposal_result.scalar_one_or_none():
+    proposal = proposal_result.scalar_one_or_none()
+    if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
+    # 提案の作成月より前のパーティションは検索しない
     result = await db.execute(
-        select(ProposalProgress)
+        select(ProposalProgress, User.name)
+        .outerjoin(User, User.id == ProposalProgress.changed_by)
         .where(ProposalProgress.proposal_id == proposal_id)
+        .where(ProposalProgress.created_at >= partitions.month_start(proposal.created_at))
         .order_by(ProposalProgress.created_at.desc())
     )
-    progress_list = result.scalars().all()
     
     response_list = []
-    for p in progress_list:
-        user_result = await db.execute(select(User).where(User.id == p.changed_by))
-        user = user_result.scalar_one()
-        
+    for p, user_name in result.all():
         response_list.append(ProposalProgressResponse(
             id=p.id,
             status=p.status.value,
             note=p.note,
-            changed_by_name=user.name,
+            changed_by_name=user_name or SYSTEM_USER_NAME,
             created_at=p.created_at
         ))
     
-    return response_list
+    return json_array_response(response_list)
 
 
 # ============ Notifications ============
 
 @router.get("/notifications", response_model=List[NotificationResponse])
+@query_budget(3)
 async def get_notifications(
     unread_only: bool = False,
     skip: int = 0,
@@ -630,13 +655,17 @@ async def get_notifications(
     if unread_only:
         query = query.where(Notification.is_read == False)
     
-    query = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    query = query.order_by(Notification.created_at.desc())
     
-    result = await db.execute(query)
-    return result.scalars().all()
+    # 直近の月次パーティションから検索（古いページのみ過去のパーティションを参照）
+    notifications = await partitions.recent_page(db, query, Notification.created_at, skip, limit)
+    return json_array_response(
+        [NotificationResponse.model_validate(n) for n in notifications]
+    )
 
 
 @router.post("/notifications/{notification_id}/read")
+@query_budget(2)
 async def mark_notification_read(
     notification_id: int,
     db: AsyncSession = Depends(get_db),
@@ -645,23 +674,17 @@ async def mark_notification_read(
     """通知を既読にする"""
     require_supplier(current_user)
     
-    result = await db.execute(
-        select(Notification)
-        .where(Notification.id == notification_id)
-        .where(Notification.user_id == current_user.id)
+    found = await notification_service.mark_notification_read(
+        db, current_user.id, notification_id
     )
-    notification = result.scalar_one_or_none()
-    
-    if not notification:
+    if not found:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
-    await db.commit()
-    
     return {"success": True}
 
 
 @router.post("/notifications/read-all")
+@query_budget(1)
 async def mark_all_notifications_read(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -669,14 +692,6 @@ async def mark_all_notifications_read(
     """全通知を既読にする"""
     require_supplier(current_user)
     
-    from sqlalchemy import update
-    
-    await db.execute(
-        update(Notification)
-        .where(Notification.user_id == current_user.id)
-        .where(Notification.is_read == False)
-        .values(is_read=True)
-    )
-    await db.commit()
+    await notification_service.mark_all_notifications_read(db, current_user.id)
     
     return {"success": True}
@@ -0,0 +1,32 @@
+"""
+Redis Client Management
+"""
+import time
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.monitoring.metrics import observe_call
+
+
+class InstrumentedRedis(redis.Redis):
+    """コマンド実行時間を計測するRedisクライアント"""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            observe_call("redis", time.perf_counter() - started)
+
+
+# 非同期Redisクライアント（接続プールはワーカー内で共有）
+redis_client = InstrumentedRedis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True
+)
+
+
+async def get_redis() -> redis.Redis:
+    """Redisクライアントを取得"""
+    return redis_client
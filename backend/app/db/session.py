@@ -1,14 +1,35 @@
 """
 Database Session Management
 """
+import time
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 from app.config import settings
+from app.monitoring.metrics import record_pool_wait
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """接続取得の待ち時間を計測するプール"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+
 
 # 非同期エンジン作成
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True
 )
 
 # セッションファクトリ
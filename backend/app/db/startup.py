@@ -0,0 +1,64 @@
+"""
+起動時のDB準備
+スキーマ作成は行わず、マイグレーション適用状況の確認と接続プールの暖機のみ行う
+"""
+import asyncio
+from pathlib import Path
+from typing import Set
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.session import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def expected_heads() -> Set[str]:
+    """マイグレーションスクリプトの head リビジョン"""
+    # alembic は起動確認時にだけ必要なので遅延インポート
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def check_schema_revision() -> None:
+    """DBのリビジョンが head と一致することを確認"""
+    heads = expected_heads()
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = set(result.scalars())
+    except DBAPIError:
+        current = set()
+    if current != heads:
+        raise RuntimeError(
+            f"DBスキーマが最新ではありません（current={sorted(current)}, "
+            f"expected={sorted(heads)}）。alembic upgrade head を実行してください"
+        )
+
+
+async def prewarm_pool(size: int) -> None:
+    """接続プールを事前に確立しておく"""
+    if size <= 0:
+        return
+
+    async def _open():
+        conn = await engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    conns = await asyncio.gather(*[_open() for _ in range(size)])
+    for conn in conns:
+        await conn.close()
+
+
+async def create_all() -> None:
+    """全テーブル作成（マイグレーションを使わない開発用）"""
+    from app.db.base import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
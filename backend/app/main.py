@@ -3,12 +3,24 @@ AIプレゼン自動スクリーニングシステム - メインアプリケー
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.api.v1 import auth, proposals, evaluations, summaries, supplier
+from app.api.v1 import auth, proposals, evaluations, summaries, supplier, events, admin, matching, qa
+from app.db import startup
 from app.db.session import engine
-from app.db.base import Base
+from app.monitoring import metrics, query_budget
+from app.monitoring.profiling import ProfilingMiddleware
+from app.services.realtime import hub
+from app.services.notification import notification_batcher
+from app.services.password import password_hasher
+from app.services.llm import llm_client
+from app.services.scheduler import deadline_scheduler
+from app.services import qa_rounds, partitions
+from app.services.outbox import outbox_relay
+from app.services.outbox_consumers import build_consumers
+from app.services.health import health_monitor, pool_stats
 
 
 @asynccontextmanager
@@ -17,13 +29,52 @@ async def lifespan(app: FastAPI):
     # 起動時の処理
     print("[START] AI Presentation Auto-Screening System starting...")
     
-    # DBテーブル作成（開発用）
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # スキーマ確認（テーブル作成はマイグレーションで行う）
+    if settings.DB_STARTUP_MODE == "create_all":
+        await startup.create_all()
+    elif settings.DB_STARTUP_MODE == "check":
+        await startup.check_schema_revision()
+    
+    # 履歴テーブルの月次パーティションを先行作成（作成済みなら何もしない）
+    if settings.DB_STARTUP_MODE != "skip":
+        await partitions.ensure_partitions()
+    
+    # 最初のリクエストで接続確立を待たないよう暖機
+    await startup.prewarm_pool(min(settings.DB_POOL_PREWARM, settings.DB_POOL_SIZE))
+    
+    # リアルタイム配信の購読開始
+    await hub.start()
+    await notification_batcher.start()
+    
+    # アウトボックスの配信とコンシューマ
+    await outbox_relay.start()
+    outbox_consumers = build_consumers()
+    for consumer in outbox_consumers:
+        await consumer.start()
+    
+    # 期限スケジューラ（Q&Aラウンドの期限切れ・リマインド）
+    qa_rounds.register_handlers()
+    await deadline_scheduler.start()
+    
+    # 依存サービスの定期監視
+    health_monitor.register_queue("password_hash", lambda: password_hasher.queue_depth)
+    health_monitor.register_queue("notification_batch", lambda: notification_batcher.pending_count)
+    health_monitor.register_queue("llm", lambda: llm_client.queue_depth)
+    health_monitor.register_queue("deadline_scheduler", lambda: deadline_scheduler.backlog)
+    health_monitor.register_queue("outbox", lambda: outbox_relay.pending_count)
+    await health_monitor.start()
     
     yield
     
     # 終了時の処理
+    await health_monitor.stop()
+    await deadline_scheduler.stop()
+    for consumer in outbox_consumers:
+        await consumer.stop()
+    await outbox_relay.stop()
+    await notification_batcher.stop()
+    await hub.stop()
+    password_hasher.shutdown()
     print("[END] System shutdown")
 
 
@@ -46,6 +97,36 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 性能計測（SQL計測フックはプロファイリングでも使用）
+metrics.instrument_engine(engine)
+query_budget.instrument_engine(engine)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        max_concurrent=settings.PROFILING_MAX_CONCURRENT,
+        interval=settings.PROFILING_INTERVAL_SECONDS
+    )
+if settings.METRICS_ENABLED:
+    metrics.registry.register(metrics.Gauge(
+        "db_pool_checked_out", "使用中のDB接続数", lambda: pool_stats()["checked_out"]
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "db_pool_saturation", "DB接続プールの使用率", lambda: pool_stats()["saturation"]
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "password_hash_queue_depth", "パスワードハッシュ待ち件数", lambda: password_hasher.queue_depth
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "realtime_connections", "SSE接続数", lambda: hub.connection_count
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "outbox_lag_seconds", "最も古い未配信アウトボックスイベントの経過時間", lambda: outbox_relay.lag_seconds
+    ))
+    metrics.registry.register(metrics.Gauge(
+        "outbox_pending_events", "未配信のアウトボックスイベント数", lambda: outbox_relay.pending_count
+    ))
+    app.add_middleware(metrics.MetricsMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -61,6 +142,10 @@ app.include_router(proposals.router, prefix="/api/v1/proposals", tags=["提案"]
 app.include_router(evaluations.router, prefix="/api/v1/evaluations", tags=["評価"])
 app.include_router(summaries.router, prefix="/api/v1/summaries", tags=["要約"])
 app.include_router(supplier.router, prefix="/api/v1/supplier", tags=["サプライヤー"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["リアルタイム"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["管理"])
+app.include_router(matching.router, prefix="/api/v1/matching", tags=["マッチング"])
+app.include_router(qa.router, prefix="/api/v1/qa", tags=["Q&A"])
 
 
 @app.get("/")
@@ -75,10 +160,30 @@ async def root():
 
 @app.get("/api/v1/health")
 async def health_check():
-    """詳細ヘルスチェック"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "redis": "connected",
-        "storage": "connected"
-    }
+    """詳細ヘルスチェック（定期監視結果のキャッシュを返す）"""
+    return health_monitor.snapshot()
+
+
+@app.get("/api/v1/health/live")
+async def liveness_check():
+    """Liveness（プロセスが応答できるか）"""
+    return {"status": "alive"}
+
+
+@app.get("/api/v1/health/ready")
+async def readiness_check():
+    """Readiness（依存サービス・接続プール・待ち行列の状態）"""
+    readiness = health_monitor.readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content=readiness
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus メトリクス"""
+    return PlainTextResponse(
+        metrics.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
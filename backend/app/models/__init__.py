@@ -5,5 +5,13 @@ from app.models.user import User
 from app.models.organization import Organization
 from app.models.proposal import Proposal
 from app.models.evaluation import Evaluation
+# リレーションで名前参照されるモデル（どのモデルから読み込んでもマッパーを構成できるようにする）
+from app.models.comment import Comment, Notification, ProposalProgress
+from app.models.point import PointBalance, PointLot, PointTransaction
+from app.models.qa import QASession
 
-__all__ = ["User", "Organization", "Proposal", "Evaluation"]
+__all__ = [
+    "User", "Organization", "Proposal", "Evaluation",
+    "Comment", "Notification", "ProposalProgress",
+    "PointBalance", "PointLot", "PointTransaction", "QASession",
+]
@@ -1,68 +1,76 @@
 """
 コメント・進捗管理モデル
 バイヤーとサプライヤー間のコミュニケーション
+
+comments / proposal_progress / notifications は created_at の月単位で
+レンジパーティション分割する（services/partitions.py が作成・アーカイブする）。
+主キーにはパーティションキーの created_at を含める。複合主キーでは id が自動採番の
+列とみなされないため autoincrement=True を明示する。
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
-import enum
-
-
-class ProposalStatus(str, enum.Enum):
-    """提案ステータス"""
-    DRAFT = "draft"                    # 下書き
-    SUBMITTED = "submitted"            # 提出済み（AI処理待ち）
-    AI_PROCESSING = "ai_processing"    # AI処理中
-    AI_EVALUATED = "ai_evaluated"      # AI評価完了
-    UNDER_REVIEW = "under_review"      # バイヤー検討中
-    MEETING_SCHEDULED = "meeting"      # 面談調整中
-    ACCEPTED = "accepted"              # 採用
-    REJECTED = "rejected"              # 不採用
-    ON_HOLD = "on_hold"               # 保留
+from app.models.proposal import ProposalStatus
 
 
 class Comment(Base):
     """コメント"""
     __tablename__ = "comments"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     is_internal = Column(Boolean, default=False)  # 内部コメント（相手に非表示）
-    parent_id = Column(Integer, ForeignKey("comments.id"))  # 返信元
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    parent_id = Column(Integer)  # 返信元（パーティション分割テーブルの id は単独で一意でないため外部キーなし）
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # リレーション
     proposal = relationship("Proposal", back_populates="comments")
     user = relationship("User", back_populates="comments")
-    replies = relationship("Comment", back_populates="parent", remote_side=[id])
-    parent = relationship("Comment", back_populates="replies", remote_side=[parent_id])
+    replies = relationship(
+        "Comment", back_populates="parent",
+        primaryjoin="Comment.id == remote(foreign(Comment.parent_id))",
+    )
+    parent = relationship(
+        "Comment", back_populates="replies",
+        primaryjoin="remote(Comment.id) == foreign(Comment.parent_id)",
+    )
+
+    __table_args__ = (
+        Index("ix_comments_proposal_created", "proposal_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 class ProposalProgress(Base):
     """提案進捗履歴"""
     __tablename__ = "proposal_progress"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False)
     status = Column(SQLEnum(ProposalStatus), nullable=False)
-    changed_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    changed_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # システム（パイプライン）による変更は NULL
     note = Column(Text)  # 進捗メモ
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
 
     # リレーション
     proposal = relationship("Proposal", back_populates="progress_history")
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_proposal_progress_proposal_created", "proposal_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
 
 class Notification(Base):
     """通知"""
     __tablename__ = "notifications"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(200), nullable=False)
     message = Column(Text, nullable=False)
@@ -70,7 +78,15 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     notification_type = Column(String(50))  # comment, status_change, point, etc.
     reference_id = Column(Integer)  # 関連するオブジェクトID
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
 
     # リレーション
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        # 未読数カウンタのフォールバック・一括既読用の部分インデックス
+        Index("ix_notifications_user_unread", "user_id", postgresql_where=text("is_read = false")),
+        # 通知一覧（新しい順）
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
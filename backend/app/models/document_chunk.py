@@ -0,0 +1,31 @@
+"""
+資料チャンクモデル
+提案資料をページ・スライド単位（長いページは分割）で保持し、LLMへ渡す文脈の検索に使う
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+from app.db.base import Base
+from app.models.embedding import EMBEDDING_DIM
+
+
+class DocumentChunk(Base):
+    """資料チャンク"""
+    __tablename__ = "document_chunks"
+    
+    id = Column(Integer, primary_key=True)
+    proposal_id = Column(Integer, ForeignKey("proposals.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String(255), nullable=False)  # 資料名（ファイル名など）
+    page = Column(Integer, nullable=False)         # ページ・スライド番号（1始まり）
+    chunk_index = Column(Integer, nullable=False)  # ページ内の分割番号
+    text = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    token_count = Column(Integer, nullable=False)  # 推定トークン数
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=True)
+    embedding_model = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_document_chunks_proposal", "proposal_id", "source", "page", "chunk_index"),
+        Index("ix_document_chunks_hash", "content_hash"),
+    )
@@ -0,0 +1,33 @@
+"""
+提案の埋め込みベクトル
+類似提案検索・重複検知に使う（pgvector の HNSW インデックス）
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+from app.db.base import Base
+
+# 埋め込みの次元数（マイグレーションのカラム定義と一致させる）
+EMBEDDING_DIM = 1536
+
+
+class ProposalEmbedding(Base):
+    """提案ごとの埋め込み"""
+    __tablename__ = "proposal_embeddings"
+    
+    proposal_id = Column(Integer, ForeignKey("proposals.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)  # 埋め込み元テキストの SHA-256
+    model = Column(String(100), nullable=False)        # 生成したモデル名
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # 同一内容の埋め込みを再利用するためのキャッシュ検索用
+        Index("ix_proposal_embeddings_hash", "model", "content_hash"),
+        Index(
+            "ix_proposal_embeddings_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
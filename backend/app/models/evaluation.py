@@ -2,6 +2,7 @@
 評価モデル
 """
 from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Text, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.db.base import Base, TimestampMixin
 import enum
@@ -32,12 +33,12 @@ class Evaluation(Base, TimestampMixin):
     
     # スコア
     total_score = Column(Float, nullable=True)
-    category_scores = Column(JSON, nullable=True)  # カテゴリ別スコア
+    category_scores = Column(JSONB, nullable=True)  # カテゴリ別スコア
     
     # ファクトチェック
     trust_score = Column(Float, nullable=True)
     trust_rank = Column(Enum(TrustRank), nullable=True)
-    fact_check_results = Column(JSON, nullable=True)
+    fact_check_results = Column(JSONB, nullable=True)
     
     # 評価結果
     rank = Column(Enum(EvaluationRank), nullable=True)
@@ -46,6 +47,9 @@ class Evaluation(Base, TimestampMixin):
     summary = Column(Text, nullable=True)
     key_points = Column(JSON, nullable=True)
     confirmation_items = Column(JSON, nullable=True)
+    strengths = Column(JSON, nullable=True)
+    concerns = Column(JSON, nullable=True)
+    summary_hash = Column(String(64), nullable=True)  # 要約した資料の内容ハッシュ（services/summarizer.py）
     
     # リレーション
     proposal = relationship("Proposal", back_populates="evaluation")
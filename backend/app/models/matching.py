@@ -0,0 +1,51 @@
+"""
+バイヤー・提案マッチングモデル
+"""
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, JSON, Text, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base import Base, TimestampMixin
+
+
+class BuyerConfig(Base, TimestampMixin):
+    """バイヤーの要件プロファイル"""
+    __tablename__ = "buyer_configs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    name = Column(String(200), nullable=False)
+    
+    # 要件
+    industries = Column(ARRAY(String(100)), nullable=False, default=list)  # 対象業界
+    categories = Column(ARRAY(String(100)), nullable=False, default=list)  # 求める商材カテゴリ
+    keywords = Column(ARRAY(String(100)), nullable=False, default=list)
+    # 必須条件（抽出データへの条件）: [{"key": "min_lot", "op": "<=", "value": 100}, ...]
+    mandatory_conditions = Column(JSON, nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    # マッチング用の特徴量（services/matching.py が保存時に更新）
+    features = Column(ARRAY(Text), nullable=False, default=list)
+    feature_weight = Column(Float, nullable=False, default=0.0)  # 特徴量の重みの合計
+    
+    organization = relationship("Organization")
+    
+    __table_args__ = (
+        Index("ix_buyer_configs_features", "features", postgresql_using="gin"),
+    )
+
+
+class MatchCandidate(Base):
+    """事前計算したマッチング候補（バイヤー要件 × 提案）"""
+    __tablename__ = "match_candidates"
+    
+    buyer_config_id = Column(Integer, ForeignKey("buyer_configs.id", ondelete="CASCADE"), primary_key=True)
+    proposal_id = Column(Integer, ForeignKey("proposals.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # 双方向の「おすすめ」一覧を索引だけで引く
+        Index("ix_match_candidates_buyer_score", "buyer_config_id", score.desc()),
+        Index("ix_match_candidates_proposal_score", "proposal_id", score.desc()),
+    )
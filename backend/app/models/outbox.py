@@ -0,0 +1,27 @@
+"""
+トランザクショナルアウトボックス
+業務データと同じトランザクションで副作用（通知・キャッシュ無効化・パイプライン起動など）の
+イベントを書き込み、コミット後にリレー（services/outbox.py）が Redis Streams へ配信する
+"""
+from sqlalchemy import Column, BigInteger, String, DateTime, JSON, Index, text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class OutboxEvent(Base):
+    """未配信・配信済みのイベント"""
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    topic = Column(String(100), nullable=False)    # 配信先ストリーム（outbox:{topic}）
+    key = Column(String(100), nullable=True)       # 集約のID（提案IDなど）
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # リレーは未配信のイベントだけを ID 順に引く
+        Index("ix_outbox_events_unpublished", "id", postgresql_where=text("published_at IS NULL")),
+        # 配信済みイベントの削除用
+        Index("ix_outbox_events_published_at", "published_at", postgresql_where=text("published_at IS NOT NULL")),
+    )
@@ -2,7 +2,7 @@
 ポイントシステムモデル
 サプライヤーの提案に使用するポイント管理
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Numeric
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Numeric, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -18,6 +18,10 @@ class TransactionType(str, enum.Enum):
     EXPIRED = "expired"            # 期限切れ
 
 
+# 有効期限付きのロットを作る（残高を増やす）取引
+CREDIT_TRANSACTION_TYPES = (TransactionType.PURCHASE, TransactionType.BONUS, TransactionType.REFUND)
+
+
 class PointBalance(Base):
     """ポイント残高"""
     __tablename__ = "point_balances"
@@ -33,13 +37,14 @@ class PointBalance(Base):
     # リレーション
     user = relationship("User", back_populates="point_balance")
     transactions = relationship("PointTransaction", back_populates="point_balance")
+    lots = relationship("PointLot", back_populates="point_balance")
 
 
 class PointTransaction(Base):
-    """ポイント取引履歴"""
+    """ポイント取引履歴（created_at の月単位でパーティション分割）"""
     __tablename__ = "point_transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     point_balance_id = Column(Integer, ForeignKey("point_balances.id"), nullable=False)
     transaction_type = Column(SQLEnum(TransactionType), nullable=False)
     amount = Column(Integer, nullable=False)  # + for credit, - for debit
@@ -47,11 +52,43 @@ class PointTransaction(Base):
     description = Column(String(255))
     reference_id = Column(Integer)  # 関連する提案IDなど
     payment_id = Column(String(100))  # 決済ID（購入時）
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
 
     # リレーション
     point_balance = relationship("PointBalance", back_populates="transactions")
 
+    __table_args__ = (
+        # 取引履歴（新しい順）
+        Index("ix_point_transactions_balance_created", "point_balance_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class PointLot(Base):
+    """ポイントロット（付与単位の残り・有効期限）
+
+    付与（購入・ボーナス・返金）ごとに1ロットを作り、消費は古いロットから順に
+    remaining を減らす（FIFO）。残高 = 有効なロットの remaining の合計。
+    """
+    __tablename__ = "point_lots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    point_balance_id = Column(Integer, ForeignKey("point_balances.id"), nullable=False)
+    transaction_id = Column(Integer, nullable=True)  # 付与取引（移行分はNULL。取引はパーティション分割のため外部キーなし）
+    amount = Column(Integer, nullable=False)     # 付与ポイント
+    remaining = Column(Integer, nullable=False)  # 未使用ポイント
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # リレーション
+    point_balance = relationship("PointBalance", back_populates="lots")
+
+    __table_args__ = (
+        # 消費（ユーザーごとに古い順）と期限切れ処理は残りのあるロットだけを引く
+        Index("ix_point_lots_open", "point_balance_id", "id", postgresql_where=text("remaining > 0")),
+        Index("ix_point_lots_open_expiry", "expires_at", postgresql_where=text("remaining > 0")),
+    )
+
 
 class PointPackage(Base):
     """ポイントパッケージ（購入プラン）"""
@@ -1,22 +1,26 @@
 """
 提案モデル
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Text, Index, Numeric, Boolean, Computed, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
 from app.db.base import Base, TimestampMixin
 import enum
 
 
 class ProposalStatus(str, enum.Enum):
-    """提案ステータス"""
-    DRAFT = "draft"
-    SUBMITTED = "submitted"
-    ANALYZING = "analyzing"
-    QA_PENDING = "qa_pending"
-    QA_COMPLETED = "qa_completed"
-    EVALUATED = "evaluated"
-    ACCEPTED = "accepted"
-    REJECTED = "rejected"
+    """提案ステータス（遷移は services/proposal_status.py で行う）"""
+    DRAFT = "draft"                    # 下書き
+    SUBMITTED = "submitted"            # 提出済み（AI処理待ち）
+    ANALYZING = "analyzing"            # AI処理中
+    QA_PENDING = "qa_pending"          # Q&A回答待ち
+    QA_COMPLETED = "qa_completed"      # Q&A完了
+    EVALUATED = "evaluated"            # AI評価完了
+    UNDER_REVIEW = "under_review"      # バイヤー検討中
+    MEETING_SCHEDULED = "meeting"      # 面談調整中
+    ON_HOLD = "on_hold"                # 保留
+    ACCEPTED = "accepted"              # 採用
+    REJECTED = "rejected"              # 不採用
 
 
 class Proposal(Base, TimestampMixin):
@@ -27,6 +31,7 @@ class Proposal(Base, TimestampMixin):
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(Enum(ProposalStatus), default=ProposalStatus.DRAFT)
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # 楽観的排他制御（遷移ごとに加算）
     
     # 関連ID
     supplier_org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
@@ -34,16 +39,44 @@ class Proposal(Base, TimestampMixin):
     buyer_config_id = Column(Integer, nullable=True)
     
     # AI抽出データ
-    extracted_info = Column(JSON, nullable=True)
+    extracted_info = Column(JSONB, nullable=True)
+    
+    # 抽出データのうち必須条件でよく使う型付き属性（生成カラム。型が違う値は NULL）
+    info_min_lot = Column(Numeric, Computed(
+        "CASE WHEN jsonb_typeof(extracted_info->'min_lot') = 'number' "
+        "THEN (extracted_info->>'min_lot')::numeric END", persisted=True))
+    info_lead_time_weeks = Column(Numeric, Computed(
+        "CASE WHEN jsonb_typeof(extracted_info->'lead_time_weeks') = 'number' "
+        "THEN (extracted_info->>'lead_time_weeks')::numeric END", persisted=True))
+    info_iso_certified = Column(Boolean, Computed(
+        "CASE WHEN jsonb_typeof(extracted_info->'iso_certified') = 'boolean' "
+        "THEN (extracted_info->>'iso_certified')::boolean END", persisted=True))
     
     # 消費ポイント
     points_used = Column(Integer, default=300)  # 1提案あたり300ポイント
     
+    # 全文検索（services/search.py が保存時に更新）
+    search_text = Column(Text, nullable=True)  # 正規化済みのタイトル・説明・抽出テキスト
+    search_tokens = Column(ARRAY(Text), nullable=True)  # n-gram トークン
+    
+    # マッチング用の特徴量（services/matching.py が更新）
+    match_features = Column(ARRAY(Text), nullable=True)
+    
     # リレーション
     supplier_org = relationship("Organization", back_populates="proposals")
     supplier = relationship("User", back_populates="proposals", foreign_keys=[supplier_user_id])
-    documents = relationship("Document", back_populates="proposal")
     evaluation = relationship("Evaluation", back_populates="proposal", uselist=False)
     qa_sessions = relationship("QASession", back_populates="proposal")
     comments = relationship("Comment", back_populates="proposal")
     progress_history = relationship("ProposalProgress", back_populates="proposal")
+    
+    __table_args__ = (
+        Index("ix_proposals_search_tokens", "search_tokens", postgresql_using="gin"),
+        Index("ix_proposals_match_features", "match_features", postgresql_using="gin"),
+        Index("ix_proposals_extracted_info", "extracted_info", postgresql_using="gin"),
+        Index("ix_proposals_info_min_lot", "info_min_lot", postgresql_where=text("info_min_lot IS NOT NULL")),
+        Index("ix_proposals_info_lead_time_weeks", "info_lead_time_weeks",
+              postgresql_where=text("info_lead_time_weeks IS NOT NULL")),
+        Index("ix_proposals_info_iso_certified", "info_iso_certified",
+              postgresql_where=text("info_iso_certified")),
+    )
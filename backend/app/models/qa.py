@@ -0,0 +1,42 @@
+"""
+Q&Aラウンドモデル
+AIがバイヤーの代理でサプライヤーへ送る追加質問と、その回答期限
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, JSON, Index, text
+from sqlalchemy.orm import relationship
+from app.db.base import Base, TimestampMixin
+import enum
+
+
+class QASessionStatus(str, enum.Enum):
+    """Q&Aラウンドのステータス"""
+    OPEN = "open"          # 回答待ち
+    ANSWERED = "answered"  # 回答済み
+    EXPIRED = "expired"    # 期限切れ（情報不足と判定）
+
+
+class QASession(Base, TimestampMixin):
+    """Q&Aラウンド"""
+    __tablename__ = "qa_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    proposal_id = Column(Integer, ForeignKey("proposals.id", ondelete="CASCADE"), nullable=False, index=True)
+    round_number = Column(Integer, nullable=False, default=1)
+    status = Column(Enum(QASessionStatus), nullable=False, default=QASessionStatus.OPEN)
+    
+    questions = Column(JSON, nullable=False, default=list)  # [{"key": ..., "question": ...}]
+    answers = Column(JSON, nullable=True)
+    
+    # 回答期限とリマインド（services/qa_rounds.py が期限スケジューラに登録する）
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    last_reminder_hours = Column(Integer, nullable=True)  # 送信済みの最も直前のリマインド（期限の何時間前か）
+    closed_at = Column(DateTime(timezone=True), nullable=True)
+    judgement = Column(String(50), nullable=True)  # 期限切れ時の判定（情報不足）
+    
+    # リレーション
+    proposal = relationship("Proposal", back_populates="qa_sessions")
+    
+    __table_args__ = (
+        # 回答待ちのラウンドだけを期限順に引く（スケジュールの再構築用）
+        Index("ix_qa_sessions_open_due", "due_at", postgresql_where=text("status = 'OPEN'")),
+    )
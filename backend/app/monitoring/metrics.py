@@ -0,0 +1,305 @@
+"""
+性能メトリクス
+ルート別レイテンシ・SQL文数/時間・外部呼び出し時間・プール待ち時間を集計し、
+Prometheus テキスト形式で出力する
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """カウンタ（ラベル組ごとの累計値）"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """ヒストグラム
+
+    ラベル組ごとにバケット配列を初回のみ確保し、以降の observe は
+    配列要素の加算だけで済ませる。
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # [バケット別件数..., +Inf件数, 合計値, 件数]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                label_str = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {series[-2]}")
+            lines.append(f"{self.name}_count{label_str} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """スクレイプ時に値を取得するゲージ"""
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTPリクエスト処理時間",
+    ("route", "method", "status"),
+))
+HTTP_REQUEST_DB_STATEMENTS = registry.register(Histogram(
+    "http_request_db_statements", "1リクエストあたりのSQL文数",
+    ("route",), buckets=COUNT_BUCKETS,
+))
+HTTP_REQUEST_DB_SECONDS = registry.register(Counter(
+    "http_request_db_seconds_total", "ルート別のSQL実行時間の累計", ("route",),
+))
+DB_STATEMENT_DURATION = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL文の実行時間",
+))
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "接続プールからの取得待ち時間",
+))
+EXTERNAL_CALL_DURATION = registry.register(Histogram(
+    "external_call_duration_seconds", "外部サービス呼び出し時間（redis/minio/llm）",
+    ("service",),
+))
+QA_STAGE_DURATION = registry.register(Histogram(
+    "qa_stage_duration_seconds", "リアルタイムQ&Aの段階別処理時間（asr/extract/speculate/question）",
+    ("stage",),
+))
+OUTBOX_DELIVERY_LAG = registry.register(Histogram(
+    "outbox_delivery_lag_seconds", "アウトボックスのイベント作成からコンシューマ処理完了まで",
+    ("group", "topic"),
+))
+
+
+# ============ リクエスト単位の集計 ============
+
+class RequestStats:
+    """1リクエスト分の計測値"""
+
+    __slots__ = ("db_count", "db_time", "pool_wait", "external", "statements")
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.external: Optional[Dict[str, float]] = None
+        # プロファイル取得時などにのみリストを設定し、SQL文を記録する
+        self.statements: Optional[List[tuple]] = None
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """実行中リクエストの計測値（リクエスト外では None）"""
+    return _current_stats.get()
+
+
+def bind_stats(stats: RequestStats):
+    """計測値をコンテキストに設定（戻り値は unbind_stats に渡す）"""
+    return _current_stats.set(stats)
+
+
+def unbind_stats(token) -> None:
+    _current_stats.reset(token)
+
+
+def observe_call(service: str, seconds: float) -> None:
+    """外部サービス呼び出し時間を記録"""
+    EXTERNAL_CALL_DURATION.observe(seconds, (service,))
+    stats = _current_stats.get()
+    if stats is not None:
+        if stats.external is None:
+            stats.external = {}
+        stats.external[service] = stats.external.get(service, 0.0) + seconds
+
+
+def observe_qa_stage(stage: str, seconds: float) -> None:
+    """リアルタイムQ&Aの段階別処理時間を記録"""
+    QA_STAGE_DURATION.observe(seconds, (stage,))
+
+
+def observe_outbox_delivery(group: str, topic: str, seconds: float) -> None:
+    """アウトボックスのイベントの配信遅延を記録"""
+    OUTBOX_DELIVERY_LAG.observe(seconds, (group, topic))
+
+
+def record_pool_wait(seconds: float) -> None:
+    """接続プールの取得待ち時間を記録"""
+    DB_POOL_WAIT.observe(seconds)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+def instrument_engine(engine) -> None:
+    """SQLAlchemy エンジンにSQL計測フックを登録"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("metrics_query_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        DB_STATEMENT_DURATION.observe(elapsed)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.db_count += 1
+            stats.db_time += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+
+def server_timing_header(stats: RequestStats, total: float) -> str:
+    """Server-Timing ヘッダー値"""
+    parts = [
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_count} queries"',
+        f"pool;dur={stats.pool_wait * 1000:.1f}",
+    ]
+    for service, seconds in (stats.external or {}).items():
+        parts.append(f"{service};dur={seconds * 1000:.1f}")
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ルート別の性能計測を行うASGIミドルウェア"""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_path(self, scope) -> str:
+        # ルーティング後の scope に入るエンドポイントからパステンプレートを引く
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = "unmatched"
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((
+                        b"server-timing",
+                        server_timing_header(stats, time.perf_counter() - started).encode(),
+                    ))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = self._route_path(scope)
+            HTTP_REQUEST_DURATION.observe(elapsed, (route, scope["method"], str(status_holder[0])))
+            HTTP_REQUEST_DB_STATEMENTS.observe(stats.db_count, (route,))
+            if stats.db_time:
+                HTTP_REQUEST_DB_SECONDS.inc(stats.db_time, (route,))
+
+
+def render_metrics() -> str:
+    """Prometheus テキスト形式で出力"""
+    return registry.render()
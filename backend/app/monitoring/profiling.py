@@ -0,0 +1,153 @@
+"""
+オンデマンドのリクエストプロファイリング
+管理者が X-Profile ヘッダーまたは ?__profile=1 を付けたリクエストだけを
+サンプリングプロファイラで計測し、結果をストレージへ保存する
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Set
+
+from app.models.user import UserRole
+from app.monitoring.metrics import RequestStats, bind_stats, current_stats, unbind_stats
+from app.utils.lazy import lazy_import
+
+pyinstrument = lazy_import("pyinstrument")
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = b"__profile=1"
+PROFILE_KEY_PREFIX = "profiles/"
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def profile_key(profile_id: str, ext: str) -> str:
+    """保存先オブジェクトキー"""
+    return f"{PROFILE_KEY_PREFIX}{profile_id}.{ext}"
+
+
+def _is_triggered(scope) -> bool:
+    if PROFILE_QUERY in scope.get("query_string", b""):
+        return True
+    for name, _ in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return True
+    return False
+
+
+async def _resolve_admin(scope) -> Optional[int]:
+    """Bearer トークンが有効な管理者ならユーザーIDを返す"""
+    # 循環インポート回避のため遅延インポート
+    from app.api import deps
+    from app.services import user_cache
+
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                user = await user_cache.get_user(deps.decode_token(token))
+            except Exception:
+                return None
+            if user is None or not user.is_active or user.role != UserRole.ADMIN:
+                return None
+            return user.id
+    return None
+
+
+async def _save_profile(profile_id: str, html: str, meta: dict) -> None:
+    from app.services import storage
+
+    try:
+        await storage.put_bytes(profile_key(profile_id, "html"), html.encode(), "text/html")
+        await storage.put_bytes(
+            profile_key(profile_id, "json"),
+            json.dumps(meta, ensure_ascii=False, default=str).encode(),
+            "application/json",
+        )
+    except Exception:
+        logger.exception("プロファイル結果の保存に失敗しました")
+
+
+class ProfilingMiddleware:
+    """管理者が明示したリクエストだけをプロファイルするASGIミドルウェア
+
+    トリガーが無いリクエストはヘッダーを一度走査するだけで素通しする。
+    同時プロファイル数は max_concurrent で上限を設け、超えた分は通常処理する。
+    """
+
+    def __init__(self, app, max_concurrent: int = 2, interval: float = 0.001):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.interval = interval
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self.active >= self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+        user_id = await _resolve_admin(scope)
+        if user_id is None or self.active >= self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+
+        self.active += 1
+        profile_id = uuid.uuid4().hex
+        stats = current_stats()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = bind_stats(stats)
+        stats.statements = []
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler = pyinstrument.Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - started
+            statements = stats.statements
+            stats.statements = None
+            if token is not None:
+                unbind_stats(token)
+            self.active -= 1
+
+            meta = {
+                "id": profile_id,
+                "user_id": user_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status": status_holder[0],
+                "started_at": started_at,
+                "duration_ms": round(duration * 1000, 2),
+                "statements": [
+                    {"sql": sql, "duration_ms": round(elapsed * 1000, 3)}
+                    for sql, elapsed in statements
+                ],
+            }
+            task = asyncio.create_task(_save_profile(profile_id, profiler.output_html(), meta))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
@@ -0,0 +1,153 @@
+"""
+SQLクエリ予算
+エンドポイントごとに発行してよいSQL文数を宣言し、超過を検出する
+
+    @router.get("/proposals")
+    @query_budget(2)
+    async def list_proposals(...):
+        ...
+
+    async with query_budget(3, name="batch"):
+        ...
+
+QUERY_BUDGET_MODE が raise ならテストを失敗させる例外を送出し、
+warn なら文のフィンガープリント付きで構造化ログを出力する。off なら何もしない。
+"""
+import functools
+import json
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_budget: ContextVar[Optional["QueryBudget"]] = ContextVar("query_budget", default=None)
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"--[^\n]*|/\*.*?\*/", re.S), " "),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+class QueryBudgetExceeded(Exception):
+    """SQL文数が予算を超えた"""
+
+
+def fingerprint(statement: str) -> str:
+    """リテラル・パラメータを除いたSQLの正規形"""
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class QueryBudget:
+    """SQL文数の予算（コンテキストマネージャ兼デコレータ）"""
+
+    def __init__(self, limit: int, name: Optional[str] = None):
+        self.limit = limit
+        self.name = name
+        self.count = 0
+        self.statements: List[str] = []
+        self._parent: Optional["QueryBudget"] = None
+        self._token = None
+
+    def __enter__(self) -> "QueryBudget":
+        self._parent = _current_budget.get()
+        self._token = _current_budget.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_budget.reset(self._token)
+        # 本体で例外が出た場合はそちらを優先する
+        if exc_type is None:
+            self.check()
+
+    async def __aenter__(self) -> "QueryBudget":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func):
+        limit, name = self.limit, self.name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with QueryBudget(limit, name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    def record(self, statement: str) -> None:
+        budget = self
+        while budget is not None:
+            budget.count += 1
+            budget.statements.append(statement)
+            budget = budget._parent
+
+    def check(self) -> None:
+        if self.count <= self.limit:
+            return
+        top = Counter(fingerprint(s) for s in self.statements).most_common(5)
+        detail = {
+            "event": "query_budget_exceeded",
+            "budget": self.name,
+            "limit": self.limit,
+            "count": self.count,
+            "fingerprints": [{"sql": sql, "count": n} for sql, n in top],
+        }
+        if settings.QUERY_BUDGET_MODE == "raise":
+            raise QueryBudgetExceeded(json.dumps(detail, ensure_ascii=False))
+        logger.warning(json.dumps(detail, ensure_ascii=False))
+
+
+class _NoopBudget:
+    """QUERY_BUDGET_MODE=off 用（計測しない）"""
+
+    def __init__(self, limit: int, name: Optional[str] = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+    def __call__(self, func):
+        return func
+
+
+def query_budget(limit: int, name: Optional[str] = None):
+    """SQL文数の予算を宣言"""
+    if settings.QUERY_BUDGET_MODE == "off":
+        return _NoopBudget(limit, name)
+    return QueryBudget(limit, name)
+
+
+def instrument_engine(engine) -> None:
+    """SQLAlchemy エンジンに予算計測フックを登録"""
+    if settings.QUERY_BUDGET_MODE == "off":
+        return
+
+    # 実行前に数える（失敗した文もDBへの往復として予算に含める）
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        budget = _current_budget.get()
+        if budget is not None:
+            budget.record(statement)
@@ -0,0 +1,72 @@
+"""
+音声認識（ASR）アダプタ
+リアルタイムQ&Aの WebSocket で受け取ったフレームを文字起こしイベントに変換する
+
+アダプタは QA_ASR_BACKEND で切り替える。fake はクライアント側（ブラウザの
+音声認識や試験用スクリプト）で文字起こしした結果をそのままイベントにする。
+ストリーミングASR（Deepgram / Whisper など）を使う場合は、音声フレームを
+受け取る ASRAdapter を実装して ADAPTERS に登録する。
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Type, Union
+
+
+class TranscriptEvent(NamedTuple):
+    kind: str          # partial（途中結果）/ final（確定文）/ end_of_utterance（発話終了）
+    text: str = ""
+    received_at: float = 0.0  # 元になったフレームを受け取った時刻（perf_counter）
+
+
+class ASRAdapter(ABC):
+    """ASRアダプタの基底クラス（1セッションに1インスタンス）"""
+
+    name = "base"
+
+    @abstractmethod
+    async def feed(self, frame: Union[bytes, str]) -> List[TranscriptEvent]:
+        """受信フレームを渡し、得られた文字起こしイベントを返す（解釈できないフレームは ValueError）"""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeASRAdapter(ASRAdapter):
+    """クライアントが送る文字起こし（JSON）をそのままイベントにするアダプタ
+
+        {"type": "transcript", "text": "最小ロットは", "is_final": false}
+        {"type": "transcript", "text": "最小ロットは100個からです。", "is_final": true}
+        {"type": "end_of_utterance"}
+
+    音声フレーム（バイナリ）は扱わない。
+    """
+
+    name = "fake"
+
+    async def feed(self, frame: Union[bytes, str]) -> List[TranscriptEvent]:
+        received_at = time.perf_counter()
+        if isinstance(frame, bytes):
+            raise ValueError("fake ASR adapter does not accept audio frames")
+        message = json.loads(frame)
+        if not isinstance(message, dict):
+            raise ValueError("transcript frame must be a JSON object")
+        if message.get("type") == "end_of_utterance":
+            return [TranscriptEvent("end_of_utterance", "", received_at)]
+        if message.get("type") == "transcript" and message.get("text"):
+            kind = "final" if message.get("is_final") else "partial"
+            return [TranscriptEvent(kind, str(message["text"]), received_at)]
+        return []
+
+
+ADAPTERS: Dict[str, Type[ASRAdapter]] = {
+    FakeASRAdapter.name: FakeASRAdapter,
+}
+
+
+def create_adapter(name: str) -> ASRAdapter:
+    """設定名に対応するアダプタを作成"""
+    try:
+        return ADAPTERS[name]()
+    except KeyError:
+        raise ValueError(f"unknown ASR backend: {name}")
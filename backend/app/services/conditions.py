@@ -0,0 +1,193 @@
+"""
+必須条件（ノックアウト条件）の評価
+バイヤー要件の必須条件を、提案の抽出データ（JSONB）に対するSQL述語へ変換する
+
+    conditions = [
+        {"key": "min_lot", "op": "<=", "value": 1000},
+        {"key": "lead_time_weeks", "op": "<=", "value": 4},
+        {"key": "iso_certified", "op": "==", "value": True},
+    ]
+    stmt = select(Proposal).where(*compile_conditions(conditions))
+
+よく使う型付き属性は生成カラム（B-tree）に、それ以外は extracted_info の
+GINインデックス（@> / ?）に載る述語を優先して生成する。
+値が無い・型が合わない場合は不成立として扱う。check_conditions（Python側の評価）は
+同じ型の規則で評価し、どちらで判定しても結果が一致する（tests/test_conditions.py）。
+"""
+import operator
+from typing import Any, List, Optional
+
+from sqlalchemy import Numeric, String, and_, case, false, func, not_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.proposal import Proposal
+
+# 生成カラムを持つ型付き属性（抽出データのキー → (カラム, 型)）
+TYPED_ATTRIBUTES = {
+    "min_lot": (Proposal.info_min_lot, "number"),
+    "lead_time_weeks": (Proposal.info_lead_time_weeks, "number"),
+    "iso_certified": (Proposal.info_iso_certified, "boolean"),
+}
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_COMPARISONS = ("<", "<=", ">", ">=")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _json_type(value: Any) -> Optional[str]:
+    """jsonb_typeof と同じ型名"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (list, tuple)):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return None
+
+
+def _jsonb_contains(actual: Any, expected: Any) -> bool:
+    """JSONB の包含（@>）と同じ判定
+
+    型が違えば不成立（数値の 1 と真偽値の true は別物）。オブジェクトは期待値のキーを
+    すべて含むこと、配列は期待値の要素をすべて含むこと（順序・重複は問わない）。
+    """
+    kind = _json_type(expected)
+    if kind is None or _json_type(actual) != kind:
+        return False
+    if kind == "object":
+        return all(key in actual and _jsonb_contains(actual[key], value) for key, value in expected.items())
+    if kind == "array":
+        return all(any(_jsonb_contains(a, e) for a in actual) for e in expected)
+    return actual == expected
+
+
+def _check_condition(condition: dict, info: dict) -> bool:
+    key = condition["key"]
+    op = condition.get("op", "==")
+    expected = condition.get("value")
+    actual = info.get(key)
+    has_value = key in info and actual is not None
+
+    if op == "exists":
+        return has_value
+
+    typed = TYPED_ATTRIBUTES.get(key)
+    if typed is not None and op in ("==", "!=") + _COMPARISONS:
+        _, kind = typed
+        # 生成カラムは型が違う値を NULL にするため、比較は不成立
+        if kind == "number" and _is_number(expected):
+            return _is_number(actual) and _OPERATORS[op](actual, expected)
+        if kind == "boolean" and isinstance(expected, bool) and op in ("==", "!="):
+            return isinstance(actual, bool) and _OPERATORS[op](actual, expected)
+
+    if op == "==":
+        return _jsonb_contains(info, {key: expected})
+    if op == "!=":
+        return has_value and not _jsonb_contains(info, {key: expected})
+    if op == "in":
+        return isinstance(expected, (list, tuple)) and any(_jsonb_contains(info, {key: v}) for v in expected)
+    if op == "contains":
+        if isinstance(expected, str) and isinstance(actual, str) and expected in actual:
+            return True
+        return _jsonb_contains(info, {key: [expected]})
+    if op in _COMPARISONS:
+        # 数値どうし・文字列どうし（コードポイント順 = COLLATE "C"）だけを比較する
+        if _is_number(expected):
+            return _is_number(actual) and _OPERATORS[op](actual, expected)
+        if isinstance(expected, str):
+            return isinstance(actual, str) and _OPERATORS[op](actual, expected)
+    return False
+
+
+def check_conditions(conditions: Optional[List[dict]], extracted_info: Any) -> bool:
+    """必須条件をすべて満たすか（Python側の評価）
+
+    compile_conditions のSQL述語と同じ結果を返す（型の扱いはJSONBの包含・生成カラムに合わせる）。
+    """
+    if not conditions:
+        return True
+    info = extracted_info if isinstance(extracted_info, dict) else {}
+    return all(_check_condition(condition, info) for condition in conditions)
+
+
+def _typed_value(info, key: str, expected: Any) -> Optional[ColumnElement]:
+    """JSONB の値を期待値と同じ型で取り出す式（型が違えば NULL）"""
+    if _is_number(expected):
+        return case((func.jsonb_typeof(info[key]) == "number", info[key].astext.cast(Numeric)), else_=None)
+    if isinstance(expected, str):
+        return case(
+            (func.jsonb_typeof(info[key]) == "string", info[key].astext.cast(String).collate("C")), else_=None
+        )
+    return None
+
+
+def compile_condition(condition: dict) -> ColumnElement:
+    """必須条件1件をSQL述語に変換"""
+    info = Proposal.extracted_info
+    key = condition["key"]
+    op = condition.get("op", "==")
+    expected = condition.get("value")
+
+    if op == "exists":
+        # JSON の null は Python 側で「値なし」になるので除外する
+        return and_(info.has_key(key), func.jsonb_typeof(info[key]) != "null")
+
+    typed = TYPED_ATTRIBUTES.get(key)
+    if typed is not None and op in ("==", "!=") + _COMPARISONS:
+        column, kind = typed
+        if (kind == "number" and _is_number(expected)) or (
+            kind == "boolean" and isinstance(expected, bool) and op in ("==", "!=")
+        ):
+            return _OPERATORS[op](column, expected)
+
+    if op == "==":
+        return info.contains({key: expected})
+    if op == "!=":
+        return and_(
+            info.has_key(key),
+            func.jsonb_typeof(info[key]) != "null",
+            not_(info.contains({key: expected})),
+        )
+    if op == "in":
+        if not isinstance(expected, (list, tuple)) or not expected:
+            return false()
+        return or_(*[info.contains({key: value}) for value in expected])
+    if op == "contains":
+        # 配列の要素、または文字列の部分一致
+        if isinstance(expected, str):
+            return or_(
+                info.contains({key: [expected]}),
+                and_(
+                    func.jsonb_typeof(info[key]) == "string",
+                    info[key].astext.contains(expected, autoescape=True),
+                ),
+            )
+        return info.contains({key: [expected]})
+    if op in _COMPARISONS:
+        value = _typed_value(info, key, expected)
+        if value is None:
+            return false()
+        return _OPERATORS[op](value, expected)
+    return false()
+
+
+def compile_conditions(conditions: Optional[List[dict]]) -> List[ColumnElement]:
+    """必須条件をSQL述語の一覧に変換（AND で結合して使う）"""
+    return [compile_condition(c) for c in conditions or []]
@@ -0,0 +1,270 @@
+"""
+LLMに渡す文脈の選択
+資料をページ・スライド単位のチャンクで保持し、バイヤー要件や質問ごとに
+語彙（bigram BM25）と埋め込みの両方で関連チャンクを検索して、
+トークン予算に収まる分だけをプロンプトへ渡す
+
+    context, chunks = await build_context(db, proposal_id, ["最小ロット", "納期", "ISO認証"])
+"""
+import hashlib
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.services import embedding as embedding_service
+from app.services.search import normalize
+from app.services.user_cache import TTLCache
+
+# BM25 パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal Rank Fusion の定数
+RRF_K = 60
+
+
+class Chunk(NamedTuple):
+    id: int
+    source: str
+    page: int
+    chunk_index: int
+    text: str
+    token_count: int
+
+
+def estimate_tokens(text: str) -> int:
+    """推定トークン数（日本語は1文字≒1トークン、英数字は4文字≒1トークン）"""
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+def split_page(text: str, max_tokens: int) -> List[str]:
+    """ページを段落単位でまとめ、max_tokens を超えないチャンクに分割"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for paragraph in (p.strip() for p in text.split("\n")):
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            # 1段落が長すぎる場合は文字数で機械的に分割
+            step = max(1, len(paragraph) * max_tokens // tokens)
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _terms(text: str) -> List[str]:
+    """BM25 用の語（正規化テキストの bigram、出現回数を保持）"""
+    terms: List[str] = []
+    for word in normalize(text).split(" "):
+        if len(word) == 1:
+            terms.append(word)
+        terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+class ChunkIndex:
+    """1提案分のチャンクの検索インデックス（語彙＋埋め込み）"""
+
+    def __init__(self, chunks: Sequence[Chunk], embeddings: Optional[np.ndarray] = None):
+        self.chunks = list(chunks)
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: List[int] = []
+        for i, chunk in enumerate(self.chunks):
+            counts = Counter(_terms(chunk.text))
+            for term, tf in counts.items():
+                self._postings[term][i] = tf
+            self._lengths.append(sum(counts.values()))
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+        self._matrix = None
+        if embeddings is not None and len(embeddings):
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            self._matrix = embeddings / np.where(norms == 0, 1.0, norms)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def lexical_ranking(self, query: str, limit: int) -> List[int]:
+        n = len(self.chunks)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(_terms(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / self._avg_length)
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def vector_ranking(self, query_vector: Optional[Sequence[float]], limit: int) -> List[int]:
+        if self._matrix is None or query_vector is None:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        similarities = self._matrix @ q
+        limit = min(limit, len(similarities))
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        return [int(i) for i in top[np.argsort(-similarities[top])]]
+
+    def search(self, query: str, query_vector: Optional[Sequence[float]], k: int) -> List[int]:
+        """語彙・埋め込みの順位を RRF で統合した上位 k 件"""
+        fused: Dict[int, float] = defaultdict(float)
+        for ranking in (self.lexical_ranking(query, k * 4), self.vector_ranking(query_vector, k * 4)):
+            for rank, i in enumerate(ranking):
+                fused[i] += 1.0 / (RRF_K + rank + 1)
+        return sorted(fused, key=fused.get, reverse=True)[:k]
+
+
+def select_chunks(
+    index: ChunkIndex,
+    queries: Sequence[str],
+    query_vectors: Sequence[Optional[Sequence[float]]],
+    k: int,
+    token_budget: int,
+) -> List[Chunk]:
+    """クエリごとの上位チャンクを予算内で選び、資料順に並べて返す
+
+    各クエリの1位、2位…の順に採用し、すべての要件・質問に文脈が行き渡るようにする。
+    """
+    rankings = [index.search(q, v, k) for q, v in zip(queries, query_vectors)]
+    selected: Dict[int, Chunk] = {}
+    used = 0
+    for rank in range(k):
+        for ranking in rankings:
+            if rank >= len(ranking) or ranking[rank] in selected:
+                continue
+            chunk = index.chunks[ranking[rank]]
+            if used + chunk.token_count > token_budget:
+                continue
+            selected[ranking[rank]] = chunk
+            used += chunk.token_count
+    return sorted(selected.values(), key=lambda c: (c.source, c.page, c.chunk_index))
+
+
+def format_context(chunks: Sequence[Chunk]) -> str:
+    """プロンプトに埋め込む文脈（出典ページ付き）"""
+    return "\n\n".join(f"[{c.source} p.{c.page}]\n{c.text}" for c in chunks)
+
+
+# ============ チャンクストア ============
+
+_index_cache = TTLCache(maxsize=settings.CONTEXT_INDEX_CACHE_SIZE, ttl=300)
+
+
+async def index_document(db: AsyncSession, proposal_id: int, source: str, pages: Sequence[str]) -> int:
+    """資料をチャンクに分割して保存（同じ資料の既存チャンクは置き換え、コミットは呼び出し側）
+
+    同じ内容のチャンクの埋め込みは再計算せずに流用する。
+    """
+    rows = []
+    for page_no, page_text in enumerate(pages, start=1):
+        for chunk_index, text in enumerate(split_page(page_text, settings.CONTEXT_CHUNK_MAX_TOKENS)):
+            rows.append({
+                "proposal_id": proposal_id,
+                "source": source,
+                "page": page_no,
+                "chunk_index": chunk_index,
+                "text": text,
+                "content_hash": hashlib.sha256(text.encode()).hexdigest(),
+                "token_count": estimate_tokens(text),
+            })
+
+    model = embedding_service.get_model()
+    hashes = {row["content_hash"] for row in rows}
+    vectors: Dict[str, list] = {}
+    if hashes:
+        cached = await db.execute(
+            select(DocumentChunk.content_hash, DocumentChunk.embedding)
+            .where(DocumentChunk.content_hash.in_(hashes))
+            .where(DocumentChunk.embedding_model == model.name)
+            .distinct(DocumentChunk.content_hash)
+        )
+        vectors = {hash_: vector for hash_, vector in cached.all()}
+    missing = {row["content_hash"]: row["text"] for row in rows if row["content_hash"] not in vectors}
+    items = list(missing.items())
+    for start in range(0, len(items), settings.EMBEDDING_BATCH_SIZE):
+        batch = items[start:start + settings.EMBEDDING_BATCH_SIZE]
+        for (hash_, _), vector in zip(batch, await model.embed([text for _, text in batch])):
+            vectors[hash_] = vector
+    for row in rows:
+        row["embedding"] = vectors[row["content_hash"]]
+        row["embedding_model"] = model.name
+
+    await db.execute(
+        delete(DocumentChunk)
+        .where(DocumentChunk.proposal_id == proposal_id)
+        .where(DocumentChunk.source == source)
+    )
+    if rows:
+        await db.execute(insert(DocumentChunk).values(rows))
+    _index_cache.pop(proposal_id)
+    return len(rows)
+
+
+async def load_index(db: AsyncSession, proposal_id: int) -> ChunkIndex:
+    """提案のチャンクインデックス（チャンクが変わっていなければキャッシュを返す）"""
+    # 再登録するとIDが変わるので、最大IDと件数を版として扱う（他ワーカーでの更新も検知できる）
+    version = (await db.execute(
+        select(func.max(DocumentChunk.id), func.count())
+        .where(DocumentChunk.proposal_id == proposal_id)
+    )).one()
+    cached = _index_cache.get(proposal_id)
+    if cached is not None and cached[0] == tuple(version):
+        return cached[1]
+
+    result = await db.execute(
+        select(
+            DocumentChunk.id, DocumentChunk.source, DocumentChunk.page, DocumentChunk.chunk_index,
+            DocumentChunk.text, DocumentChunk.token_count, DocumentChunk.embedding,
+        )
+        .where(DocumentChunk.proposal_id == proposal_id)
+        .order_by(DocumentChunk.source, DocumentChunk.page, DocumentChunk.chunk_index)
+    )
+    rows = result.all()
+    chunks = [Chunk(*row[:6]) for row in rows]
+    embeddings = None
+    if rows and all(row[6] is not None for row in rows):
+        embeddings = np.array([row[6] for row in rows], dtype=np.float32)
+    index = ChunkIndex(chunks, embeddings)
+    _index_cache.set(proposal_id, (tuple(version), index))
+    return index
+
+
+async def build_context(
+    db: AsyncSession,
+    proposal_id: int,
+    queries: Sequence[str],
+    k: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> Tuple[str, List[Chunk]]:
+    """要件・質問ごとの関連チャンクから、予算内の文脈を組み立てる"""
+    index = await load_index(db, proposal_id)
+    if not len(index) or not queries:
+        return "", []
+    query_vectors = await embedding_service.get_model().embed(list(queries))
+    chunks = select_chunks(
+        index, queries, query_vectors,
+        k=k or settings.CONTEXT_TOP_K,
+        token_budget=token_budget or settings.CONTEXT_TOKEN_BUDGET,
+    )
+    return format_context(chunks), chunks
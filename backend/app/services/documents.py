@@ -0,0 +1,96 @@
+"""
+提案資料の取り込み
+アップロードされた資料を MinIO に保存し、ページ・スライド単位のテキストを取り出して
+チャンクストア（services/context.py）に登録する。要約（services/summarizer.py）と
+文脈の選択はこのチャンクを使う。
+"""
+import asyncio
+import io
+import os
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import context, storage
+from app.utils.lazy import lazy_import
+
+pypdf = lazy_import("pypdf")
+pptx = lazy_import("pptx")
+docx = lazy_import("docx")
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+}
+
+
+class UnsupportedDocument(Exception):
+    """テキストを取り出せない形式の資料"""
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def _pdf_pages(data: bytes) -> List[str]:
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _pptx_pages(data: bytes) -> List[str]:
+    presentation = pptx.Presentation(io.BytesIO(data))
+    return [
+        "\n".join(shape.text_frame.text for shape in slide.shapes if shape.has_text_frame)
+        for slide in presentation.slides
+    ]
+
+
+def _docx_pages(data: bytes) -> List[str]:
+    # Word はページ区切りを持たないため1ページとして扱う（チャンクへの分割は context で行う）
+    document = docx.Document(io.BytesIO(data))
+    return ["\n".join(paragraph.text for paragraph in document.paragraphs)]
+
+
+def _text_pages(data: bytes) -> List[str]:
+    return data.decode("utf-8", errors="replace").split("\f")
+
+
+_EXTRACTORS = {
+    ".pdf": _pdf_pages,
+    ".pptx": _pptx_pages,
+    ".docx": _docx_pages,
+    ".txt": _text_pages,
+    ".md": _text_pages,
+}
+
+
+def extract_pages(filename: str, data: bytes) -> List[str]:
+    """資料からページ（スライド）ごとのテキストを取り出す"""
+    extractor = _EXTRACTORS.get(_extension(filename))
+    if extractor is None:
+        raise UnsupportedDocument(f"Unsupported document type: {filename}")
+    try:
+        return extractor(data)
+    except Exception as e:
+        raise UnsupportedDocument(f"Could not read document: {filename}") from e
+
+
+def object_key(proposal_id: int, source: str) -> str:
+    return f"proposals/{proposal_id}/{source}"
+
+
+async def ingest_document(db: AsyncSession, proposal_id: int, filename: str, data: bytes) -> int:
+    """資料を保存してチャンクストアに登録し、チャンク数を返す（コミットは呼び出し側）
+
+    同じファイル名の資料は置き換える。
+    """
+    source = os.path.basename(filename)
+    # テキストの取り出しは CPU を使うためスレッドで実行
+    pages = await asyncio.to_thread(extract_pages, source, data)
+    await storage.put_bytes(
+        object_key(proposal_id, source), data, CONTENT_TYPES.get(_extension(source), "application/octet-stream")
+    )
+    return await context.index_document(db, proposal_id, source, pages)
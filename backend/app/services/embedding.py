@@ -0,0 +1,279 @@
+"""
+提案の埋め込み・類似提案検索サービス
+抽出テキストの埋め込みを pgvector（HNSW）に保持し、類似提案と重複候補を返す
+
+埋め込みはテキストの SHA-256 をキーに再利用し、内容が変わった提案だけ再計算する。
+モデルは EMBEDDING_BACKEND で切り替え可能（hashing はテスト・開発用のローカルモデル）。
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.embedding import EMBEDDING_DIM, ProposalEmbedding
+from app.models.organization import Organization
+from app.models.proposal import Proposal, ProposalStatus
+from app.monitoring.metrics import observe_call
+from app.services.search import INDEXED_FIELDS, build_search_text
+from app.utils.lazy import lazy_import
+
+openai = lazy_import("openai")
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "embedding_pending"
+_background_tasks: Set[asyncio.Task] = set()
+
+
+# ============ モデル ============
+
+class EmbeddingModel(ABC):
+    """埋め込みモデルの基底クラス"""
+
+    name = "base"
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """テキストごとの埋め込みベクトル"""
+
+
+class HashingEmbeddingModel(EmbeddingModel):
+    """文字 n-gram の特徴量ハッシュによるローカルモデル
+
+    外部APIを使わず決定的に同じベクトルを返すため、テストや開発環境で使う。
+    表記ゆれの少ない重複検知には十分な精度がある。
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, ngram_sizes: Sequence[int] = (2, 3)):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.name = f"hashing-ngram{''.join(map(str, self.ngram_sizes))}-{dim}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for n in self.ngram_sizes:
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i:i + n].encode())
+                vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(lambda: [self._embed_one(t) for t in texts])
+
+
+class OpenAIEmbeddingModel(EmbeddingModel):
+    """OpenAI Embeddings API"""
+
+    def __init__(self, model: str, dim: int = EMBEDDING_DIM):
+        self.name = model
+        self.dim = dim
+        self._client = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        started = time.perf_counter()
+        try:
+            response = await self._client.embeddings.create(
+                model=self.name, input=texts, dimensions=self.dim
+            )
+        finally:
+            observe_call("llm", time.perf_counter() - started)
+        return [item.embedding for item in response.data]
+
+
+_model: Optional[EmbeddingModel] = None
+
+
+def get_model() -> EmbeddingModel:
+    """設定に応じた埋め込みモデル"""
+    global _model
+    if _model is None:
+        if settings.EMBEDDING_BACKEND == "openai":
+            _model = OpenAIEmbeddingModel(settings.EMBEDDING_MODEL)
+        else:
+            _model = HashingEmbeddingModel()
+    return _model
+
+
+def set_model(model: Optional[EmbeddingModel]) -> None:
+    """埋め込みモデルを差し替える（テスト用。None で設定値に戻す）"""
+    global _model
+    _model = model
+
+
+# ============ 埋め込みの作成・更新 ============
+
+def embedding_text(proposal: Proposal) -> str:
+    return build_search_text(
+        proposal.title, proposal.description, proposal.extracted_info
+    )[:settings.EMBEDDING_MAX_CHARS]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def ensure_embeddings(db: AsyncSession, proposals: Sequence[Proposal]) -> int:
+    """提案の埋め込みを最新化し、新たにモデルで計算した件数を返す（コミットは呼び出し側）
+
+    内容ハッシュが一致する既存の埋め込みがあれば（他の提案のものでも）再利用する。
+    """
+    model = get_model()
+    wanted: Dict[int, Tuple[str, str]] = {}
+    for proposal in proposals:
+        text = embedding_text(proposal)
+        wanted[proposal.id] = (text, content_hash(text))
+    if not wanted:
+        return 0
+
+    current = await db.execute(
+        select(ProposalEmbedding.proposal_id, ProposalEmbedding.content_hash, ProposalEmbedding.model)
+        .where(ProposalEmbedding.proposal_id.in_(wanted))
+    )
+    for proposal_id, hash_, model_name in current.all():
+        if model_name == model.name and wanted[proposal_id][1] == hash_:
+            del wanted[proposal_id]
+    if not wanted:
+        return 0
+
+    # 内容ハッシュのキャッシュ（同一内容の提案の埋め込みを流用）
+    hashes = {hash_ for _, hash_ in wanted.values()}
+    cached = await db.execute(
+        select(ProposalEmbedding.content_hash, ProposalEmbedding.embedding)
+        .where(ProposalEmbedding.model == model.name)
+        .where(ProposalEmbedding.content_hash.in_(hashes))
+        .distinct(ProposalEmbedding.content_hash)
+    )
+    vectors: Dict[str, list] = {hash_: vector for hash_, vector in cached.all()}
+
+    missing: Dict[str, str] = {}
+    for text, hash_ in wanted.values():
+        if hash_ not in vectors:
+            missing[hash_] = text
+    items = list(missing.items())
+    for start in range(0, len(items), settings.EMBEDDING_BATCH_SIZE):
+        batch = items[start:start + settings.EMBEDDING_BATCH_SIZE]
+        for (hash_, _), vector in zip(batch, await model.embed([text for _, text in batch])):
+            vectors[hash_] = vector
+
+    rows = [
+        {"proposal_id": proposal_id, "content_hash": hash_, "model": model.name, "embedding": vectors[hash_]}
+        for proposal_id, (_, hash_) in wanted.items()
+    ]
+    stmt = insert(ProposalEmbedding).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[ProposalEmbedding.proposal_id],
+        set_={
+            "content_hash": stmt.excluded.content_hash,
+            "model": stmt.excluded.model,
+            "embedding": stmt.excluded.embedding,
+        },
+    ))
+    return len(missing)
+
+
+async def refresh_embeddings(proposal_ids: Set[int]) -> None:
+    """指定した提案の埋め込みを独立したセッションで更新"""
+    from app.db.session import async_session_maker
+
+    try:
+        async with async_session_maker() as db:
+            result = await db.execute(select(Proposal).where(Proposal.id.in_(proposal_ids)))
+            await ensure_embeddings(db, result.scalars().all())
+            await db.commit()
+    except Exception:
+        logger.exception("埋め込みの更新に失敗しました")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_proposals(session, flush_context):
+    """検索対象の属性が変わった提案を記録"""
+    proposal_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Proposal):
+            proposal_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Proposal):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+                proposal_ids.add(obj.id)
+    if proposal_ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(proposal_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    proposal_ids = session.info.pop(_PENDING_KEY, None)
+    if not proposal_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(refresh_embeddings(proposal_ids))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_proposals(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ============ 検索 ============
+
+async def find_similar(
+    db: AsyncSession,
+    proposal_id: int,
+    limit: int = 10,
+    min_similarity: float = 0.0,
+) -> List[Tuple[Proposal, str, float]]:
+    """類似提案を (提案, 組織名, コサイン類似度) の一覧で返す
+
+    下書きの提案は提出前で提案者以外に見せないため、結果に含めない。
+    対象の提案が存在しない・埋め込みが未作成の場合は空の一覧を返す。
+    """
+    target = (
+        select(ProposalEmbedding.embedding)
+        .where(ProposalEmbedding.proposal_id == proposal_id)
+        .scalar_subquery()
+    )
+    distance = ProposalEmbedding.embedding.cosine_distance(target)
+    stmt = (
+        select(Proposal, Organization.name, distance)
+        .join(ProposalEmbedding, ProposalEmbedding.proposal_id == Proposal.id)
+        .join(Organization, Organization.id == Proposal.supplier_org_id)
+        .where(
+            Proposal.id != proposal_id,
+            Proposal.status != ProposalStatus.DRAFT,
+            distance.is_not(None),
+        )
+        .order_by(distance)
+        .limit(limit)
+    )
+    if min_similarity > 0:
+        stmt = stmt.where(distance <= 1 - min_similarity)
+    result = await db.execute(stmt)
+    return [(p, org_name, round(1 - d, 4)) for p, org_name, d in result.all()]
+
+
+async def find_duplicates(db: AsyncSession, proposal: Proposal) -> List[Tuple[Proposal, str, float]]:
+    """重複候補（類似度が DUPLICATE_SIMILARITY_THRESHOLD 以上の提出済みの提案）"""
+    await ensure_embeddings(db, [proposal])
+    return await find_similar(
+        db, proposal.id,
+        limit=settings.DUPLICATE_CANDIDATES_LIMIT,
+        min_similarity=settings.DUPLICATE_SIMILARITY_THRESHOLD,
+    )
@@ -0,0 +1,177 @@
+"""
+ヘルスチェックサービス
+依存サービスをバックグラウンドで定期的に確認し、結果をキャッシュする
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.db.session import engine
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+# 準備完了判定に使う依存サービス
+CRITICAL_PROBES = ("database", "redis")
+
+
+def pool_stats() -> dict:
+    """DB接続プールの使用状況"""
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(0, pool.overflow()),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+async def _probe_database() -> dict:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return {}
+
+
+async def _probe_redis() -> dict:
+    await redis_client.ping()
+    return {}
+
+
+async def _probe_storage() -> dict:
+    if not await storage.probe_bucket():
+        raise RuntimeError(f"bucket '{settings.MINIO_BUCKET}' not found")
+    return {}
+
+
+class HealthMonitor:
+    """依存サービスの定期確認と結果のキャッシュ
+
+    エンドポイントはキャッシュを返すだけなので、障害時にも
+    ヘルスチェック自体が依存サービスへ負荷をかけない。
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self._probes: Dict[str, Callable[[], Awaitable[dict]]] = {
+            "database": _probe_database,
+            "redis": _probe_redis,
+            "storage": _probe_storage,
+        }
+        self._queues: Dict[str, Callable[[], int]] = {}
+        self._results: Dict[str, dict] = {}
+        self._checked_at: Optional[float] = None
+        self._loop_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def register_queue(self, name: str, depth: Callable[[], int]) -> None:
+        """待ち行列の深さを報告する関数を登録（LLMゲートウェイ等）"""
+        self._queues[name] = depth
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.run_probes()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            # 予定より遅れて起きた分をイベントループの遅延とみなす
+            self._loop_lag_ms = max(0.0, (time.monotonic() - started - self.interval) * 1000)
+            try:
+                await self.run_probes()
+            except Exception:
+                logger.exception("ヘルスチェックの実行に失敗しました")
+
+    async def _probe(self, name: str, probe) -> dict:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(probe(), timeout=self.timeout)
+            result = {"status": "connected", **detail}
+        except Exception as e:
+            result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def run_probes(self) -> None:
+        """全プローブを並行実行して結果を更新"""
+        names = list(self._probes)
+        results = await asyncio.gather(*[self._probe(n, self._probes[n]) for n in names])
+        self._results = dict(zip(names, results))
+        self._checked_at = time.time()
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {}
+        for name, depth in self._queues.items():
+            try:
+                depths[name] = depth()
+            except Exception:
+                depths[name] = -1
+        return depths
+
+    @property
+    def is_stale(self) -> bool:
+        """結果が古すぎる（監視ループが止まっている）"""
+        if self._checked_at is None:
+            return True
+        return time.time() - self._checked_at > self.interval * 3 + self.timeout
+
+    def snapshot(self) -> dict:
+        """キャッシュ済みのヘルス情報"""
+        healthy = not self.is_stale and all(
+            self._results.get(name, {}).get("status") == "connected" for name in self._probes
+        )
+        return {
+            "status": "healthy" if healthy else "degraded",
+            **{name: result.get("status") for name, result in self._results.items()},
+            "checked_at": self._checked_at,
+            "probes": self._results,
+        }
+
+    def readiness(self) -> dict:
+        """リクエスト受付可否（プール飽和・待ち行列の滞留を含む）"""
+        pool = pool_stats()
+        queues = self.queue_depths()
+        reasons = []
+        if self.is_stale:
+            reasons.append("health probes are stale")
+        for name in CRITICAL_PROBES:
+            if self._results.get(name, {}).get("status") != "connected":
+                reasons.append(f"{name} unavailable")
+        if pool["saturation"] >= settings.HEALTH_POOL_SATURATION_THRESHOLD:
+            reasons.append("database pool saturated")
+        for name, depth in queues.items():
+            if depth > settings.HEALTH_QUEUE_DEPTH_THRESHOLD:
+                reasons.append(f"{name} queue lagging")
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "pool": pool,
+            "queues": queues,
+            "event_loop_lag_ms": round(self._loop_lag_ms, 1),
+            "checked_at": self._checked_at,
+        }
+
+
+health_monitor = HealthMonitor(
+    interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+)
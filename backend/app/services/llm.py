@@ -0,0 +1,144 @@
+"""
+LLMクライアント
+同時実行数と待ち行列を制限してチャット補完APIを呼び出す
+
+上限を超えた要求は LLMBusy で即座に拒否し、API側のレート制限や
+遅延がアプリ全体へ波及しないようにする。待ち行列の深さは
+ヘルスチェック（llm）に報告する。
+
+stream() の呼び出し元が途中で打ち切る（クライアント切断など）と、
+上流のHTTP接続も閉じて生成を止める。
+"""
+import asyncio
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.monitoring.metrics import observe_call
+from app.utils.lazy import lazy_import
+
+openai = lazy_import("openai")
+
+
+class LLMBusy(Exception):
+    """LLM呼び出しの待ち行列が上限に達した"""
+
+
+class LLMClient:
+    """有界な同時実行数でのチャット補完
+
+    同時実行数 max_concurrency、待ち行列 max_queue を超える要求は
+    LLMBusy で拒否する。
+    """
+
+    def __init__(self, model: str, max_concurrency: int, max_queue: int, timeout: float):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self.calls = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client = None
+
+    @property
+    def queue_depth(self) -> int:
+        """実行枠待ちの件数"""
+        return max(0, self.in_flight - self.max_concurrency)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "calls": self.calls,
+        }
+
+    def _options(self, json_mode: bool) -> dict:
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, timeout=self.timeout)
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    async def _create(self, messages: List[Dict[str, str]], max_tokens: int, json_mode: bool) -> str:
+        options = self._options(json_mode)
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0,
+            **options,
+        )
+        return response.choices[0].message.content or ""
+
+    async def _create_stream(
+        self, messages: List[Dict[str, str]], max_tokens: int, json_mode: bool
+    ) -> AsyncIterator[str]:
+        options = self._options(json_mode)
+        stream = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0,
+            stream=True,
+            **options,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.response.aclose()
+
+    @asynccontextmanager
+    async def _slot(self):
+        """実行枠の確保（上限を超えたら LLMBusy）"""
+        if self.in_flight >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise LLMBusy()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    yield
+                finally:
+                    self.calls += 1
+                    observe_call("llm", time.perf_counter() - started)
+        finally:
+            self.in_flight -= 1
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1024,
+        json_mode: bool = False,
+    ) -> str:
+        """チャット補完の本文を返す"""
+        async with self._slot():
+            return await self._create(messages, max_tokens, json_mode)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1024,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """チャット補完の本文を生成されたそばから返す"""
+        async with self._slot():
+            async with aclosing(self._create_stream(messages, max_tokens, json_mode)) as chunks:
+                async for text in chunks:
+                    yield text
+
+
+llm_client = LLMClient(
+    model=settings.LLM_MODEL,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+)
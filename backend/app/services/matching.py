@@ -0,0 +1,307 @@
+"""
+バイヤー・提案マッチングサービス
+バイヤー要件と提案をそれぞれ特徴量（industry:/category:/keyword:）の配列にし、
+GINインデックスを転置インデックスとして候補を絞り込んだ上でSQL内で一括スコアリングする
+
+スコアは「バイヤー要件の特徴量の重みのうち、提案が満たす割合」（0〜1）。
+必須条件は services/conditions.py でSQL述語に変換してデータベース側で除外する。
+結果は match_candidates に保存し、おすすめ一覧は索引1回の参照で返す。
+提案の提出・更新やバイヤー要件の変更時に、該当する側だけを再計算する。
+"""
+import asyncio
+import logging
+from typing import Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.matching import BuyerConfig, MatchCandidate
+from app.models.organization import Organization
+from app.models.proposal import Proposal, ProposalStatus
+from app.services.conditions import check_conditions, compile_conditions
+from app.services.search import normalize
+
+logger = logging.getLogger(__name__)
+
+FEATURE_WEIGHTS = {"industry": 3.0, "category": 2.0, "keyword": 1.0}
+
+# マッチング対象外のステータス
+EXCLUDED_STATUSES = (ProposalStatus.DRAFT, ProposalStatus.REJECTED)
+
+# 提案側の再計算が必要な属性
+PROPOSAL_MATCH_FIELDS = ("status", "title", "extracted_info")
+BUYER_MATCH_FIELDS = ("industries", "categories", "keywords", "mandatory_conditions", "is_active")
+
+_PENDING_PROPOSALS_KEY = "matching_pending_proposals"
+_PENDING_BUYERS_KEY = "matching_pending_buyers"
+_background_tasks: Set[asyncio.Task] = set()
+
+
+# ============ 特徴量 ============
+
+def _feature(kind: str, value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = normalize(value)
+    return f"{kind}:{value}" if value else None
+
+
+def _values(info: dict, *keys: str) -> List[Any]:
+    values: List[Any] = []
+    for key in keys:
+        value = info.get(key)
+        if isinstance(value, list):
+            values.extend(value)
+        elif value is not None:
+            values.append(value)
+    return values
+
+
+def build_features(industries: Iterable[Any], categories: Iterable[Any], keywords: Iterable[Any]) -> List[str]:
+    features = set()
+    for kind, values in (("industry", industries), ("category", categories), ("keyword", keywords)):
+        for value in values:
+            feature = _feature(kind, value)
+            if feature:
+                features.add(feature)
+    return sorted(features)
+
+
+def proposal_features(industry: Optional[str], extracted_info: Any) -> List[str]:
+    """提案の特徴量（組織の業界＋抽出データのカテゴリ・キーワード）"""
+    info = extracted_info if isinstance(extracted_info, dict) else {}
+    return build_features(
+        [industry, *_values(info, "industry", "industries")],
+        _values(info, "category", "categories"),
+        _values(info, "keywords"),
+    )
+
+
+def feature_weight(features: Sequence[str]) -> float:
+    return sum(FEATURE_WEIGHTS[f.split(":", 1)[0]] for f in features)
+
+
+def apply_buyer_features(config: BuyerConfig) -> None:
+    config.features = build_features(config.industries or [], config.categories or [], config.keywords or [])
+    config.feature_weight = feature_weight(config.features)
+
+
+def _weighted_overlap(column, features: Sequence[str]):
+    """column（特徴量配列）に含まれる features の重みの合計（SQL式）"""
+    return sum(
+        case((column.contains([f]), FEATURE_WEIGHTS[f.split(":", 1)[0]]), else_=0.0)
+        for f in features
+    )
+
+
+# ============ 候補の再計算 ============
+
+async def refresh_proposal_candidates(db: AsyncSession, proposal_ids: Iterable[int]) -> int:
+    """提案ごとのバイヤー候補を作り直す（コミットは呼び出し側）"""
+    proposal_ids = list(proposal_ids)
+    result = await db.execute(
+        select(Proposal.id, Proposal.status, Proposal.extracted_info, Proposal.match_features, Organization.industry)
+        .join(Organization, Organization.id == Proposal.supplier_org_id)
+        .where(Proposal.id.in_(proposal_ids))
+    )
+    await db.execute(delete(MatchCandidate).where(MatchCandidate.proposal_id.in_(proposal_ids)))
+
+    total = 0
+    buyer_ids: Set[int] = set()
+    for proposal_id, status, extracted_info, current_features, industry in result.all():
+        features = proposal_features(industry, extracted_info)
+        # 変わった場合だけ書き込む（提案の行ロックを取らず、updated_at も進めない）
+        if features != (current_features or []):
+            await db.execute(
+                update(Proposal)
+                .where(Proposal.id == proposal_id)
+                .values(match_features=features, updated_at=Proposal.updated_at)
+            )
+        if status in EXCLUDED_STATUSES or not features:
+            continue
+
+        score = _weighted_overlap(BuyerConfig.features, features) / BuyerConfig.feature_weight
+        buyers = await db.execute(
+            select(BuyerConfig.id, BuyerConfig.mandatory_conditions, score)
+            .where(BuyerConfig.is_active == True)
+            .where(BuyerConfig.feature_weight > 0)
+            .where(BuyerConfig.features.overlap(features))
+        )
+        rows = [
+            {"buyer_config_id": buyer_id, "proposal_id": proposal_id, "score": round(value, 4)}
+            for buyer_id, conditions, value in buyers.all()
+            if check_conditions(conditions, extracted_info)
+        ]
+        if rows:
+            await db.execute(insert(MatchCandidate).values(rows).on_conflict_do_nothing())
+            total += len(rows)
+            buyer_ids.update(row["buyer_config_id"] for row in rows)
+    if buyer_ids:
+        await _trim_buyer_candidates(db, buyer_ids)
+    return total
+
+
+async def _trim_buyer_candidates(db: AsyncSession, buyer_config_ids: Set[int]) -> None:
+    """バイヤー要件ごとの候補を MATCH_CANDIDATES_PER_BUYER 件に切り詰める
+
+    順位は refresh_buyer_candidates と同じ（スコアの高い順、同点は新しい提案を優先）。
+    """
+    ranked = (
+        select(
+            MatchCandidate.buyer_config_id,
+            MatchCandidate.proposal_id,
+            func.row_number().over(
+                partition_by=MatchCandidate.buyer_config_id,
+                order_by=(MatchCandidate.score.desc(), Proposal.created_at.desc()),
+            ).label("rank"),
+        )
+        .join(Proposal, Proposal.id == MatchCandidate.proposal_id)
+        .where(MatchCandidate.buyer_config_id.in_(buyer_config_ids))
+        .subquery()
+    )
+    await db.execute(
+        delete(MatchCandidate)
+        .where(
+            MatchCandidate.buyer_config_id == ranked.c.buyer_config_id,
+            MatchCandidate.proposal_id == ranked.c.proposal_id,
+            ranked.c.rank > settings.MATCH_CANDIDATES_PER_BUYER,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def refresh_buyer_candidates(db: AsyncSession, buyer_config_ids: Iterable[int]) -> int:
+    """バイヤー要件ごとの提案候補を作り直す（コミットは呼び出し側）"""
+    total = 0
+    for config_id in buyer_config_ids:
+        await db.execute(delete(MatchCandidate).where(MatchCandidate.buyer_config_id == config_id))
+        config = await db.get(BuyerConfig, config_id)
+        if config is None or not config.is_active or not config.features:
+            continue
+
+        score = (_weighted_overlap(Proposal.match_features, config.features) / config.feature_weight).label("score")
+        # 必須条件はSQL述語に変換し、インデックスで絞り込んでからスコアリングする
+        result = await db.execute(
+            select(Proposal.id, score)
+            .where(Proposal.match_features.overlap(config.features))
+            .where(Proposal.status.not_in(EXCLUDED_STATUSES))
+            .where(*compile_conditions(config.mandatory_conditions))
+            .order_by(score.desc(), Proposal.created_at.desc())
+            .limit(settings.MATCH_CANDIDATES_PER_BUYER)
+        )
+        rows = [
+            {"buyer_config_id": config_id, "proposal_id": proposal_id, "score": round(value, 4)}
+            for proposal_id, value in result.all()
+        ]
+        if rows:
+            await db.execute(insert(MatchCandidate).values(rows).on_conflict_do_nothing())
+            total += len(rows)
+    return total
+
+
+async def _refresh(proposal_ids: Set[int], buyer_config_ids: Set[int]) -> None:
+    from app.db.session import async_session_maker
+
+    try:
+        async with async_session_maker() as db:
+            if proposal_ids:
+                await refresh_proposal_candidates(db, proposal_ids)
+            if buyer_config_ids:
+                await refresh_buyer_candidates(db, buyer_config_ids)
+            await db.commit()
+    except Exception:
+        logger.exception("マッチング候補の更新に失敗しました")
+
+
+def _has_changes(obj, fields: Sequence[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def queue_proposal_refresh(session, proposal_ids: Iterable[int]) -> None:
+    """コミット後に候補を更新する提案を登録（ORM の属性変更を経由せずに更新した場合に使う）"""
+    session.info.setdefault(_PENDING_PROPOSALS_KEY, set()).update(proposal_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _index_buyer_configs(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, BuyerConfig):
+            apply_buyer_features(obj)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    """マッチングに影響する変更を記録"""
+    proposal_ids, buyer_ids = set(), set()
+    for obj in session.new:
+        if isinstance(obj, Proposal):
+            proposal_ids.add(obj.id)
+        elif isinstance(obj, BuyerConfig):
+            buyer_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Proposal) and _has_changes(obj, PROPOSAL_MATCH_FIELDS):
+            proposal_ids.add(obj.id)
+        elif isinstance(obj, BuyerConfig) and _has_changes(obj, BUYER_MATCH_FIELDS):
+            buyer_ids.add(obj.id)
+    if proposal_ids:
+        session.info.setdefault(_PENDING_PROPOSALS_KEY, set()).update(proposal_ids)
+    if buyer_ids:
+        session.info.setdefault(_PENDING_BUYERS_KEY, set()).update(buyer_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    proposal_ids = session.info.pop(_PENDING_PROPOSALS_KEY, None)
+    buyer_ids = session.info.pop(_PENDING_BUYERS_KEY, None)
+    if not proposal_ids and not buyer_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_refresh(proposal_ids or set(), buyer_ids or set()))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_PROPOSALS_KEY, None)
+    session.info.pop(_PENDING_BUYERS_KEY, None)
+
+
+# ============ 参照 ============
+
+async def recommended_proposals(
+    db: AsyncSession, buyer_config_id: int, offset: int = 0, limit: int = 20
+) -> List[Tuple[Proposal, str, float]]:
+    """バイヤー要件へのおすすめ提案（事前計算済みの候補を参照するだけ）"""
+    result = await db.execute(
+        select(Proposal, Organization.name, MatchCandidate.score)
+        .join(Proposal, Proposal.id == MatchCandidate.proposal_id)
+        .join(Organization, Organization.id == Proposal.supplier_org_id)
+        .where(MatchCandidate.buyer_config_id == buyer_config_id)
+        .order_by(MatchCandidate.score.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def buyer_candidates(
+    db: AsyncSession, proposal_id: int, limit: int = 20
+) -> List[Tuple[BuyerConfig, str, float]]:
+    """提案に合うバイヤー要件"""
+    result = await db.execute(
+        select(BuyerConfig, Organization.name, MatchCandidate.score)
+        .join(BuyerConfig, BuyerConfig.id == MatchCandidate.buyer_config_id)
+        .join(Organization, Organization.id == BuyerConfig.organization_id)
+        .where(MatchCandidate.proposal_id == proposal_id)
+        .order_by(MatchCandidate.score.desc())
+        .limit(limit)
+    )
+    return result.all()
@@ -0,0 +1,405 @@
+"""
+通知サービス
+大量通知の一括作成と未読数カウンタの更新
+"""
+import asyncio
+import itertools
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.db.session import async_session_maker
+from app.models.comment import Notification
+from app.services.realtime import queue_event
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_COLUMNS = (
+    "user_id", "title", "message", "link",
+    "is_read", "notification_type", "reference_id",
+)
+
+# この件数以上は COPY で書き込む（asyncpg のみ）
+COPY_THRESHOLD = 1000
+
+UNREAD_KEY_PREFIX = "notifications:unread:"
+_UNREAD_PENDING_KEY = "unread_increments"
+
+# create_task で投げたカウンタ更新タスクの参照保持（GC対策）
+_background_tasks = set()
+
+# 既に初期化済みのカウンタだけを加算する（未初期化のキーはDBから再計算させる）
+_INCR_EXISTING_SCRIPT = """
+for i, key in ipairs(KEYS) do
+  if redis.call('EXISTS', key) == 1 then
+    redis.call('INCRBY', key, ARGV[i])
+  end
+end
+return #KEYS
+"""
+
+# 初期化済みのカウンタだけを減算（0未満にはしない）
+_DECR_EXISTING_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  local value = redis.call('DECRBY', KEYS[1], ARGV[1])
+  if value < 0 then
+    redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+  end
+end
+return 1
+"""
+
+
+def unread_key(user_id: int) -> str:
+    """未読数カウンタのキー"""
+    return f"{UNREAD_KEY_PREFIX}{user_id}"
+
+
+def build_notification(
+    user_id: int,
+    title: str,
+    message: str,
+    link: Optional[str] = None,
+    notification_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+) -> dict:
+    """通知1件分の行データを作成"""
+    return {
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "link": link,
+        "is_read": False,
+        "notification_type": notification_type,
+        "reference_id": reference_id,
+    }
+
+
+def _coalesce_key(row: dict, seq) -> tuple:
+    """重複判定キー（参照先のない通知はまとめない）"""
+    if row.get("reference_id") is None:
+        return (row["user_id"], row.get("notification_type"), None, next(seq))
+    return (row["user_id"], row.get("notification_type"), row["reference_id"])
+
+
+def coalesce_notifications(rows: Iterable[dict]) -> List[dict]:
+    """同一ユーザー・同一種別・同一参照先の重複通知をまとめる（後勝ち）"""
+    seq = itertools.count()
+    merged: Dict[tuple, dict] = {}
+    for row in rows:
+        key = _coalesce_key(row, seq)
+        merged.pop(key, None)
+        merged[key] = row
+    return list(merged.values())
+
+
+async def incr_unread_counts(counts: Dict[int, int]) -> None:
+    """未読数カウンタを加算（初期化済みのキーのみ）"""
+    if not counts:
+        return
+    user_ids = list(counts)
+    await redis_client.eval(
+        _INCR_EXISTING_SCRIPT,
+        len(user_ids),
+        *[unread_key(user_id) for user_id in user_ids],
+        *[counts[user_id] for user_id in user_ids],
+    )
+
+
+async def decr_unread_count(user_id: int, amount: int = 1) -> None:
+    """未読数カウンタを減算（初期化済みのキーのみ）"""
+    await redis_client.eval(_DECR_EXISTING_SCRIPT, 1, unread_key(user_id), amount)
+
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    """未読通知数を取得
+
+    通常はRedisのカウンタを返す。カウンタが無い場合のみ
+    未読部分インデックスを使ってDBで数え、カウンタを初期化する。
+    """
+    key = unread_key(user_id)
+    try:
+        cached = await redis_client.get(key)
+    except Exception:
+        logger.exception("未読数カウンタの取得に失敗しました")
+        cached = None
+    if cached is not None:
+        return int(cached)
+
+    result = await db.execute(
+        select(func.count(Notification.id))
+        .where(Notification.user_id == user_id)
+        .where(Notification.is_read == False)
+    )
+    count = result.scalar() or 0
+    try:
+        await redis_client.set(key, count, ex=settings.UNREAD_COUNTER_TTL_SECONDS, nx=True)
+    except Exception:
+        logger.exception("未読数カウンタの初期化に失敗しました")
+    return count
+
+
+async def mark_notification_read(db: AsyncSession, user_id: int, notification_id: int) -> bool:
+    """通知を既読にする（通知が存在しなければ False）"""
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.id == notification_id)
+        .where(Notification.user_id == user_id)
+        .where(Notification.is_read == False)
+        .values(is_read=True)
+        .returning(Notification.id)
+    )
+    changed = result.scalar_one_or_none() is not None
+    if not changed:
+        exists = await db.execute(
+            select(Notification.id)
+            .where(Notification.id == notification_id)
+            .where(Notification.user_id == user_id)
+        )
+        if exists.scalar_one_or_none() is None:
+            return False
+    await db.commit()
+
+    if changed:
+        try:
+            await decr_unread_count(user_id)
+        except Exception:
+            logger.exception("未読数カウンタの更新に失敗しました")
+    return True
+
+
+async def mark_all_notifications_read(db: AsyncSession, user_id: int) -> int:
+    """全通知を既読にする（既読にした件数を返す）"""
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.user_id == user_id)
+        .where(Notification.is_read == False)
+        .values(is_read=True)
+    )
+    await db.commit()
+
+    try:
+        await redis_client.set(
+            unread_key(user_id), 0, ex=settings.UNREAD_COUNTER_TTL_SECONDS
+        )
+    except Exception:
+        logger.exception("未読数カウンタの更新に失敗しました")
+    return result.rowcount
+
+
+async def reconcile_unread_counts(batch_size: int = 1000) -> int:
+    """Redis上の未読数カウンタをDBの実数で補正（補正したキー数を返す）"""
+    fixed = 0
+    keys: List[str] = []
+    async for key in redis_client.scan_iter(match=f"{UNREAD_KEY_PREFIX}*", count=batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            fixed += await _reconcile_batch(keys)
+            keys = []
+    if keys:
+        fixed += await _reconcile_batch(keys)
+    return fixed
+
+
+async def _reconcile_batch(keys: List[str]) -> int:
+    user_ids = [int(key[len(UNREAD_KEY_PREFIX):]) for key in keys]
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(Notification.user_id, func.count(Notification.id))
+            .where(Notification.user_id.in_(user_ids))
+            .where(Notification.is_read == False)
+            .group_by(Notification.user_id)
+        )
+        counts = dict(result.all())
+
+    cached = await redis_client.mget(keys)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        fixed = 0
+        for user_id, key, value in zip(user_ids, keys, cached):
+            actual = counts.get(user_id, 0)
+            if value is None or int(value) != actual:
+                pipe.set(key, actual, ex=settings.UNREAD_COUNTER_TTL_SECONDS, xx=True)
+                fixed += 1
+        await pipe.execute()
+    return fixed
+
+
+# ============ ORM経由の通知作成 ============
+
+@event.listens_for(Session, "after_flush")
+def _collect_unread_increments(session, flush_context):
+    """db.add された未読通知を数えておく"""
+    counts = Counter(
+        obj.user_id for obj in session.new
+        if isinstance(obj, Notification) and not obj.is_read
+    )
+    if counts:
+        session.info.setdefault(_UNREAD_PENDING_KEY, Counter()).update(counts)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_unread_increments(session):
+    """コミット成功後に未読数カウンタを加算"""
+    counts = session.info.pop(_UNREAD_PENDING_KEY, None)
+    if not counts:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(incr_unread_counts(dict(counts)))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_unread_increments(session):
+    session.info.pop(_UNREAD_PENDING_KEY, None)
+
+
+async def _copy_notifications(db: AsyncSession, rows: List[dict]) -> None:
+    """COPY による一括書き込み"""
+    conn = await db.connection()
+    # COPY を同一トランザクションに載せるため、ドライバ側のトランザクションを先に開始させる
+    await conn.execute(select(1))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Notification.__tablename__,
+        records=[tuple(row.get(c) for c in NOTIFICATION_COLUMNS) for row in rows],
+        columns=list(NOTIFICATION_COLUMNS),
+    )
+
+
+async def bulk_create_notifications(
+    db: AsyncSession,
+    rows: Iterable[dict],
+    coalesce: bool = True,
+) -> int:
+    """通知を一括作成する（コミットは呼び出し側）
+
+    行ごとの db.add を避け、executemany（大量時は COPY）で書き込む。
+    未読数カウンタはコミット後に加算する。
+    """
+    rows = coalesce_notifications(rows) if coalesce else list(rows)
+    if not rows:
+        return 0
+
+    if len(rows) >= COPY_THRESHOLD and db.get_bind().dialect.driver == "asyncpg":
+        await _copy_notifications(db, rows)
+    else:
+        await db.execute(insert(Notification), rows)
+
+    for row in rows:
+        queue_event(db, row["user_id"], "notification", {
+            "title": row["title"],
+            "message": row["message"],
+            "link": row.get("link"),
+            "notification_type": row.get("notification_type"),
+            "reference_id": row.get("reference_id"),
+        })
+    # db.add の通知と同じく after_commit で加算する
+    db.info.setdefault(_UNREAD_PENDING_KEY, Counter()).update(row["user_id"] for row in rows)
+    return len(rows)
+
+
+async def broadcast_notification(
+    db: AsyncSession,
+    user_ids: Iterable[int],
+    title: str,
+    message: str,
+    link: Optional[str] = None,
+    notification_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+) -> int:
+    """同一内容の通知を複数ユーザーへ一括送信（コミットは呼び出し側）"""
+    rows = [
+        build_notification(user_id, title, message, link, notification_type, reference_id)
+        for user_id in set(user_ids)
+    ]
+    return await bulk_create_notifications(db, rows, coalesce=False)
+
+
+class NotificationBatcher:
+    """短時間ウィンドウで通知をまとめて書き込むバッファ
+
+    ウィンドウ内の重複イベントはユーザー単位でまとめられ、
+    ウィンドウ満了またはバッファ上限で一括書き込みされる。
+    """
+
+    def __init__(self, window_seconds: float = 0.2, max_batch: int = 5000):
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._buffer: Dict[tuple, dict] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        """書き込み待ちの件数"""
+        return len(self._buffer)
+
+    def enqueue(self, row: dict) -> None:
+        """通知をバッファに追加"""
+        key = _coalesce_key(row, self._seq)
+        self._buffer.pop(key, None)
+        self._buffer[key] = row
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """書き込みループを開始"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """書き込みループを停止し、残りを書き出す"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """バッファの内容を書き込む
+
+        書き込みに失敗した通知はバッファに残し、次回の書き込みで再試行する。
+        """
+        if not self._buffer:
+            return 0
+        items = list(self._buffer.items())
+        async with async_session_maker() as db:
+            written = await bulk_create_notifications(db, [row for _, row in items], coalesce=False)
+            await db.commit()
+        # 書き込み中に追加・置き換えられた通知は残す
+        for key, row in items:
+            if self._buffer.get(key) is row:
+                del self._buffer[key]
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("通知の一括書き込みに失敗しました")
+
+
+notification_batcher = NotificationBatcher(
+    window_seconds=settings.NOTIFICATION_BATCH_WINDOW_SECONDS,
+    max_batch=settings.NOTIFICATION_BATCH_MAX,
+)
@@ -0,0 +1,353 @@
+"""
+トランザクショナルアウトボックス
+書き込み系のAPIは副作用をイベント（outbox_events）として業務データと同じトランザクションで
+書き込むだけにし、コミットが成功した時点で応答を返す。
+
+    API  ── 同一トランザクション ──▶ outbox_events
+    OutboxRelay   未配信のイベントを ID 順にまとめて Redis Streams（outbox:{topic}）へ XADD
+    OutboxConsumer  コンシューマグループごとに XREADGROUP で受け取り、処理後に XACK
+
+配信は少なくとも1回（at-least-once）。リレーが XADD の後・配信済みの記録前に落ちると
+同じイベントが再送されるため、コンシューマはイベントIDで処理済みを記録して重複を捨てる。
+処理中に落ちたコンシューマのメッセージは OUTBOX_CLAIM_IDLE_SECONDS 後に他が引き取る。
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from redis.exceptions import ResponseError
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.db.session import async_session_maker
+from app.models.outbox import OutboxEvent
+from app.monitoring.metrics import observe_outbox_delivery
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "outbox:"
+DEDUP_PREFIX = "outbox:done:"
+# 処理済み記録の値（処理中 / 処理済み）
+_PROCESSING = "processing"
+_DONE = "done"
+_PENDING_KEY = "outbox_pending"
+
+# トピック
+PROPOSAL_SUBMITTED = "proposal.submitted"
+PROPOSAL_STATUS_CHANGED = "proposal.status_changed"
+
+PURGE_INTERVAL_SECONDS = 60
+PURGE_BATCH_SIZE = 10000
+# 未配信件数はこの件数で打ち切って数える（ヘルスチェック用）
+PENDING_COUNT_CAP = 10000
+
+
+def stream_key(topic: str) -> str:
+    return f"{STREAM_PREFIX}{topic}"
+
+
+def add_event(db: AsyncSession, topic: str, payload: dict, key: Optional[object] = None) -> OutboxEvent:
+    """イベントをアウトボックスに追加（呼び出し側のトランザクションでコミットされる）"""
+    outbox_event = OutboxEvent(topic=topic, key=str(key) if key is not None else None, payload=payload)
+    db.add(outbox_event)
+    return outbox_event
+
+
+# ============ リレー ============
+
+class OutboxRelay:
+    """未配信のイベントを Redis Streams へ送るリレー
+
+    複数のワーカーで動かしても FOR UPDATE SKIP LOCKED で同じ行を同時に送らない。
+    同一プロセスのコミットでは即座に起こされ、他プロセスの分は poll_interval ごとに拾う。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        stream_maxlen: int = 100000,
+        retention_seconds: float = 86400,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stream_maxlen = stream_maxlen
+        self.retention_seconds = retention_seconds
+        self.pending_count = 0
+        self.lag_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def relay_once(self) -> int:
+        """未配信のイベントを1バッチ送り、送った件数を返す"""
+        unpublished = OutboxEvent.published_at.is_(None)
+        async with async_session_maker() as db:
+            rows = (await db.execute(
+                select(
+                    OutboxEvent.id, OutboxEvent.topic, OutboxEvent.key,
+                    OutboxEvent.payload, OutboxEvent.created_at,
+                )
+                .where(unpublished)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if rows:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for row in rows:
+                        pipe.xadd(
+                            stream_key(row.topic),
+                            {
+                                "id": str(row.id),
+                                "topic": row.topic,
+                                "key": row.key or "",
+                                "payload": json.dumps(row.payload, ensure_ascii=False, default=str),
+                                "created_at": repr(row.created_at.timestamp()),
+                            },
+                            maxlen=self.stream_maxlen,
+                            approximate=True,
+                        )
+                    await pipe.execute()
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([row.id for row in rows]))
+                    .values(published_at=func.now())
+                )
+
+            oldest = await db.scalar(
+                select(OutboxEvent.created_at).where(unpublished).order_by(OutboxEvent.id).limit(1)
+            )
+            self.pending_count = await db.scalar(
+                select(func.count()).select_from(
+                    select(OutboxEvent.id).where(unpublished).limit(PENDING_COUNT_CAP).subquery()
+                )
+            )
+            await db.commit()
+        self.lag_seconds = max(time.time() - oldest.timestamp(), 0.0) if oldest else 0.0
+        return len(rows)
+
+    async def purge(self) -> int:
+        """保持期間を過ぎた配信済みのイベントを削除"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)
+        async with async_session_maker() as db:
+            result = await db.execute(
+                delete(OutboxEvent).where(OutboxEvent.id.in_(
+                    select(OutboxEvent.id)
+                    .where(OutboxEvent.published_at < cutoff)
+                    .limit(PURGE_BATCH_SIZE)
+                    .scalar_subquery()
+                ))
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            sent = 0
+            try:
+                sent = await self.relay_once()
+                if time.monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    await self.purge()
+            except Exception:
+                logger.exception("アウトボックスの配信に失敗しました")
+            if sent >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+outbox_relay = OutboxRelay(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    stream_maxlen=settings.OUTBOX_STREAM_MAXLEN,
+    retention_seconds=settings.OUTBOX_RETENTION_HOURS * 3600,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    if any(isinstance(obj, OutboxEvent) for obj in session.new):
+        session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session):
+    if session.info.pop(_PENDING_KEY, None):
+        outbox_relay.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ============ コンシューマ ============
+
+class OutboxMessage(NamedTuple):
+    id: int
+    topic: str
+    key: Optional[str]
+    payload: dict
+    created_at: float   # イベント作成時刻（UNIX秒）
+
+
+Handler = Callable[[OutboxMessage], Awaitable[None]]
+
+
+def _parse(fields: Dict[str, str]) -> OutboxMessage:
+    return OutboxMessage(
+        id=int(fields["id"]),
+        topic=fields["topic"],
+        key=fields.get("key") or None,
+        payload=json.loads(fields["payload"]),
+        created_at=float(fields["created_at"]),
+    )
+
+
+class OutboxConsumer:
+    """コンシューマグループとしてトピックのストリームを処理する
+
+    handlers はトピック → ハンドラ。ハンドラが例外を送出したメッセージは ACK せず、
+    claim_idle_seconds の後に再配信される。処理済みのイベントIDは dedup_ttl 秒記録し、
+    再送されたイベントは処理せずに ACK する。
+
+    ハンドラの完了後・処理済みの記録前に落ちた場合は再実行されるため、
+    ハンドラは同じイベントを2回処理しても結果が変わらないようにする。
+    """
+
+    def __init__(
+        self,
+        group: str,
+        handlers: Dict[str, Handler],
+        batch_size: int = 100,
+        block_ms: int = 5000,
+        claim_idle_seconds: float = 60.0,
+        dedup_ttl: int = 7 * 86400,
+    ):
+        self.group = group
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_seconds = max(int(claim_idle_seconds), 1)
+        self.claim_idle_ms = int(claim_idle_seconds * 1000)
+        self.dedup_ttl = dedup_ttl
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._groups_ready = False
+
+    @property
+    def streams(self) -> List[str]:
+        return [stream_key(topic) for topic in self.handlers]
+
+    def _dedup_key(self, event_id: int) -> str:
+        return f"{DEDUP_PREFIX}{self.group}:{event_id}"
+
+    async def _ensure_groups(self) -> None:
+        if self._groups_ready:
+            return
+        for stream in self.streams:
+            try:
+                await redis_client.xgroup_create(stream, self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self._groups_ready = True
+
+    async def _handle(self, stream: str, message_id: str, fields: Dict[str, str]) -> bool:
+        try:
+            message = _parse(fields)
+        except (KeyError, ValueError):
+            logger.error("不正なアウトボックスメッセージを破棄します: %s %s", stream, message_id)
+            await redis_client.xack(stream, self.group, message_id)
+            return False
+
+        # 処理の開始を SET NX で記録してから処理する（同じイベントを同時に処理しない）
+        dedup_key = self._dedup_key(message.id)
+        if not await redis_client.set(dedup_key, _PROCESSING, nx=True, ex=self.claim_idle_seconds):
+            if await redis_client.get(dedup_key) == _DONE:
+                await redis_client.xack(stream, self.group, message_id)
+            # 処理中なら ACK せずに残す（処理中のコンシューマが落ちていれば記録の期限後に再配信される）
+            return False
+        try:
+            await self.handlers[message.topic](message)
+        except Exception:
+            logger.exception("アウトボックスのイベント処理に失敗しました: %s #%d", message.topic, message.id)
+            await redis_client.delete(dedup_key)
+            return False
+        await redis_client.set(dedup_key, _DONE, ex=self.dedup_ttl)
+        await redis_client.xack(stream, self.group, message_id)
+        observe_outbox_delivery(self.group, message.topic, time.time() - message.created_at)
+        return True
+
+    async def consume_once(self, block_ms: Optional[int] = None) -> int:
+        """処理中に放置されたメッセージと新着メッセージを処理し、処理件数を返す"""
+        await self._ensure_groups()
+        handled = 0
+        for stream in self.streams:
+            claimed = await redis_client.xautoclaim(
+                stream, self.group, self.name, self.claim_idle_ms, start_id="0-0", count=self.batch_size
+            )
+            for message_id, fields in claimed[1]:
+                if fields:
+                    handled += await self._handle(stream, message_id, fields)
+
+        response = await redis_client.xreadgroup(
+            self.group, self.name, {stream: ">" for stream in self.streams},
+            count=self.batch_size, block=self.block_ms if block_ms is None else block_ms,
+        )
+        for stream, messages in response or []:
+            for message_id, fields in messages:
+                handled += await self._handle(stream, message_id, fields)
+        return handled
+
+    async def start(self) -> None:
+        if self._task is None and self.handlers:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.consume_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("アウトボックスの受信に失敗しました: %s", self.group)
+                await asyncio.sleep(1.0)
@@ -0,0 +1,63 @@
+"""
+アウトボックスのコンシューマ
+トピックごとの副作用の処理。ハンドラは再配信に備えて、同じイベントを
+再処理しても結果が変わらないようにする（処理済みの重複は OutboxConsumer が捨てる）。
+"""
+from typing import List
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.session import async_session_maker
+from app.models.comment import Notification
+from app.models.matching import BuyerConfig
+from app.models.proposal import Proposal
+from app.models.user import User
+from app.services.notification import build_notification, bulk_create_notifications
+from app.services.outbox import PROPOSAL_SUBMITTED, OutboxConsumer, OutboxMessage
+
+
+SUBMISSION_NOTIFICATION_TYPE = "proposal_submitted"
+
+
+async def notify_buyers_of_submission(message: OutboxMessage) -> None:
+    """提案の提出を、提出先のバイヤー組織のユーザーへ通知する
+
+    同じ提案の提出通知を受け取り済みのユーザーは除く（再配信されても重複しない）。
+    """
+    proposal_id = message.payload["proposal_id"]
+    notified = (
+        select(Notification.id)
+        .where(
+            Notification.user_id == User.id,
+            Notification.notification_type == SUBMISSION_NOTIFICATION_TYPE,
+            Notification.reference_id == proposal_id,
+        )
+        .exists()
+    )
+    async with async_session_maker() as db:
+        rows = (await db.execute(
+            select(User.id, Proposal.title)
+            .join(BuyerConfig, BuyerConfig.id == Proposal.buyer_config_id)
+            .join(User, User.organization_id == BuyerConfig.organization_id)
+            .where(Proposal.id == proposal_id, User.is_active.is_(True), ~notified)
+        )).all()
+        await bulk_create_notifications(db, [
+            build_notification(
+                user_id, "新しい提案が提出されました", f"「{title}」が提出されました。",
+                link=f"/proposals/{proposal_id}", notification_type=SUBMISSION_NOTIFICATION_TYPE,
+                reference_id=proposal_id,
+            )
+            for user_id, title in rows
+        ])
+        await db.commit()
+
+
+def build_consumers() -> List[OutboxConsumer]:
+    options = dict(
+        claim_idle_seconds=settings.OUTBOX_CLAIM_IDLE_SECONDS,
+        dedup_ttl=settings.OUTBOX_DEDUP_TTL_SECONDS,
+    )
+    return [
+        OutboxConsumer("notifications", {PROPOSAL_SUBMITTED: notify_buyers_of_submission}, **options),
+    ]
@@ -0,0 +1,250 @@
+"""
+履歴テーブルの月次パーティション管理
+追記中心で増え続ける履歴テーブルを created_at の月単位でレンジパーティション分割し、
+
+- 当月から PARTITION_PREMAKE_MONTHS か月先までのパーティションを事前に作成する
+- 保持期間（PARTITION_RETENTION_MONTHS）を過ぎたパーティションを gzip 圧縮の CSV で
+  MinIO にアーカイブしてから切り離して削除する
+- 直近履歴の一覧は直近 PARTITION_HOT_MONTHS か月だけを先に検索し（パーティション
+  プルーニング）、ページが埋まらない場合だけ古いパーティションを検索する
+
+パーティション名は {テーブル}_pYYYYMM、範囲外の行は {テーブル}_default に入る。
+"""
+import gzip
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.config import settings
+from app.db.session import engine
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("comments", "proposal_progress", "notifications", "point_transactions")
+
+# 複数ワーカーの起動時や定期ジョブが同時に DDL を発行しないためのロック
+_ADVISORY_LOCK_KEY = "partition_maintenance"
+
+
+# ============ 月の計算 ============
+
+def month_start(value: datetime) -> datetime:
+    """その月の初日 0時（UTC）"""
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def hot_since(now: Optional[datetime] = None) -> datetime:
+    """直近履歴として扱う範囲の開始（当月を含めて PARTITION_HOT_MONTHS か月）"""
+    current = month_start(now or datetime.now(timezone.utc))
+    return add_months(current, -(settings.PARTITION_HOT_MONTHS - 1))
+
+
+# ============ 直近履歴の検索 ============
+
+async def recent_page(db: AsyncSession, stmt: Select, created_at, skip: int, limit: int) -> list:
+    """created_at の新しい順のページを、直近のパーティションから優先して取得する
+
+    stmt は created_at の降順に並べた select（offset / limit なし）。
+    直近の範囲だけでページが埋まればその結果を返し、埋まらない場合は
+    直近の範囲の続きとして古いパーティションだけを検索する。
+    """
+    since = hot_since()
+    rows = (await db.scalars(stmt.where(created_at >= since).offset(skip).limit(limit))).all()
+    if len(rows) == limit:
+        return rows
+
+    if rows or skip == 0:
+        hot_count = skip + len(rows)
+    else:
+        # 直近の範囲を読み飛ばしたページ: 直近の件数を数えて古い範囲のオフセットを求める
+        hot_count = await db.scalar(
+            select(func.count()).select_from(stmt.where(created_at >= since).order_by(None).subquery())
+        )
+    cold = await db.scalars(
+        stmt.where(created_at < since).offset(max(skip - hot_count, 0)).limit(limit - len(rows))
+    )
+    return list(rows) + list(cold.all())
+
+
+# ============ パーティションの作成 ============
+
+def _bound(month: datetime) -> str:
+    return f"'{month.isoformat()}'"
+
+
+async def _lock(conn: AsyncConnection) -> None:
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _ADVISORY_LOCK_KEY})
+
+
+async def _exists(conn: AsyncConnection, name: str) -> bool:
+    return await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+
+
+async def _default_months(conn: AsyncConnection, table: str) -> List[datetime]:
+    """デフォルトパーティションに入っている行の月"""
+    default = default_partition_name(table)
+    if not await _exists(conn, default):
+        return []
+    result = await conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM {default}"
+    ))
+    return [month.replace(tzinfo=timezone.utc) for month in result.scalars()]
+
+
+async def create_partition(conn: AsyncConnection, table: str, month: datetime) -> bool:
+    """月のパーティションを作成（作成済みなら何もしない）
+
+    デフォルトパーティションに同じ月の行がある場合は、別テーブルとして作成して
+    行を移してから付け替える。
+    """
+    name = partition_name(table, month)
+    if await _exists(conn, name):
+        return False
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    default = default_partition_name(table)
+    in_range = f"created_at >= {lower} AND created_at < {upper}"
+    stray = await _exists(conn, default) and await conn.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")
+    )
+    if not stray:
+        await conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ({lower}) TO ({upper})"
+        ))
+        return True
+
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    await conn.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})"
+    ))
+    return True
+
+
+async def ensure_partitions(
+    now: Optional[datetime] = None, months_ahead: Optional[int] = None, months_back: int = 0
+) -> List[str]:
+    """当月の months_back か月前から months_ahead か月先までと、デフォルトに入った行の月のパーティションを作成"""
+    current = month_start(now or datetime.now(timezone.utc))
+    months_ahead = settings.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+    created = []
+    async with engine.begin() as conn:
+        await _lock(conn)
+        for table in PARTITIONED_TABLES:
+            default = default_partition_name(table)
+            if not await _exists(conn, default):
+                await conn.execute(text(f"CREATE TABLE {default} PARTITION OF {table} DEFAULT"))
+            months = {add_months(current, i) for i in range(-months_back, months_ahead + 1)}
+            months.update(await _default_months(conn, table))
+            for month in sorted(months):
+                if await create_partition(conn, table, month):
+                    created.append(partition_name(table, month))
+    return created
+
+
+# ============ アーカイブ ============
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, datetime]]:
+    """月のパーティション（名前, 月）を古い順に返す"""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table})
+    prefix = f"{table}_p"
+    partitions = []
+    for name in result.scalars():
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=timezone.utc)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def archive_key(table: str, month: datetime) -> str:
+    return f"{settings.PARTITION_ARCHIVE_PREFIX}/{table}/{partition_name(table, month)}.csv.gz"
+
+
+@dataclass
+class ArchiveResult:
+    archived: List[str] = field(default_factory=list)   # アーカイブして削除したパーティション
+    planned: List[str] = field(default_factory=list)    # dry_run で対象になったパーティション
+    rows: int = 0
+
+
+async def _export_partition(name: str, path: str) -> int:
+    """パーティションを COPY で gzip 圧縮の CSV（ヘッダー付き）に書き出し、行数を返す"""
+    async with engine.connect() as conn:
+        rows = await conn.scalar(text(f"SELECT count(*) FROM {name}"))
+        raw = await conn.get_raw_connection()
+        with gzip.open(path, "wb") as out:
+            async def write(chunk: bytes) -> None:
+                out.write(chunk)
+
+            await raw.driver_connection.copy_from_table(name, output=write, format="csv", header=True)
+    return rows
+
+
+async def archive_partition(table: str, name: str, month: datetime) -> int:
+    """パーティションを MinIO にアーカイブしてから切り離して削除する"""
+    key = archive_key(table, month)
+    fd, path = tempfile.mkstemp(suffix=".csv.gz")
+    os.close(fd)
+    try:
+        rows = await _export_partition(name, path)
+        size = os.path.getsize(path)
+        await storage.put_file(key, path, "application/gzip", metadata={"rows": str(rows), "table": table})
+    finally:
+        os.unlink(path)
+    # 保存を確認できるまで削除しない
+    if await storage.object_size(key) != size:
+        raise RuntimeError(f"archive upload could not be verified: {key}")
+
+    async with engine.begin() as conn:
+        await _lock(conn)
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        await conn.execute(text(f"DROP TABLE {name}"))
+    logger.info("パーティションをアーカイブしました: %s → %s (%d行)", name, key, rows)
+    return rows
+
+
+async def archive_expired(now: Optional[datetime] = None, dry_run: bool = False) -> ArchiveResult:
+    """保持期間を過ぎたパーティションをアーカイブして削除する"""
+    current = month_start(now or datetime.now(timezone.utc))
+    result = ArchiveResult()
+    for table in PARTITIONED_TABLES:
+        retention = settings.PARTITION_RETENTION_MONTHS.get(table)
+        if not retention:
+            continue
+        cutoff = add_months(current, -retention)
+        async with engine.connect() as conn:
+            partitions = [(name, month) for name, month in await list_partitions(conn, table) if month < cutoff]
+        for name, month in partitions:
+            if dry_run:
+                result.planned.append(name)
+                continue
+            result.rows += await archive_partition(table, name, month)
+            result.archived.append(name)
+    return result
@@ -0,0 +1,301 @@
+"""
+ポイントの付与・消費・有効期限
+付与（購入・ボーナス・返金）ごとにロット（point_lots）を作り、消費は古いロットから
+順に充当する（FIFO）。有効期限を過ぎたロットの残りは夜間バッチ（expire_points）で
+EXPIRED 取引として失効させる。
+
+付与・消費・失効はいずれも残高の行ロックを先に取ってからロットを更新するため、
+同じユーザーに対して並行しても残高とロットの合計はずれない。
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.session import async_session_maker
+from app.models.point import (
+    CREDIT_TRANSACTION_TYPES,
+    PointBalance,
+    PointLot,
+    PointTransaction,
+    TransactionType,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_DESCRIPTION = "有効期限切れ"
+
+
+class InsufficientPoints(Exception):
+    """有効なポイントが不足している"""
+
+    def __init__(self, required: int, available: int):
+        super().__init__(f"Insufficient points. Required: {required}, Available: {available}")
+        self.required = required
+        self.available = available
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _lock_balance(db: AsyncSession, balance: PointBalance) -> None:
+    """残高の行ロックを取り、最新の値を読み直す"""
+    await db.execute(
+        select(PointBalance)
+        .where(PointBalance.id == balance.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+
+
+# ============ 付与・消費 ============
+
+async def credit_points(
+    db: AsyncSession,
+    balance: PointBalance,
+    transaction_type: TransactionType,
+    amount: int,
+    description: str,
+    payment_id: Optional[str] = None,
+    reference_id: Optional[int] = None,
+) -> PointTransaction:
+    """ポイントを付与し、有効期限付きのロットを作る（コミットは呼び出し側）"""
+    await _lock_balance(db, balance)
+    balance.balance += amount
+    if transaction_type == TransactionType.PURCHASE:
+        balance.total_purchased = (balance.total_purchased or 0) + amount
+
+    transaction = PointTransaction(
+        point_balance_id=balance.id,
+        transaction_type=transaction_type,
+        amount=amount,
+        balance_after=balance.balance,
+        description=description,
+        reference_id=reference_id,
+        payment_id=payment_id,
+    )
+    db.add(transaction)
+    await db.flush()
+    db.add(PointLot(
+        point_balance_id=balance.id,
+        transaction_id=transaction.id,
+        amount=amount,
+        remaining=amount,
+        expires_at=_now() + timedelta(days=settings.POINT_EXPIRY_DAYS),
+    ))
+    return transaction
+
+
+async def consume_points(
+    db: AsyncSession,
+    balance: PointBalance,
+    amount: int,
+    description: str,
+    reference_id: Optional[int] = None,
+    transaction_type: TransactionType = TransactionType.PROPOSAL_SUBMIT,
+) -> PointTransaction:
+    """有効なロットから古い順にポイントを消費する（コミットは呼び出し側）
+
+    有効期限を過ぎたロット（夜間バッチの失効前）は使わない。
+    """
+    await _lock_balance(db, balance)
+    now = _now()
+    open_lots = (
+        PointLot.point_balance_id == balance.id,
+        PointLot.remaining > 0,
+        PointLot.expires_at > now,
+    )
+    available = await db.scalar(select(func.coalesce(func.sum(PointLot.remaining), 0)).where(*open_lots))
+    if available < amount:
+        raise InsufficientPoints(amount, available)
+
+    # 古い順の累計で、累計が消費量に届くまでのロットを減らす
+    ordered = (
+        select(
+            PointLot.id,
+            PointLot.remaining,
+            func.sum(PointLot.remaining).over(order_by=PointLot.id).label("running"),
+        )
+        .where(*open_lots)
+        .cte("ordered")
+    )
+    await db.execute(
+        update(PointLot)
+        .where(PointLot.id == ordered.c.id, ordered.c.running - ordered.c.remaining < amount)
+        .values(remaining=func.greatest(ordered.c.running - amount, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+    balance.balance -= amount
+    balance.total_used = (balance.total_used or 0) + amount
+    transaction = PointTransaction(
+        point_balance_id=balance.id,
+        transaction_type=transaction_type,
+        amount=-amount,
+        balance_after=balance.balance,
+        description=description,
+        reference_id=reference_id,
+    )
+    db.add(transaction)
+    return transaction
+
+
+# ============ 失効（夜間バッチ） ============
+
+def _expire_statement(balance_ids: List[int], now: datetime):
+    """期限切れロットの残りを0にし、ユーザーごとの合計で残高を減らして EXPIRED 取引を作る（1文）"""
+    due = (
+        select(PointLot.id, PointLot.remaining)
+        .where(
+            PointLot.point_balance_id.in_(balance_ids),
+            PointLot.remaining > 0,
+            PointLot.expires_at <= now,
+        )
+        .cte("due")
+    )
+    cleared = (
+        update(PointLot)
+        .where(PointLot.id == due.c.id)
+        .values(remaining=0)
+        .returning(PointLot.point_balance_id, due.c.remaining.label("expired"))
+        .cte("cleared")
+    )
+    per_user = (
+        select(cleared.c.point_balance_id, func.sum(cleared.c.expired).label("amount"))
+        .group_by(cleared.c.point_balance_id)
+        .cte("per_user")
+    )
+    debited = (
+        update(PointBalance)
+        .where(PointBalance.id == per_user.c.point_balance_id)
+        .values(balance=PointBalance.balance - per_user.c.amount)
+        .returning(PointBalance.id, PointBalance.balance, per_user.c.amount)
+        .cte("debited")
+    )
+    return (
+        insert(PointTransaction)
+        .from_select(
+            ["point_balance_id", "transaction_type", "amount", "balance_after", "description"],
+            select(
+                debited.c.id,
+                literal(TransactionType.EXPIRED, PointTransaction.__table__.c.transaction_type.type),
+                -debited.c.amount,
+                debited.c.balance,
+                literal(EXPIRED_DESCRIPTION),
+            ),
+        )
+        .returning(PointTransaction.amount)
+    )
+
+
+@dataclass
+class ExpiryResult:
+    users: int = 0
+    points: int = 0
+    batches: int = 0
+
+
+async def expire_points(now: Optional[datetime] = None, batch_size: Optional[int] = None) -> ExpiryResult:
+    """有効期限を過ぎたロットを全ユーザー分失効させる
+
+    期限切れロットを持つユーザーを残高ID順に batch_size 件ずつ取り、バッチごとに
+    残高の行ロック → 1文の集合演算（ロット・残高・取引の更新）→ コミットを行う。
+    再実行しても失効済みのロットは対象にならない。
+    """
+    now = now or _now()
+    batch_size = batch_size or settings.POINT_EXPIRY_BATCH_SIZE
+    result = ExpiryResult()
+    last_id = 0
+    while True:
+        async with async_session_maker() as db:
+            balance_ids = (await db.scalars(
+                select(PointLot.point_balance_id)
+                .where(
+                    PointLot.remaining > 0,
+                    PointLot.expires_at <= now,
+                    PointLot.point_balance_id > last_id,
+                )
+                .group_by(PointLot.point_balance_id)
+                .order_by(PointLot.point_balance_id)
+                .limit(batch_size)
+            )).all()
+            if not balance_ids:
+                return result
+            # 付与・消費と同じく残高を先にロックする（ID順でデッドロックを避ける）
+            await db.execute(
+                select(PointBalance.id)
+                .where(PointBalance.id.in_(balance_ids))
+                .order_by(PointBalance.id)
+                .with_for_update()
+            )
+            amounts = (await db.scalars(_expire_statement(balance_ids, now))).all()
+            await db.commit()
+        result.users += len(amounts)
+        result.points += -sum(amounts)
+        result.batches += 1
+        last_id = balance_ids[-1]
+
+
+# ============ 照合 ============
+
+async def verify_lots(db: AsyncSession, limit: int = 100) -> Tuple[int, List[dict]]:
+    """ロットと残高・取引履歴を照合し、(不一致の件数, 不一致の例) を返す
+
+    ユーザーごとに次を確認する（移行時のロットより前の取引は除く）。
+    - 残高 = ロットの残りの合計
+    - 付与取引の合計 = 付与取引に対応するロットの付与量の合計
+    - 消費・失効取引の合計 = ロットから減った量の合計
+    """
+    lots = (
+        select(
+            PointLot.point_balance_id.label("balance_id"),
+            func.sum(PointLot.remaining).label("remaining"),
+            func.sum(case((PointLot.transaction_id.isnot(None), PointLot.amount), else_=0)).label("lot_credits"),
+            func.sum(PointLot.amount - PointLot.remaining).label("consumed"),
+            func.min(case((PointLot.transaction_id.is_(None), PointLot.created_at))).label("cutoff"),
+        )
+        .group_by(PointLot.point_balance_id)
+        .subquery()
+    )
+    history = (
+        select(
+            PointTransaction.point_balance_id.label("balance_id"),
+            func.sum(case(
+                (PointTransaction.transaction_type.in_(CREDIT_TRANSACTION_TYPES), PointTransaction.amount),
+                else_=0,
+            )).label("credited"),
+            func.sum(case((PointTransaction.amount < 0, -PointTransaction.amount), else_=0)).label("debited"),
+        )
+        .outerjoin(lots, lots.c.balance_id == PointTransaction.point_balance_id)
+        .where(or_(lots.c.cutoff.is_(None), PointTransaction.created_at > lots.c.cutoff))
+        .group_by(PointTransaction.point_balance_id)
+        .subquery()
+    )
+    remaining = func.coalesce(lots.c.remaining, 0)
+    lot_credits = func.coalesce(lots.c.lot_credits, 0)
+    consumed = func.coalesce(lots.c.consumed, 0)
+    credited = func.coalesce(history.c.credited, 0)
+    debited = func.coalesce(history.c.debited, 0)
+    mismatch = or_(
+        PointBalance.balance != remaining,
+        credited != lot_credits,
+        debited != consumed,
+    )
+    stmt = (
+        select(
+            PointBalance.id, PointBalance.user_id, PointBalance.balance,
+            remaining.label("lots_remaining"), credited.label("credited"), lot_credits.label("lot_credits"),
+            debited.label("debited"), consumed.label("consumed"),
+        )
+        .outerjoin(lots, lots.c.balance_id == PointBalance.id)
+        .outerjoin(history, history.c.balance_id == PointBalance.id)
+        .where(mismatch)
+    )
+    count = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+    rows = (await db.execute(stmt.order_by(PointBalance.id).limit(limit))).mappings().all()
+    return count, [dict(row) for row in rows]
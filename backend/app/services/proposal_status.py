@@ -0,0 +1,226 @@
+"""
+提案ステータスの状態遷移
+提案のステータスはサプライヤーの提出・パイプラインのワーカー・バイヤーの採用判断から
+並行して変更されるため、変更はこのモジュールの transition / bulk_transition だけで行う。
+
+- 遷移できる組み合わせは TRANSITIONS で定義する
+- 更新は proposals.version の比較交換（compare-and-swap）で行い、テーブルロックは取らない。
+  読んだ後に他の書き込みが入った提案は更新されないので、読み直して遷移を判定し直す（retries 回まで）。
+  他のトランザクションが更新中の行は待たずに競合として扱う（SKIP LOCKED）ため、
+  複数件をまとめて更新するワーカー同士でもデッドロックしない
+- 遷移ごとに進捗履歴（proposal_progress）とアウトボックスのイベント
+  （proposal.status_changed）を同じトランザクションに追加する。コミットは呼び出し側で行う
+- ステータスは ORM の属性変更を経由しないため、マッチング候補の更新はコミット後に
+  実行されるよう明示的に登録する
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.models.comment import ProposalProgress
+from app.models.proposal import Proposal, ProposalStatus
+from app.services import matching, outbox
+
+S = ProposalStatus
+
+# 現在のステータス → 遷移できるステータス
+TRANSITIONS: Dict[ProposalStatus, FrozenSet[ProposalStatus]] = {
+    S.DRAFT: frozenset({S.SUBMITTED}),
+    S.SUBMITTED: frozenset({S.ANALYZING, S.REJECTED}),
+    S.ANALYZING: frozenset({S.QA_PENDING, S.EVALUATED, S.REJECTED}),
+    S.QA_PENDING: frozenset({S.QA_COMPLETED, S.REJECTED}),
+    S.QA_COMPLETED: frozenset({S.EVALUATED, S.REJECTED}),
+    S.EVALUATED: frozenset({S.UNDER_REVIEW, S.MEETING_SCHEDULED, S.ON_HOLD, S.ACCEPTED, S.REJECTED}),
+    S.UNDER_REVIEW: frozenset({S.MEETING_SCHEDULED, S.ON_HOLD, S.ACCEPTED, S.REJECTED}),
+    S.MEETING_SCHEDULED: frozenset({S.ON_HOLD, S.ACCEPTED, S.REJECTED}),
+    S.ON_HOLD: frozenset({S.UNDER_REVIEW, S.MEETING_SCHEDULED, S.ACCEPTED, S.REJECTED}),
+    S.ACCEPTED: frozenset(),
+    S.REJECTED: frozenset(),
+}
+
+DEFAULT_RETRIES = 3
+# 再試行までの待ち時間（試行ごとに倍にする）。更新中のトランザクションのコミットを待つ
+RETRY_BACKOFF_SECONDS = 0.01
+
+
+class InvalidTransition(Exception):
+    """現在のステータスから遷移できない（提案が存在しない場合は current が None）"""
+
+    def __init__(self, proposal_id: int, current: Optional[ProposalStatus], target: ProposalStatus):
+        current_name = current.value if current else "missing"
+        super().__init__(f"Proposal {proposal_id} cannot move from {current_name} to {target.value}")
+        self.proposal_id = proposal_id
+        self.current = current
+        self.target = target
+
+
+class StaleProposal(Exception):
+    """期待したバージョンから変更されていた、または再試行しても競合した"""
+
+    def __init__(self, proposal_id: int):
+        super().__init__(f"Proposal {proposal_id} was modified concurrently")
+        self.proposal_id = proposal_id
+
+
+class Transition(NamedTuple):
+    proposal_id: int
+    from_status: ProposalStatus
+    to_status: ProposalStatus
+    version: int   # 遷移後のバージョン
+
+
+@dataclass
+class TransitionResult:
+    transitioned: List[Transition] = field(default_factory=list)
+    invalid: Dict[int, Optional[ProposalStatus]] = field(default_factory=dict)  # 提案ID → 現在のステータス
+    stale: List[int] = field(default_factory=list)
+
+
+def can_transition(current: Optional[ProposalStatus], target: ProposalStatus) -> bool:
+    return current is not None and target in TRANSITIONS[current]
+
+
+async def _read(db: AsyncSession, proposal_ids: List[int]) -> Dict[int, Tuple[ProposalStatus, int]]:
+    rows = await db.execute(
+        select(Proposal.id, Proposal.status, Proposal.version).where(Proposal.id.in_(proposal_ids))
+    )
+    return {row.id: (row.status, row.version) for row in rows}
+
+
+async def _swap(db: AsyncSession, expected: Dict[int, int], target: ProposalStatus) -> Set[int]:
+    """バージョンが読んだ時点のままの提案だけを更新し、更新できた提案IDを返す"""
+    unchanged = tuple_(Proposal.id, Proposal.version).in_(list(expected.items()))
+    # FOR NO KEY UPDATE: 候補（match_candidates）の追加など外部キーの参照（KEY SHARE）とは競合させない
+    lockable = (
+        select(Proposal.id)
+        .where(unchanged)
+        .with_for_update(skip_locked=True, key_share=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Proposal)
+        .where(Proposal.id.in_(lockable), unchanged)
+        .values(status=target, version=Proposal.version + 1)
+        .returning(Proposal.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars())
+
+
+def _record(
+    db: AsyncSession, transitions: List[Transition], changed_by: Optional[int], note: Optional[str]
+) -> None:
+    """進捗履歴とイベントを追加し、セッションに読み込み済みの提案を更新後の値にそろえる"""
+    if transitions:
+        matching.queue_proposal_refresh(db, [t.proposal_id for t in transitions])
+    for t in transitions:
+        db.add(ProposalProgress(proposal_id=t.proposal_id, status=t.to_status, changed_by=changed_by, note=note))
+        outbox.add_event(db, outbox.PROPOSAL_STATUS_CHANGED, {
+            "proposal_id": t.proposal_id,
+            "from": t.from_status.value,
+            "to": t.to_status.value,
+            "version": t.version,
+            "changed_by": changed_by,
+        }, key=t.proposal_id)
+        proposal = db.identity_map.get(identity_key(Proposal, t.proposal_id))
+        if proposal is not None:
+            set_committed_value(proposal, "status", t.to_status)
+            set_committed_value(proposal, "version", t.version)
+
+
+async def _transition(
+    db: AsyncSession,
+    proposal_ids: List[int],
+    current: Optional[Dict[int, Tuple[ProposalStatus, int]]],
+    target: ProposalStatus,
+    changed_by: Optional[int],
+    note: Optional[str],
+    expected_versions: Optional[Dict[int, int]],
+    retries: int,
+) -> TransitionResult:
+    result = TransitionResult()
+    expected_versions = expected_versions or {}
+    pending = proposal_ids
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        if current is None:
+            current = await _read(db, pending)
+        expected: Dict[int, int] = {}
+        for proposal_id in pending:
+            status, version = current.get(proposal_id, (None, None))
+            if expected_versions.get(proposal_id, version) != version:
+                result.stale.append(proposal_id)
+            elif not can_transition(status, target):
+                result.invalid[proposal_id] = status
+            else:
+                expected[proposal_id] = version
+        if not expected:
+            pending = []
+            break
+
+        swapped = await _swap(db, expected, target)
+        result.transitioned.extend(
+            Transition(proposal_id, current[proposal_id][0], target, version + 1)
+            for proposal_id, version in expected.items() if proposal_id in swapped
+        )
+        pending = [proposal_id for proposal_id in expected if proposal_id not in swapped]
+        if not pending:
+            break
+        current = None
+
+    result.stale.extend(pending)
+    _record(db, result.transitioned, changed_by, note)
+    return result
+
+
+async def transition(
+    db: AsyncSession,
+    proposal: Proposal,
+    target: ProposalStatus,
+    changed_by: Optional[int] = None,
+    note: Optional[str] = None,
+    expected_version: Optional[int] = None,
+    retries: int = DEFAULT_RETRIES,
+) -> Transition:
+    """提案1件を遷移させる
+
+    1回目は読み込み済みの proposal の状態で判定し、競合した場合だけ読み直す。
+    expected_version を指定すると、そのバージョンから変わっていれば StaleProposal を送出する
+    （画面で見た状態に対する操作など）。
+    """
+    result = await _transition(
+        db, [proposal.id], {proposal.id: (proposal.status, proposal.version)}, target, changed_by, note,
+        None if expected_version is None else {proposal.id: expected_version}, retries,
+    )
+    if result.transitioned:
+        return result.transitioned[0]
+    if proposal.id in result.invalid:
+        raise InvalidTransition(proposal.id, result.invalid[proposal.id], target)
+    raise StaleProposal(proposal.id)
+
+
+async def bulk_transition(
+    db: AsyncSession,
+    proposal_ids: Iterable[int],
+    target: ProposalStatus,
+    changed_by: Optional[int] = None,
+    note: Optional[str] = None,
+    expected_versions: Optional[Dict[int, int]] = None,
+    retries: int = DEFAULT_RETRIES,
+) -> TransitionResult:
+    """複数の提案をまとめて遷移させる（1回の試行で SELECT と UPDATE を1文ずつ）
+
+    遷移できない提案は invalid、期待したバージョンと違う・再試行しても競合した提案は
+    stale に入れて、残りだけを遷移させる。
+    """
+    proposal_ids = list(dict.fromkeys(proposal_ids))
+    if not proposal_ids:
+        return TransitionResult()
+    return await _transition(db, proposal_ids, None, target, changed_by, note, expected_versions, retries)
@@ -0,0 +1,349 @@
+"""
+Q&Aラウンドの回答期限
+バイヤーがラウンドを開くと回答期限（QA_ROUND_DEADLINE_HOURS）を設定し、期限スケジューラに
+期限切れ（qa_expire）と次のリマインド（qa_reminder）を登録する。サプライヤーが期限内に
+回答するとラウンドは回答済みになり、登録したジョブを取り消す（api/v1/qa.py）。
+
+- リマインド: 期限の QA_REMINDER_HOURS_BEFORE 時間前ごとにサプライヤーへ通知
+- 期限切れ: 回答の無いラウンドを「情報不足」と判定し、サプライヤーとバイヤー組織へ通知
+
+ハンドラは期限の来たラウンドをまとめて条件付き UPDATE で処理し、通知は一括作成する。
+ステータス・送信済みリマインドを条件に含めるため、同じジョブが再実行されても二重に通知しない。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.session import async_session_maker
+from app.models.matching import BuyerConfig
+from app.models.proposal import Proposal
+from app.models.qa import QASession, QASessionStatus
+from app.models.user import User
+from app.services.notification import build_notification, bulk_create_notifications
+from app.services.scheduler import DeadlineScheduler, deadline_scheduler
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_KIND = "qa_expire"
+REMIND_KIND = "qa_reminder"
+INSUFFICIENT_JUDGEMENT = "情報不足"
+
+REBUILD_BATCH_SIZE = 1000
+
+# 通知に表示する期限の時刻（サーバーのタイムゾーンに依らず日本時間）
+JST = timezone(timedelta(hours=9), "JST")
+
+# スケジュールに影響する属性
+SCHEDULE_FIELDS = ("status", "due_at", "last_reminder_hours")
+
+_PENDING_KEY = "qa_rounds_pending"
+_background_tasks: Set[asyncio.Task] = set()
+
+
+class RoundClosed(Exception):
+    """回答待ちでない（回答済み・期限切れ）ラウンドへの回答"""
+
+    def __init__(self, round_id: int, status: QASessionStatus):
+        super().__init__(f"Q&A round {round_id} is {status.value}")
+        self.round_id = round_id
+        self.status = status
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def next_reminder_hours(last_reminder_hours: Optional[int]) -> Optional[int]:
+    """次に送るリマインド（期限の何時間前か）"""
+    pending = [
+        h for h in settings.QA_REMINDER_HOURS_BEFORE
+        if last_reminder_hours is None or h < last_reminder_hours
+    ]
+    return max(pending) if pending else None
+
+
+def format_deadline(due_at: datetime) -> str:
+    """通知に表示する回答期限"""
+    return f"{due_at.astimezone(JST):%Y-%m-%d %H:%M}（日本時間）"
+
+
+def deadline_jobs(
+    round_id: int, due_at: datetime, last_reminder_hours: Optional[int]
+) -> List[Tuple[str, int, float]]:
+    """回答待ちラウンドのスケジューラ登録内容（期限切れと次のリマインド）"""
+    jobs = [(EXPIRE_KIND, round_id, due_at.timestamp())]
+    hours = next_reminder_hours(last_reminder_hours)
+    if hours is not None:
+        jobs.append((REMIND_KIND, round_id, (due_at - timedelta(hours=hours)).timestamp()))
+    return jobs
+
+
+# ============ ラウンドの開始・回答 ============
+
+async def open_round(db: AsyncSession, proposal_id: int, questions: List[dict]) -> QASession:
+    """新しいQ&Aラウンドを開く（コミット後に期限を登録）"""
+    last = await db.scalar(
+        select(func.max(QASession.round_number)).where(QASession.proposal_id == proposal_id)
+    )
+    session = QASession(
+        proposal_id=proposal_id,
+        round_number=(last or 0) + 1,
+        status=QASessionStatus.OPEN,
+        questions=questions,
+        due_at=_now() + timedelta(hours=settings.QA_ROUND_DEADLINE_HOURS),
+    )
+    db.add(session)
+    await db.commit()
+    return session
+
+
+async def answer_round(db: AsyncSession, qa_round: QASession, answers: dict) -> QASession:
+    """回答を記録してラウンドを回答済みにする（コミット後に期限のジョブを取り消す）
+
+    期限切れの処理（expire_rounds）と同時に実行されても一方だけが成立するよう、
+    行をロックして回答待ちであることを確認する。期限を過ぎた回答は受け付けない。
+    """
+    await db.refresh(qa_round, with_for_update=True)
+    now = _now()
+    if qa_round.status != QASessionStatus.OPEN:
+        raise RoundClosed(qa_round.id, qa_round.status)
+    if qa_round.due_at <= now:
+        raise RoundClosed(qa_round.id, QASessionStatus.EXPIRED)
+    qa_round.answers = answers
+    qa_round.status = QASessionStatus.ANSWERED
+    qa_round.closed_at = now
+    await db.commit()
+    return qa_round
+
+
+# ============ 通知先 ============
+
+async def _recipients(db: AsyncSession, proposal_ids: Sequence[int]) -> Dict[int, Tuple[int, List[int]]]:
+    """提案ID → (サプライヤーのユーザーID, バイヤー組織のユーザーID一覧)"""
+    rows = (await db.execute(
+        select(Proposal.id, Proposal.supplier_user_id, BuyerConfig.organization_id)
+        .outerjoin(BuyerConfig, BuyerConfig.id == Proposal.buyer_config_id)
+        .where(Proposal.id.in_(proposal_ids))
+    )).all()
+    org_ids = {org_id for _, _, org_id in rows if org_id is not None}
+    buyers: Dict[int, List[int]] = defaultdict(list)
+    if org_ids:
+        users = await db.execute(
+            select(User.organization_id, User.id)
+            .where(User.organization_id.in_(org_ids), User.is_active.is_(True))
+        )
+        for org_id, user_id in users:
+            buyers[org_id].append(user_id)
+    return {
+        proposal_id: (supplier_id, buyers.get(org_id, []) if org_id is not None else [])
+        for proposal_id, supplier_id, org_id in rows
+    }
+
+
+def _link(proposal_id: int) -> str:
+    return f"/proposals/{proposal_id}"
+
+
+# ============ ジョブハンドラ ============
+
+async def expire_rounds(round_ids: List[int]) -> int:
+    """期限を過ぎた回答待ちラウンドを「情報不足」として締め、通知する"""
+    now = _now()
+    async with async_session_maker() as db:
+        expired = (await db.execute(
+            update(QASession)
+            .where(
+                QASession.id.in_(round_ids),
+                QASession.status == QASessionStatus.OPEN,
+                QASession.due_at <= now,
+            )
+            .values(status=QASessionStatus.EXPIRED, closed_at=now, judgement=INSUFFICIENT_JUDGEMENT)
+            .returning(QASession.id, QASession.proposal_id, QASession.round_number)
+        )).all()
+        if not expired:
+            await db.commit()
+            return 0
+
+        recipients = await _recipients(db, list({proposal_id for _, proposal_id, _ in expired}))
+        rows = []
+        for round_id, proposal_id, round_number in expired:
+            supplier_id, buyer_ids = recipients.get(proposal_id, (None, []))
+            if supplier_id is not None:
+                rows.append(build_notification(
+                    supplier_id,
+                    "Q&Aの回答期限が過ぎました",
+                    f"第{round_number}回のQ&Aに期限内の回答が無かったため「{INSUFFICIENT_JUDGEMENT}」と判定されました。",
+                    _link(proposal_id), EXPIRE_KIND, round_id,
+                ))
+            rows.extend(
+                build_notification(
+                    user_id,
+                    "Q&Aが期限切れになりました",
+                    f"提案への第{round_number}回のQ&Aは回答が無く「{INSUFFICIENT_JUDGEMENT}」と判定されました。",
+                    _link(proposal_id), EXPIRE_KIND, round_id,
+                )
+                for user_id in buyer_ids
+            )
+        # 更新と通知を同じトランザクションでコミット
+        await bulk_create_notifications(db, rows)
+        await db.commit()
+
+    await deadline_scheduler.cancel((REMIND_KIND, round_id) for round_id, _, _ in expired)
+    return len(expired)
+
+
+async def send_reminders(round_ids: List[int]) -> int:
+    """期限の近い回答待ちラウンドのサプライヤーへリマインドを送り、次のリマインドを登録する"""
+    now = _now()
+    async with async_session_maker() as db:
+        rounds = (await db.execute(
+            select(QASession.id, QASession.due_at, QASession.last_reminder_hours)
+            .where(
+                QASession.id.in_(round_ids),
+                QASession.status == QASessionStatus.OPEN,
+                QASession.due_at > now,
+            )
+        )).all()
+
+        # 送るべきリマインド（期限の何時間前か）ごとにまとめる
+        due: Dict[int, List[int]] = defaultdict(list)
+        for round_id, due_at, last in rounds:
+            hours = [
+                h for h in settings.QA_REMINDER_HOURS_BEFORE
+                if (last is None or h < last) and due_at - timedelta(hours=h) <= now
+            ]
+            if hours:
+                due[min(hours)].append(round_id)
+
+        # 送信済みのリマインドを条件にするため、並行・再実行で二重に送らない
+        sent = []
+        for hours, ids in due.items():
+            sent.extend((await db.execute(
+                update(QASession)
+                .where(
+                    QASession.id.in_(ids),
+                    QASession.status == QASessionStatus.OPEN,
+                    or_(QASession.last_reminder_hours.is_(None), QASession.last_reminder_hours > hours),
+                )
+                .values(last_reminder_hours=hours)
+                .returning(
+                    QASession.id, QASession.proposal_id, QASession.round_number,
+                    QASession.due_at, QASession.last_reminder_hours,
+                )
+            )).all())
+        if not sent:
+            await db.commit()
+            return 0
+
+        recipients = await _recipients(db, list({row.proposal_id for row in sent}))
+        rows = []
+        for round_id, proposal_id, round_number, due_at, _ in sent:
+            supplier_id = recipients.get(proposal_id, (None, []))[0]
+            if supplier_id is None:
+                continue
+            rows.append(build_notification(
+                supplier_id,
+                "Q&Aの回答期限が近づいています",
+                f"第{round_number}回のQ&Aの回答期限は {format_deadline(due_at)} です。"
+                f"期限までに回答が無い場合は「{INSUFFICIENT_JUDGEMENT}」と判定されます。",
+                _link(proposal_id), REMIND_KIND, round_id,
+            ))
+        await bulk_create_notifications(db, rows)
+        await db.commit()
+
+    # 次のリマインド（期限切れのジョブは登録済み）
+    await deadline_scheduler.schedule(
+        job
+        for round_id, _, _, due_at, last in sent
+        for job in deadline_jobs(round_id, due_at, last)
+        if job[0] == REMIND_KIND
+    )
+    return len(sent)
+
+
+def register_handlers(scheduler: DeadlineScheduler = deadline_scheduler) -> None:
+    scheduler.register(EXPIRE_KIND, expire_rounds)
+    scheduler.register(REMIND_KIND, send_reminders)
+
+
+async def rebuild_schedule(scheduler: DeadlineScheduler = deadline_scheduler) -> int:
+    """回答待ちの全ラウンドの期限を登録し直す（Redis のデータを失った場合など）"""
+    count = 0
+    last_id = 0
+    async with async_session_maker() as db:
+        while True:
+            rounds = (await db.execute(
+                select(QASession.id, QASession.due_at, QASession.last_reminder_hours)
+                .where(QASession.status == QASessionStatus.OPEN, QASession.id > last_id)
+                .order_by(QASession.id)
+                .limit(REBUILD_BATCH_SIZE)
+            )).all()
+            if not rounds:
+                return count
+            await scheduler.schedule(
+                job for round_id, due_at, last in rounds for job in deadline_jobs(round_id, due_at, last)
+            )
+            count += len(rounds)
+            last_id = rounds[-1].id
+
+
+# ============ ORM の変更の反映 ============
+
+async def _apply(schedule: List[Tuple[str, int, float]], cancel: List[Tuple[str, int]]) -> None:
+    try:
+        await deadline_scheduler.cancel(cancel)
+        await deadline_scheduler.schedule(schedule)
+    except Exception:
+        # rebuild_schedule で復旧できる
+        logger.exception("Q&Aラウンドの期限の登録に失敗しました")
+
+
+def _has_changes(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in SCHEDULE_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    """期限・ステータスが変わったラウンドを記録"""
+    pending = None
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, QASession):
+            continue
+        if obj not in session.new and not _has_changes(obj):
+            continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, {})
+        pending[obj.id] = (obj.status, obj.due_at, obj.last_reminder_hours)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    schedule, cancel = [], []
+    for round_id, (status, due_at, last) in pending.items():
+        if status == QASessionStatus.OPEN and due_at is not None:
+            schedule.extend(deadline_jobs(round_id, due_at, last))
+        else:
+            cancel.extend([(EXPIRE_KIND, round_id), (REMIND_KIND, round_id)])
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_apply(schedule, cancel))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,241 @@
+"""
+リアルタイム通知配信サービス
+Redis Pub/Sub を経由して、ユーザー単位のイベントを接続中クライアントへ配信する
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.db.session import async_session_maker
+from app.models.comment import Comment, ProposalProgress, Notification
+from app.models.proposal import Proposal
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "events:user:"
+_PENDING_KEY = "realtime_pending_events"
+
+# create_task で投げた配信タスクの参照保持（GC対策）
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def user_channel(user_id: int) -> str:
+    """ユーザー別チャンネル名"""
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+async def publish_events(events: List[Tuple[int, dict]]) -> None:
+    """イベントを各ユーザーのチャンネルへ発行"""
+    if not events:
+        return
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id, payload in events:
+            pipe.publish(
+                user_channel(user_id),
+                json.dumps(payload, ensure_ascii=False, default=str)
+            )
+        await pipe.execute()
+
+
+# ============ コミット連動の配信 ============
+
+def queue_event(session, user_id: Optional[int], event_type: str, data: dict,
+                proposal_id: Optional[int] = None) -> None:
+    """コミット後に発行するイベントを登録
+
+    user_id が None の場合は proposal_id の提案者宛てに配信する。
+    """
+    session.info.setdefault(_PENDING_KEY, []).append({
+        "user_id": user_id,
+        "proposal_id": proposal_id,
+        "payload": {"type": event_type, "data": data},
+    })
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    """Notification / Comment / ProposalProgress の追加を配信キューに積む"""
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            queue_event(session, obj.user_id, "notification", {
+                "id": obj.id,
+                "title": obj.title,
+                "message": obj.message,
+                "link": obj.link,
+                "notification_type": obj.notification_type,
+                "reference_id": obj.reference_id,
+            })
+        elif isinstance(obj, Comment):
+            # 内部コメントは相手に見せない
+            if obj.is_internal:
+                continue
+            queue_event(session, None, "comment", {
+                "id": obj.id,
+                "proposal_id": obj.proposal_id,
+                "user_id": obj.user_id,
+                "parent_id": obj.parent_id,
+            }, proposal_id=obj.proposal_id)
+        elif isinstance(obj, ProposalProgress):
+            queue_event(session, None, "status_change", {
+                "id": obj.id,
+                "proposal_id": obj.proposal_id,
+                "status": obj.status.value if obj.status else None,
+                "note": obj.note,
+            }, proposal_id=obj.proposal_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session):
+    """コミット成功後にバックグラウンドで配信"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # 同期コンテキスト（バッチ処理等）では配信しない
+        return
+    task = loop.create_task(_dispatch(pending))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    """ロールバック時は配信しない"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def _dispatch(pending: List[dict]) -> None:
+    """宛先を解決して発行"""
+    proposal_ids = {p["proposal_id"] for p in pending if p["user_id"] is None}
+    owners: Dict[int, int] = {}
+    try:
+        if proposal_ids:
+            async with async_session_maker() as db:
+                result = await db.execute(
+                    select(Proposal.id, Proposal.supplier_user_id)
+                    .where(Proposal.id.in_(proposal_ids))
+                )
+                owners = dict(result.all())
+
+        events = []
+        for p in pending:
+            user_id = p["user_id"]
+            if user_id is None:
+                user_id = owners.get(p["proposal_id"])
+            if user_id is not None:
+                events.append((user_id, p["payload"]))
+        await publish_events(events)
+    except Exception:
+        logger.exception("リアルタイムイベントの配信に失敗しました")
+
+
+# ============ 購読ハブ ============
+
+class RealtimeHub:
+    """ワーカー単位のPub/Sub購読ハブ
+
+    Redis接続はワーカーごとに1本だけ張り、受信したメッセージを
+    接続中クライアントのキューへ振り分ける。アイドル接続のコストは
+    有界キュー1つ分のみ。
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._queues: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._subscribed = asyncio.Event()
+
+    @property
+    def connection_count(self) -> int:
+        """接続中クライアント数"""
+        return sum(len(queues) for queues in self._queues.values())
+
+    async def start(self) -> None:
+        """購読ループを開始"""
+        if self._reader is None:
+            self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            self._reader = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """購読ループを停止"""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """ユーザー宛てイベントを受け取るキューを払い出す"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if not self._queues[user_id]:
+                await self._pubsub.subscribe(user_channel(user_id))
+            self._queues[user_id].add(queue)
+            self._subscribed.set()
+        try:
+            yield queue
+        finally:
+            async with self._lock:
+                queues = self._queues.get(user_id)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self._queues[user_id]
+                        try:
+                            await self._pubsub.unsubscribe(user_channel(user_id))
+                        except Exception:
+                            logger.exception("チャンネルの購読解除に失敗しました")
+                if not self._queues:
+                    self._subscribed.clear()
+
+    async def _listen(self) -> None:
+        """Redisから受信してキューへ振り分け"""
+        while True:
+            await self._subscribed.wait()
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Pub/Subの受信に失敗しました")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                continue
+
+            user_id = int(message["channel"][len(CHANNEL_PREFIX):])
+            for queue in tuple(self._queues.get(user_id, ())):
+                self._offer(queue, message["data"])
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, data: str) -> None:
+        """キューが溢れたら古いイベントから捨てる（遅いクライアント対策）"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(data)
+
+
+hub = RealtimeHub(queue_size=settings.REALTIME_QUEUE_SIZE)
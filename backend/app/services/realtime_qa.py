@@ -0,0 +1,317 @@
+"""
+リアルタイムQ&A（AIヒアリング）のセッション処理
+発話終了から質問開始まで 1.5〜2秒 を目標に、重い処理を発話中に済ませておく
+
+    文字起こし（確定文）→ 抽出情報の差分更新 → 未確認項目（ギャップ）の更新
+                                              → 質問候補の先読み生成（LLM、発話中）
+    発話終了 → 準備済みの候補から最優先の質問を即座に返す
+
+確定文ごとの抽出は正規表現による軽量な差分処理で、LLMは質問文の先読みにだけ使う。
+先読みが間に合わない・失敗した項目はテンプレートの質問で答えるため、
+発話終了後にLLMの応答を待つことはない（実行中の先読みを QA_EOU_GRACE_MS だけ待つ）。
+段階ごとの処理時間は qa_stage_duration_seconds に記録する。
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set
+
+from app.config import settings
+from app.models.matching import BuyerConfig
+from app.monitoring.metrics import observe_qa_stage
+from app.services.asr import TranscriptEvent
+from app.services.llm import LLMBusy, LLMClient, llm_client
+
+logger = logging.getLogger(__name__)
+
+SPECULATION_MAX_TOKENS = 400
+
+SPECULATION_PROMPT = (
+    "あなたはバイヤーの代理としてサプライヤーのプレゼンを聞いているヒアリング担当です。"
+    "まだ確認できていない項目について、直前の発言の流れを踏まえた自然で簡潔な質問を"
+    "項目ごとに1つ作成し、次の形式のJSONで出力してください。\n"
+    '{"questions": [{"key": "項目のキー", "question": "質問文"}]}'
+)
+
+
+# ============ 抽出 ============
+
+def _number(value: str) -> float:
+    number = float(value.replace(",", ""))
+    return int(number) if number.is_integer() else number
+
+
+def _lead_time_weeks(match: re.Match) -> float:
+    value = _number(match.group(1))
+    unit = match.group(2)
+    if unit == "日":
+        return round(value / 7, 1)
+    if unit in ("か月", "ヶ月", "カ月", "ケ月"):
+        return round(value * 4.3, 1)
+    return value
+
+
+# (キー, パターン, 値の取り出し) 抽出データ（extracted_info）と同じキーを使う
+EXTRACTORS = (
+    ("min_lot", re.compile(r"最小ロット[^\d]{0,10}(\d[\d,]*)"), lambda m: _number(m.group(1))),
+    ("lead_time_weeks",
+     re.compile(r"納期[^\d]{0,15}(\d+(?:\.\d+)?)\s*(週間|週|日|か月|ヶ月|カ月|ケ月)"),
+     _lead_time_weeks),
+    ("iso_certified", re.compile(r"ISO\s?\d{4,5}", re.IGNORECASE), lambda m: True),
+    ("unit_price_yen", re.compile(r"(?:単価|価格)[^円]{0,15}?(\d[\d,]*)\s*円"), lambda m: _number(m.group(1))),
+    ("discount_percent", re.compile(r"(\d+(?:\.\d+)?)\s*%\s*(?:の)?(?:削減|値引き|割引|オフ|安)"),
+     lambda m: _number(m.group(1))),
+)
+
+
+def extract_facts(text: str) -> Dict[str, Any]:
+    """確定文1つから抽出データを取り出す"""
+    text = unicodedata.normalize("NFKC", text)
+    facts: Dict[str, Any] = {}
+    for key, pattern, convert in EXTRACTORS:
+        match = pattern.search(text)
+        if match:
+            facts[key] = convert(match)
+    return facts
+
+
+# ============ ギャップ（未確認項目） ============
+
+class Gap(NamedTuple):
+    key: str
+    label: str
+    priority: int             # 大きいほど先に質問する
+    question: str             # 先読みが間に合わない場合のテンプレート
+    patterns: Sequence[str]   # 発言に含まれていれば確認済みとみなす語
+
+
+# 必須条件・深掘りポイントが無くても確認する基本項目
+DEFAULT_GAPS = (
+    Gap("unit_price_yen", "価格", 1, "価格や値引きの条件について具体的に教えていただけますか？", ("価格", "単価", "円")),
+    Gap("lead_time_weeks", "納期", 1, "発注から納品までの標準的な納期はどのくらいでしょうか？", ("納期",)),
+    Gap("track_record", "導入実績", 1, "同業他社での導入実績について教えていただけますか？", ("実績", "導入事例")),
+    Gap("support", "サポート体制", 1, "導入後のサポート体制について教えていただけますか？", ("サポート", "保守")),
+)
+
+# 必須条件でよく使うキーの表示名とテンプレート
+CONDITION_LABELS = {
+    "min_lot": ("最小ロット", "最小ロットは何個からご対応いただけますか？"),
+    "lead_time_weeks": ("納期", "発注から納品までの納期は何週間でしょうか？"),
+    "iso_certified": ("ISO認証", "ISO認証の取得状況を教えていただけますか？"),
+}
+
+
+def build_gaps(config: Optional[BuyerConfig]) -> List[Gap]:
+    """バイヤー要件の必須条件（優先度3）・キーワード（深掘り、優先度2）と基本項目から確認項目を作る"""
+    gaps: Dict[str, Gap] = {}
+    if config is not None:
+        for condition in config.mandatory_conditions or []:
+            key = condition["key"]
+            label, question = CONDITION_LABELS.get(key, (key, f"{key}について具体的に教えていただけますか？"))
+            gaps[key] = Gap(key, label, 3, question, ())
+        for keyword in config.keywords or []:
+            key = f"keyword:{keyword}"
+            gaps[key] = Gap(key, keyword, 2, f"{keyword}について詳しく教えていただけますか？", (keyword,))
+    for gap in DEFAULT_GAPS:
+        gaps.setdefault(gap.key, gap)
+    return sorted(gaps.values(), key=lambda g: -g.priority)
+
+
+# ============ セッション ============
+
+class RealtimeQASession:
+    """1回のリアルタイムプレゼンの状態（文字起こし・抽出データ・質問候補）
+
+    send には接続先へメッセージ（dict）を送るコルーチン関数を渡す。
+    """
+
+    def __init__(
+        self,
+        gaps: Sequence[Gap],
+        send: Callable[[dict], Awaitable[None]],
+        client: Optional[LLMClient] = None,
+        speculate: bool = True,
+    ):
+        self.gaps = list(gaps)
+        self.send = send
+        self.client = client or llm_client
+        self.speculate = speculate
+        self.transcript: List[str] = []
+        self.partial = ""
+        self.facts: Dict[str, Any] = {}
+        self.covered: Set[str] = set()
+        self.asked: Set[str] = set()
+        self.candidates: Dict[str, str] = {}   # ギャップのキー → 先読みした質問
+        self.last_speech_at: Optional[float] = None
+        self.latencies: List[float] = []       # 発話終了 → 質問（秒）
+        self._speculation: Optional[asyncio.Task] = None
+        self._speculating = False
+        self._rerun = False
+
+    @property
+    def speaking(self) -> bool:
+        """前回の発話終了の後に発言があるか"""
+        return self.last_speech_at is not None
+
+    def open_gaps(self) -> List[Gap]:
+        return [g for g in self.gaps if g.key not in self.covered and g.key not in self.asked]
+
+    def recent_transcript(self) -> str:
+        return "".join(self.transcript + [self.partial])[-settings.QA_TRANSCRIPT_WINDOW_CHARS:]
+
+    async def handle(self, event: TranscriptEvent) -> None:
+        observe_qa_stage("asr", time.perf_counter() - event.received_at)
+        if event.kind == "partial":
+            self.partial = event.text
+            self.last_speech_at = event.received_at
+        elif event.kind == "final":
+            self.partial = ""
+            self.last_speech_at = event.received_at
+            await self._add_final(event.text)
+        elif event.kind == "end_of_utterance":
+            await self._end_of_utterance(event.received_at)
+
+    async def _add_final(self, text: str) -> None:
+        started = time.perf_counter()
+        self.transcript.append(text)
+        facts = extract_facts(text)
+        normalized = unicodedata.normalize("NFKC", text)
+        covered = {
+            g.key for g in self.gaps
+            if g.key not in self.covered
+            and (g.key in facts or any(p in normalized for p in g.patterns))
+        }
+        self.facts.update(facts)
+        self.covered |= covered
+        observe_qa_stage("extract", time.perf_counter() - started)
+
+        if facts or covered:
+            await self.send({
+                "type": "state",
+                "extracted": self.facts,
+                "open_gaps": [g.key for g in self.open_gaps()],
+            })
+        if self.speculate:
+            self._schedule_speculation()
+
+    # ---- 質問候補の先読み ----
+
+    def _schedule_speculation(self) -> None:
+        if self._speculation is not None and not self._speculation.done():
+            if self._speculating:
+                # LLM 呼び出し中なら完了後にもう一度だけ実行する
+                self._rerun = True
+                return
+            self._speculation.cancel()
+        self._speculation = asyncio.create_task(self._speculate(settings.QA_SPECULATION_DEBOUNCE_MS / 1000))
+
+    async def _speculate(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._speculating = True
+        try:
+            await self._generate_candidates()
+        finally:
+            self._speculating = False
+        if self._rerun:
+            self._rerun = False
+            self._speculation = asyncio.create_task(self._speculate(0))
+
+    async def _generate_candidates(self) -> None:
+        gaps = self.open_gaps()
+        if not gaps:
+            return
+        body = "\n".join([
+            "未確認の項目:",
+            *(f"- {g.key}: {g.label}" for g in gaps),
+            "抽出済みの情報: " + json.dumps(self.facts, ensure_ascii=False),
+            "直近の発言:",
+            self.recent_transcript(),
+        ])
+        started = time.perf_counter()
+        try:
+            text = await self.client.complete(
+                [{"role": "system", "content": SPECULATION_PROMPT}, {"role": "user", "content": body}],
+                max_tokens=SPECULATION_MAX_TOKENS,
+                json_mode=True,
+            )
+        except LLMBusy:
+            # テンプレートの質問で代替する
+            return
+        except Exception:
+            logger.exception("質問候補の生成に失敗しました")
+            return
+        finally:
+            observe_qa_stage("speculate", time.perf_counter() - started)
+        try:
+            questions = json.loads(text).get("questions") or []
+        except (ValueError, AttributeError):
+            return
+        keys = {g.key for g in gaps}
+        for item in questions:
+            if isinstance(item, dict) and item.get("key") in keys and item.get("question"):
+                self.candidates[item["key"]] = str(item["question"])
+
+    # ---- 発話終了 ----
+
+    def _fold_partial(self) -> Optional[str]:
+        """確定前の途中結果を確定文として扱う（ASRの確定より発話終了が先に来た場合）"""
+        if not self.partial:
+            return None
+        text, self.partial = self.partial, ""
+        return text
+
+    async def _end_of_utterance(self, received_at: float) -> None:
+        pending = self._fold_partial()
+        if pending:
+            await self._add_final(pending)
+        speech_end = self.last_speech_at
+        self.last_speech_at = None
+
+        if self.speculate:
+            if self._speculation is not None and not self._speculation.done():
+                await asyncio.wait({self._speculation}, timeout=settings.QA_EOU_GRACE_MS / 1000)
+        else:
+            await self._generate_candidates()
+
+        gaps = self.open_gaps()
+        if not gaps:
+            await self.send({"type": "no_question"})
+            return
+        gap = gaps[0]
+        question = self.candidates.pop(gap.key, None)
+        source = "llm" if question else "template"
+        self.asked.add(gap.key)
+
+        now = time.perf_counter()
+        latency = now - received_at
+        self.latencies.append(latency)
+        observe_qa_stage("question", latency)
+        await self.send({
+            "type": "question",
+            "key": gap.key,
+            "label": gap.label,
+            "question": question or gap.question,
+            "source": source,
+            "latency_ms": {
+                "end_of_utterance_to_question": round(latency * 1000, 1),
+                "speech_end_to_question": round((now - speech_end) * 1000, 1) if speech_end else None,
+            },
+        })
+
+    async def close(self) -> None:
+        if self._speculation is not None:
+            self._rerun = False
+            self._speculation.cancel()
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "questions": len(latencies),
+            "extracted": self.facts,
+            "open_gaps": [g.key for g in self.open_gaps()],
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
@@ -0,0 +1,189 @@
+"""
+期限スケジューラ
+期限付きのジョブ（Q&Aラウンドの期限切れ・リマインドなど）を Redis のソート済み集合に
+期限（ミリ秒）をスコアとして登録し、期限の来たものだけを取り出して一括処理する
+
+    scheduler:due  ZSET  member = "種別:参照ID"  score = 実行予定時刻（ms）
+
+全件を定期的に走査せず、次の期限まで（最大 SCHEDULER_MAX_SLEEP_SECONDS）眠る。
+取り出しは Lua スクリプトで原子的に行い、取り出したジョブのスコアをリース期限に
+置き換える（リース）。複数ワーカーで動かしても同じジョブを同時に処理することはなく、
+処理中にワーカーが落ちたジョブはリース切れで他のワーカーが再取得する。
+ハンドラは種別ごとの参照IDの一覧を受け取るため、同じジョブの再実行に対して冪等にする。
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+DUE_KEY = "scheduler:due"
+
+Handler = Callable[[List[int]], Awaitable[None]]
+
+# 期限の来たジョブを最大 ARGV[2] 件取り出し、スコアをリース期限（ARGV[3]）に置き換える
+_CLAIM_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for i, member in ipairs(members) do
+    redis.call('ZADD', KEYS[1], ARGV[3], member)
+end
+return members
+"""
+
+# リースを保持しているジョブだけを削除する（処理中に再登録されたジョブは残す）
+_COMPLETE_SCRIPT = """
+local removed = 0
+for i, member in ipairs(ARGV) do
+    if i > 1 and tonumber(redis.call('ZSCORE', KEYS[1], member)) == tonumber(ARGV[1]) then
+        removed = removed + redis.call('ZREM', KEYS[1], member)
+    end
+end
+return removed
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def job_member(kind: str, ref: int) -> str:
+    return f"{kind}:{ref}"
+
+
+class DeadlineScheduler:
+    """Redis のソート済み集合による期限スケジューラ"""
+
+    def __init__(
+        self,
+        key: str = DUE_KEY,
+        lease_seconds: float = 60.0,
+        batch_size: int = 500,
+        max_sleep_seconds: float = 5.0,
+    ):
+        self.key = key
+        self.lease_ms = int(lease_seconds * 1000)
+        self.batch_size = batch_size
+        self.max_sleep_seconds = max_sleep_seconds
+        self._handlers: Dict[str, Handler] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._backlog = 0
+
+    @property
+    def backlog(self) -> int:
+        """前回の取り出しで期限を過ぎていたジョブ数（バッチ上限に達していれば未処理が残っている）"""
+        return self._backlog
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """ジョブ種別のハンドラ（参照IDの一覧を受け取る）を登録"""
+        self._handlers[kind] = handler
+
+    async def schedule(self, jobs: Iterable[Tuple[str, int, float]]) -> None:
+        """(種別, 参照ID, 実行予定時刻のUNIX秒) を登録（登録済みなら予定時刻を更新）"""
+        # ミリ秒に切り上げ、予定時刻より前に取り出さない
+        mapping = {job_member(kind, ref): math.ceil(due_at * 1000) for kind, ref, due_at in jobs}
+        if not mapping:
+            return
+        await redis_client.zadd(self.key, mapping)
+        self._wakeup.set()
+
+    async def cancel(self, jobs: Iterable[Tuple[str, int]]) -> None:
+        """(種別, 参照ID) の登録を取り消す"""
+        members = [job_member(kind, ref) for kind, ref in jobs]
+        if members:
+            await redis_client.zrem(self.key, *members)
+
+    async def claim(self, now_ms: Optional[int] = None) -> Tuple[List[str], int]:
+        """期限の来たジョブをリース付きで取り出す"""
+        now_ms = now_ms if now_ms is not None else _now_ms()
+        lease_until = now_ms + self.lease_ms
+        members = await redis_client.eval(_CLAIM_SCRIPT, 1, self.key, now_ms, self.batch_size, lease_until)
+        return list(members), lease_until
+
+    async def complete(self, members: List[str], lease_until: int) -> int:
+        if not members:
+            return 0
+        return await redis_client.eval(_COMPLETE_SCRIPT, 1, self.key, lease_until, *members)
+
+    async def run_once(self) -> int:
+        """期限の来たジョブを1バッチ処理し、処理件数を返す"""
+        members, lease_until = await self.claim()
+        self._backlog = len(members)
+        if not members:
+            return 0
+
+        by_kind: Dict[str, List[int]] = defaultdict(list)
+        unknown: List[str] = []
+        for member in members:
+            kind, _, ref = member.rpartition(":")
+            if kind in self._handlers and ref.isdigit():
+                by_kind[kind].append(int(ref))
+            else:
+                unknown.append(member)
+        if unknown:
+            logger.warning("ハンドラ未登録のジョブを破棄します: %s", unknown[:10])
+
+        done = list(unknown)
+        for kind, refs in by_kind.items():
+            try:
+                await self._handlers[kind](refs)
+            except Exception:
+                # リース切れ後に再実行される
+                logger.exception("期限ジョブの処理に失敗しました: %s (%d件)", kind, len(refs))
+                continue
+            done.extend(job_member(kind, ref) for ref in refs)
+        await self.complete(done, lease_until)
+        return len(done)
+
+    async def next_due_in(self) -> float:
+        """次のジョブまでの秒数（max_sleep_seconds が上限）"""
+        head = await redis_client.zrange(self.key, 0, 0, withscores=True)
+        if not head:
+            return self.max_sleep_seconds
+        delay = (head[0][1] - _now_ms()) / 1000
+        return min(max(delay, 0.0), self.max_sleep_seconds)
+
+    async def start(self) -> None:
+        """スケジューラのループを開始"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                # バッチ上限まで取り出せた場合は眠らずに続ける
+                if await self.run_once() >= self.batch_size:
+                    continue
+                delay = await self.next_due_in()
+            except Exception:
+                logger.exception("期限スケジューラの実行に失敗しました")
+                delay = self.max_sleep_seconds
+            if delay <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+deadline_scheduler = DeadlineScheduler(
+    lease_seconds=settings.SCHEDULER_LEASE_SECONDS,
+    batch_size=settings.SCHEDULER_BATCH_SIZE,
+    max_sleep_seconds=settings.SCHEDULER_MAX_SLEEP_SECONDS,
+)
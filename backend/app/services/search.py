@@ -0,0 +1,165 @@
+"""
+提案の全文検索サービス
+日本語は単語境界が無いため、正規化したテキストを n-gram（2文字＋非ASCIIの1文字）に
+分解して proposals.search_tokens（GINインデックス）に保持する
+
+検索は「全トークンを含む行」をインデックスで絞り込んだ後、正規化テキストへの
+部分一致で誤検出を除き、タイトル一致を優先して並べる。
+"""
+import html
+import re
+import unicodedata
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.organization import Organization
+from app.models.proposal import Proposal, ProposalStatus
+
+# 検索対象の属性（変更時にトークンを作り直す）
+INDEXED_FIELDS = ("title", "description", "extracted_info")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(value: str) -> str:
+    """全角英数・半角カナを揃え、小文字化して空白を詰める"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", value).lower()).strip()
+
+
+def _strings(value: Any) -> Iterator[str]:
+    """抽出データ（JSON）に含まれる文字列を列挙"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+
+def build_search_text(title: str, description: Optional[str], extracted_info: Any) -> str:
+    """検索用の正規化テキスト（先頭はタイトル）"""
+    parts = [title or "", description or ""]
+    parts.extend(_strings(extracted_info))
+    return normalize("\n".join(p for p in parts if p))[:settings.SEARCH_TEXT_MAX_CHARS]
+
+
+def _term_tokens(term: str) -> List[str]:
+    if len(term) == 1:
+        return [term] if not term.isascii() else []
+    return [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """インデックス用トークン（重複なし）"""
+    tokens = set()
+    for term in text.split(" "):
+        tokens.update(term[i:i + 2] for i in range(len(term) - 1))
+        tokens.update(ch for ch in term if not ch.isascii())
+    return sorted(tokens)
+
+
+def parse_query(query: str) -> List[str]:
+    """検索語を空白区切りで分解（AND検索）"""
+    return [term for term in normalize(query).split(" ") if term]
+
+
+def apply_search_fields(proposal: Proposal) -> None:
+    """提案の検索用カラムを更新"""
+    proposal.search_text = build_search_text(
+        proposal.title, proposal.description, proposal.extracted_info
+    )
+    proposal.search_tokens = tokenize(proposal.search_text)
+
+
+@event.listens_for(Session, "before_flush")
+def _index_proposals(session, flush_context, instances):
+    """追加・変更された提案の検索トークンを同じフラッシュ内で更新"""
+    for obj in session.new:
+        if isinstance(obj, Proposal):
+            apply_search_fields(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Proposal):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+                apply_search_fields(obj)
+
+
+def highlight(text: str, terms: Sequence[str], width: Optional[int] = 60) -> Optional[str]:
+    """最初の一致箇所の前後を切り出し、一致部分を <mark> で囲む（HTMLエスケープ済み）
+
+    width が None なら切り出さずに全体を返す。
+    """
+    positions = [(text.find(term), term) for term in terms]
+    positions = [(pos, term) for pos, term in positions if pos >= 0]
+    if not positions:
+        return None
+    if width is None:
+        start, end = 0, len(text)
+    else:
+        first = min(pos for pos, _ in positions)
+        start = max(0, first - width // 2)
+        end = min(len(text), first + width)
+    snippet = text[start:end]
+
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)))
+    out, last = [], 0
+    for m in pattern.finditer(snippet):
+        out.append(html.escape(snippet[last:m.start()]))
+        out.append(f"<mark>{html.escape(m.group())}</mark>")
+        last = m.end()
+    out.append(html.escape(snippet[last:]))
+    return ("…" if start > 0 else "") + "".join(out) + ("…" if end < len(text) else "")
+
+
+async def search_proposals(
+    db: AsyncSession,
+    query: Optional[str],
+    status: Optional[ProposalStatus] = None,
+    offset: int = 0,
+    limit: int = 20,
+    supplier_user_id: Optional[int] = None,
+) -> Tuple[List[tuple], int, List[str]]:
+    """提案を検索し、(提案, 組織名) の一覧・総件数・正規化済み検索語を返す
+
+    supplier_user_id を指定するとその提案者の提案だけを対象にする。
+    """
+    terms = parse_query(query) if query else []
+    conditions = []
+    if supplier_user_id is not None:
+        conditions.append(Proposal.supplier_user_id == supplier_user_id)
+    if status:
+        conditions.append(Proposal.status == status)
+    if terms:
+        tokens = sorted({token for term in terms for token in _term_tokens(term)})
+        if tokens:
+            conditions.append(Proposal.search_tokens.contains(tokens))
+        for term in terms:
+            conditions.append(Proposal.search_text.contains(term, autoescape=True))
+
+    stmt = (
+        select(Proposal, Organization.name)
+        .join(Organization, Organization.id == Proposal.supplier_org_id)
+        .where(*conditions)
+    )
+    if terms:
+        # タイトル部分（search_text の先頭）に一致した語の数を優先
+        title_hits = sum(
+            case(
+                (func.strpos(Proposal.search_text, term).between(1, func.char_length(Proposal.title)), 1),
+                else_=0,
+            )
+            for term in terms
+        )
+        stmt = stmt.order_by(title_hits.desc(), Proposal.created_at.desc())
+    else:
+        stmt = stmt.order_by(Proposal.created_at.desc())
+
+    rows = (await db.execute(stmt.offset(offset).limit(limit))).all()
+    total = await db.scalar(select(func.count()).select_from(Proposal).where(*conditions))
+    return rows, total or 0, terms
@@ -0,0 +1,121 @@
+"""
+オブジェクトストレージ（MinIO）サービス
+"""
+import asyncio
+import io
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.monitoring.metrics import observe_call
+from app.utils.lazy import lazy_import
+
+minio = lazy_import("minio")
+urllib3 = lazy_import("urllib3")
+
+_client = None
+_probe_client = None
+
+
+def _create_client(connect_timeout: float, read_timeout: float, retries: int):
+    http_client = urllib3.PoolManager(
+        timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+        maxsize=10,
+        retries=urllib3.Retry(
+            total=retries, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504],
+        ),
+    )
+    return minio.Minio(
+        settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=False,
+        http_client=http_client,
+    )
+
+
+def get_storage_client():
+    """MinIOクライアントを取得（初回利用時に生成）"""
+    global _client
+    if _client is None:
+        _client = _create_client(
+            settings.MINIO_CONNECT_TIMEOUT_SECONDS, settings.MINIO_READ_TIMEOUT_SECONDS, retries=5,
+        )
+    return _client
+
+
+def _get_probe_client():
+    # ヘルスチェック用。wait_for で打ち切ってもスレッドは止まらないため、
+    # クライアント側でもプローブのタイムアウトで打ち切り、再試行しない
+    global _probe_client
+    if _probe_client is None:
+        timeout = settings.HEALTH_PROBE_TIMEOUT_SECONDS
+        _probe_client = _create_client(timeout, timeout, retries=0)
+    return _probe_client
+
+
+async def _call(func, *args, **kwargs):
+    # minio クライアントは同期APIのためスレッドで実行
+    started = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        observe_call("minio", time.perf_counter() - started)
+
+
+async def bucket_exists(bucket: str = settings.MINIO_BUCKET) -> bool:
+    """バケットの存在確認"""
+    return await _call(get_storage_client().bucket_exists, bucket)
+
+
+async def probe_bucket(bucket: str = settings.MINIO_BUCKET) -> bool:
+    """ヘルスチェック用のバケットの存在確認（HEALTH_PROBE_TIMEOUT_SECONDS で打ち切る）"""
+    return await _call(_get_probe_client().bucket_exists, bucket)
+
+
+async def put_bytes(key: str, data: bytes, content_type: str,
+                    bucket: str = settings.MINIO_BUCKET) -> None:
+    """オブジェクトを保存"""
+    await _call(
+        get_storage_client().put_object,
+        bucket, key, io.BytesIO(data), len(data), content_type=content_type,
+    )
+
+
+async def put_file(key: str, path: str, content_type: str, metadata: Optional[Dict[str, str]] = None,
+                   bucket: str = settings.MINIO_BUCKET) -> None:
+    """ファイルをオブジェクトとして保存（大きなファイルはマルチパートで送信される）"""
+    await _call(
+        get_storage_client().fput_object,
+        bucket, key, path, content_type=content_type, metadata=metadata,
+    )
+
+
+async def object_size(key: str, bucket: str = settings.MINIO_BUCKET) -> Optional[int]:
+    """オブジェクトのサイズ（存在しなければ None）"""
+    try:
+        stat = await _call(get_storage_client().stat_object, bucket, key)
+    except minio.error.S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return None
+        raise
+    return stat.size
+
+
+def _read_object(bucket: str, key: str) -> Optional[bytes]:
+    try:
+        response = get_storage_client().get_object(bucket, key)
+    except minio.error.S3Error as e:
+        if e.code == "NoSuchKey":
+            return None
+        raise
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+async def get_bytes(key: str, bucket: str = settings.MINIO_BUCKET) -> Optional[bytes]:
+    """オブジェクトを取得（存在しなければ None）"""
+    return await _call(_read_object, bucket, key)
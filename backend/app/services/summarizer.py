@@ -0,0 +1,541 @@
+"""
+資料の階層要約（map-reduce）
+資料チャンク（services/context.py のチャンクストア）をスライド・ページ単位で
+葉にまとめて並列に要約し、要約を木構造で統合して最終レポートを作る
+
+    result = await summarize(plan(chunks, hashes))
+    result.report["three_line_summary"]
+
+各ノードの要約は「入力の内容ハッシュ」をキーに Redis へ保存する。
+葉のキーはチャンクのハッシュ、上位ノードのキーは子ノードのキーから作るため、
+数枚のスライドだけが変わった改訂版では、変わった枝のノードだけを要約し直す。
+まとまりの区切りも内容ハッシュで決めるので、スライドの挿入・削除で
+後続のまとまりがずれてキャッシュが外れることもない。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.models.document_chunk import DocumentChunk
+from app.models.evaluation import Evaluation
+from app.services.context import Chunk, format_context
+from app.services.llm import LLMClient, llm_client
+
+logger = logging.getLogger(__name__)
+
+_background_tasks: Set[asyncio.Task] = set()
+
+# プロンプトを変えたら上げる（キャッシュのキーに含まれる）
+PROMPT_VERSION = "2"
+
+MAP_MAX_TOKENS = 400
+REDUCE_MAX_TOKENS = 600
+FINAL_MAX_TOKENS = 1500
+
+# ストリーミング時に枝の要約の進み具合を送る間隔
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+KEY_POINT_CATEGORIES = ("価格", "品質", "納期", "実績", "サポート", "その他")
+
+MAP_PROMPT = (
+    "以下は提案資料の一部です。バイヤーが提案を比較検討できるよう、価格・品質・納期・"
+    "実績・サポート・条件などの事実と数値を漏らさず、箇条書きで簡潔に要約してください。"
+    "資料に書かれていない内容は書かないでください。"
+)
+REDUCE_PROMPT = (
+    "以下は同じ提案資料の連続する部分の要約です。重複をまとめ、事実と数値を保ったまま"
+    "1つの箇条書きに統合してください。"
+)
+FINAL_PROMPT = (
+    "以下は提案資料全体の要約です。バイヤー向けのレポートを次の形式のJSONで出力してください。\n"
+    '{"three_line_summary": "3行の要約（改行区切り）", '
+    '"key_points": [{"category": "' + "|".join(KEY_POINT_CATEGORIES) + '", "point": "要点", "detail": "補足"}], '
+    '"strengths": ["強み"], "concerns": ["懸念点"], "confirmation_items": ["バイヤーが提案者に確認すべき事項"]}'
+)
+
+
+# ============ 要約のキャッシュ ============
+
+class SummaryCache(ABC):
+    """要約キャッシュの基底クラス（内容ハッシュのキー → 要約）"""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """キャッシュ済みのキーだけを返す"""
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, str]) -> None:
+        """要約を保存する"""
+
+
+class RedisSummaryCache(SummaryCache):
+    PREFIX = "summary:node:"
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        values = await redis_client.mget([self.PREFIX + k for k in keys])
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    async def set_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self.PREFIX + key, value, ex=settings.SUMMARY_CACHE_TTL_SECONDS)
+            await pipe.execute()
+
+
+class MemorySummaryCache(SummaryCache):
+    """プロセス内のキャッシュ（テスト・ベンチマーク用）"""
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        return {k: self.data[k] for k in keys if k in self.data}
+
+    async def set_many(self, items: Dict[str, str]) -> None:
+        self.data.update(items)
+
+
+# ============ 木の構築 ============
+
+class Node(NamedTuple):
+    key: str
+    level: int               # 0 が葉
+    chunks: Tuple[Chunk, ...]  # 葉が含むチャンク
+    children: Tuple["Node", ...]
+
+
+class SummaryPlan(NamedTuple):
+    root_key: str            # 最終レポートのキー（資料全体の内容ハッシュ）
+    top: List[Node]          # 最終レポートに渡すノード
+    node_count: int
+
+
+def _key(kind: str, model: str, parts: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{kind}:{PROMPT_VERSION}:{model}".encode())
+    for part in parts:
+        digest.update(b"\0" + part.encode())
+    return digest.hexdigest()
+
+
+def content_hashes(chunks: Sequence[Chunk]) -> List[str]:
+    """チャンクの内容ハッシュ（チャンクストアの content_hash と同じ）"""
+    return [hashlib.sha256(c.text.encode()).hexdigest() for c in chunks]
+
+
+def _is_boundary(key: str, fanout: int) -> bool:
+    """内容ハッシュで決まる区切り（平均 fanout 件ごと）"""
+    return int(key[:8], 16) % fanout == 0
+
+
+def _group_leaves(chunks: Sequence[Chunk], hashes: Sequence[str]) -> List[List[int]]:
+    """チャンクを葉にまとめる（ページの切れ目で区切り、トークン上限で強制的に区切る）"""
+    groups: List[List[int]] = []
+    current: List[int] = []
+    tokens = 0
+    for i, chunk in enumerate(chunks):
+        if current and tokens + chunk.token_count > settings.SUMMARY_LEAF_MAX_TOKENS:
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += chunk.token_count
+        page_end = i + 1 == len(chunks) or (chunks[i + 1].source, chunks[i + 1].page) != (chunk.source, chunk.page)
+        if page_end and _is_boundary(hashes[i], settings.SUMMARY_LEAF_PAGES):
+            groups.append(current)
+            current, tokens = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _group_nodes(nodes: Sequence[Node]) -> List[List[Node]]:
+    fanout = settings.SUMMARY_REDUCE_FANOUT
+    groups: List[List[Node]] = []
+    current: List[Node] = []
+    for node in nodes:
+        current.append(node)
+        if _is_boundary(node.key, fanout) or len(current) >= fanout * 2:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    if len(groups) == len(nodes):
+        # 区切りが続いて統合が進まない場合は位置で区切る
+        groups = [list(nodes[i:i + fanout]) for i in range(0, len(nodes), fanout)]
+    return groups
+
+
+def plan(chunks: Sequence[Chunk], hashes: Sequence[str], model: Optional[str] = None) -> SummaryPlan:
+    """要約の木を組み立てる（LLMは呼ばない）"""
+    model = model or llm_client.model
+    level = [
+        Node(_key("leaf", model, [hashes[i] for i in group]), 0, tuple(chunks[i] for i in group), ())
+        for group in _group_leaves(chunks, hashes)
+    ]
+    count = len(level)
+    depth = 0
+    while len(level) > settings.SUMMARY_REDUCE_FANOUT:
+        depth += 1
+        level = [
+            Node(_key("node", model, [n.key for n in group]), depth, (), tuple(group))
+            for group in _group_nodes(level)
+        ]
+        count += len(level)
+    return SummaryPlan(_key("final", model, [n.key for n in level]), level, count)
+
+
+# ============ 要約の実行 ============
+
+class SummaryResult(NamedTuple):
+    report: dict
+    root_key: str
+    llm_calls: int
+    cache_hits: int
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def _key_point(item: Any) -> Optional[dict]:
+    if not isinstance(item, dict) or not item.get("point"):
+        return None
+    category = str(item.get("category") or "その他")
+    return {
+        "category": category if category in KEY_POINT_CATEGORIES else "その他",
+        "point": str(item["point"]),
+        # 裏付けの確認はファクトチェックで行う
+        "verification_status": "info",
+        "detail": str(item["detail"]) if item.get("detail") else None,
+    }
+
+
+def parse_report(text: str) -> dict:
+    """最終レポート（JSON）を要約APIの形に整える"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    key_points = [p for p in map(_key_point, data.get("key_points") or []) if p is not None]
+    summary = data.get("three_line_summary")
+    if isinstance(summary, list):
+        summary = "\n".join(_as_list(summary))
+    return {
+        "three_line_summary": str(summary or "").strip(),
+        "key_points": key_points,
+        "strengths": _as_list(data.get("strengths")),
+        "concerns": _as_list(data.get("concerns")),
+        "confirmation_items": _as_list(data.get("confirmation_items")),
+    }
+
+
+class ReportStreamParser:
+    """最終レポートJSONの逐次パーサ
+
+    生成途中のJSONを受け取り、完成したトップレベルの文字列値と配列の要素を
+    (フィールド名, 値) として順に返す。要点や確認事項を1件ずつ表示するために使う。
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._string_start = 0
+        self._element_start = 0
+
+    def _item(self, field: Optional[str], raw: str) -> Optional[Tuple[str, Any]]:
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return None
+        if field == "key_points":
+            value = _key_point(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        return (field, value) if field and value else None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        items: List[Tuple[str, Any]] = []
+        start = len(self._text)
+        self._text += text
+        for i in range(start, len(self._text)):
+            ch = self._text[i]
+            depth = len(self._stack)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    raw = self._text[self._string_start:i + 1]
+                    if depth == 1 and self._expect_key:
+                        self._key = json.loads(raw)
+                    elif depth == 1 or (depth == 2 and self._stack[1] == "["):
+                        items.append(self._item(self._key, raw))
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._stack.append(ch)
+                if depth == 0:
+                    self._expect_key = True
+                elif depth == 2:
+                    self._element_start = i
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if depth == 3 and self._stack[1] == "[":
+                    items.append(self._item(self._key, self._text[self._element_start:i + 1]))
+            elif depth == 1 and ch in ",:":
+                self._expect_key = ch == ","
+        return [item for item in items if item is not None]
+
+
+class _TreeRun:
+    """要約の木の1回分の実行（キャッシュ済みの要約と今回作った要約を保持）"""
+
+    def __init__(self, summary_plan: SummaryPlan, client: LLMClient, cache: SummaryCache):
+        self.plan = summary_plan
+        self.client = client
+        self.cache = cache
+        self.known: Dict[str, str] = {}
+        self.fresh: Dict[str, str] = {}
+        self.calls = 0
+        self.hits = 0
+
+    async def load(self) -> None:
+        keys = [self.plan.root_key] + [n.key for n in _all_nodes(self.plan.top)]
+        self.known = await self.cache.get_many(keys)
+        self.hits = len(self.known)
+
+    def pending(self) -> int:
+        """LLMで要約する必要があるノード数（キャッシュ済みノードの下は数えない）"""
+        count = 0
+        stack = list(self.plan.top)
+        while stack:
+            node = stack.pop()
+            if node.key not in self.known:
+                count += 1
+                stack.extend(node.children)
+        return count
+
+    def messages(self, prompt: str, body: str) -> List[Dict[str, str]]:
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": body}]
+
+    async def resolve(self, node: Node) -> str:
+        if node.key in self.known:
+            return self.known[node.key]
+        if node.level == 0:
+            prompt, body, max_tokens = MAP_PROMPT, format_context(node.chunks), MAP_MAX_TOKENS
+        else:
+            parts = await asyncio.gather(*(self.resolve(child) for child in node.children))
+            prompt, body, max_tokens = REDUCE_PROMPT, "\n\n---\n\n".join(parts), REDUCE_MAX_TOKENS
+        self.calls += 1
+        summary = await self.client.complete(self.messages(prompt, body), max_tokens=max_tokens)
+        self.known[node.key] = self.fresh[node.key] = summary
+        return summary
+
+    async def final_messages(self) -> List[Dict[str, str]]:
+        parts = await asyncio.gather(*(self.resolve(node) for node in self.plan.top))
+        return self.messages(FINAL_PROMPT, "\n\n---\n\n".join(parts))
+
+    async def save(self) -> None:
+        try:
+            await self.cache.set_many(self.fresh)
+        except Exception:
+            logger.exception("要約キャッシュの保存に失敗しました")
+
+    def result(self, report_text: str) -> SummaryResult:
+        return SummaryResult(parse_report(report_text), self.plan.root_key, self.calls, self.hits)
+
+
+def _all_nodes(nodes: Sequence[Node]) -> List[Node]:
+    found: List[Node] = []
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        found.append(node)
+        stack.extend(node.children)
+    return found
+
+
+async def summarize(
+    summary_plan: SummaryPlan,
+    client: Optional[LLMClient] = None,
+    cache: Optional[SummaryCache] = None,
+    use_cache: bool = True,
+) -> SummaryResult:
+    """要約の木を実行する
+
+    キャッシュ済みのノードはその下の枝ごと飛ばし、残りは葉から並列に要約する。
+    use_cache=False でもキャッシュへの書き込みは行う（再生成用）。
+    """
+    run = _TreeRun(summary_plan, client or llm_client, cache or RedisSummaryCache())
+    if use_cache:
+        await run.load()
+    try:
+        report_text = run.known.get(summary_plan.root_key)
+        if report_text is None:
+            messages = await run.final_messages()
+            run.calls += 1
+            report_text = await run.client.complete(messages, max_tokens=FINAL_MAX_TOKENS, json_mode=True)
+            run.fresh[summary_plan.root_key] = report_text
+    finally:
+        # 途中で失敗しても、完了した枝は次回に再利用する
+        await run.save()
+    return run.result(report_text)
+
+
+async def stream_summary(
+    summary_plan: SummaryPlan,
+    client: Optional[LLMClient] = None,
+    cache: Optional[SummaryCache] = None,
+    use_cache: bool = True,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """要約の木を実行し、途中経過をイベントとして返す
+
+    - ("progress", {"done": n, "total": m}): 枝の要約の進み具合
+    - ("token", str): 最終レポートの生成中のテキスト
+    - ("item", {"field": ..., "value": ...}): 完成したレポートの項目
+    - ("result", SummaryResult): 最後に1回
+
+    呼び出し元が途中でやめると（クライアント切断など）、実行中のLLM呼び出しを
+    取り消す。完了した枝の要約はキャッシュに残す。
+    """
+    run = _TreeRun(summary_plan, client or llm_client, cache or RedisSummaryCache())
+    if use_cache:
+        await run.load()
+    parser = ReportStreamParser()
+    try:
+        report_text = run.known.get(summary_plan.root_key)
+        if report_text is not None:
+            for field, value in parser.feed(report_text):
+                yield "item", {"field": field, "value": value}
+        else:
+            total = run.pending()
+            task = asyncio.create_task(run.final_messages())
+            try:
+                while True:
+                    done, _ = await asyncio.wait({task}, timeout=PROGRESS_INTERVAL_SECONDS)
+                    yield "progress", {"done": len(run.fresh), "total": total}
+                    if done:
+                        break
+                messages = task.result()
+            finally:
+                task.cancel()
+
+            pieces: List[str] = []
+            run.calls += 1
+            async with aclosing(
+                run.client.stream(messages, max_tokens=FINAL_MAX_TOKENS, json_mode=True)
+            ) as tokens:
+                async for text in tokens:
+                    pieces.append(text)
+                    yield "token", text
+                    for field, value in parser.feed(text):
+                        yield "item", {"field": field, "value": value}
+            report_text = "".join(pieces)
+            run.fresh[summary_plan.root_key] = report_text
+    finally:
+        # 取り消された場合もキャッシュの保存は最後まで行う
+        saving = asyncio.create_task(run.save())
+        _background_tasks.add(saving)
+        saving.add_done_callback(_background_tasks.discard)
+    yield "result", run.result(report_text)
+
+
+# ============ 提案の要約 ============
+
+async def load_chunks(db: AsyncSession, proposal_id: int) -> Tuple[List[Chunk], List[str]]:
+    """提案の資料チャンクを資料順に読み込む（チャンクと内容ハッシュ）"""
+    result = await db.execute(
+        select(
+            DocumentChunk.id, DocumentChunk.source, DocumentChunk.page, DocumentChunk.chunk_index,
+            DocumentChunk.text, DocumentChunk.token_count, DocumentChunk.content_hash,
+        )
+        .where(DocumentChunk.proposal_id == proposal_id)
+        .order_by(DocumentChunk.source, DocumentChunk.page, DocumentChunk.chunk_index)
+    )
+    rows = result.all()
+    return [Chunk(*row[:6]) for row in rows], [row[6] for row in rows]
+
+
+async def get_evaluation(db: AsyncSession, proposal_id: int) -> Optional[Evaluation]:
+    result = await db.execute(select(Evaluation).where(Evaluation.proposal_id == proposal_id))
+    return result.scalar_one_or_none()
+
+
+async def save_report(db: AsyncSession, proposal_id: int, result: SummaryResult) -> Evaluation:
+    """要約を評価に保存してコミットする
+
+    同じ提案の要約が並行して保存されても一意制約（proposal_id）で失敗しないよう、
+    INSERT ... ON CONFLICT DO UPDATE で1文で作成・更新する。
+    """
+    values = {
+        "summary": result.report["three_line_summary"],
+        "key_points": result.report["key_points"],
+        "strengths": result.report["strengths"],
+        "concerns": result.report["concerns"],
+        "confirmation_items": result.report["confirmation_items"],
+        "summary_hash": result.root_key,
+    }
+    stmt = insert(Evaluation).values(proposal_id=proposal_id, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Evaluation.proposal_id],
+        # ON CONFLICT の更新には Column.onupdate が適用されない
+        set_={**values, "updated_at": datetime.utcnow()},
+    ).returning(Evaluation)
+    # セッションに読み込み済みの評価も保存後の値で上書きする
+    evaluation = (await db.scalars(stmt, execution_options={"populate_existing": True})).one()
+    await db.commit()
+    logger.info(
+        "要約を保存しました proposal_id=%s llm_calls=%s cache_hits=%s",
+        proposal_id, result.llm_calls, result.cache_hits,
+    )
+    return evaluation
+
+
+async def generate_summary(db: AsyncSession, proposal_id: int, force: bool = False) -> Optional[Evaluation]:
+    """提案の要約を作成・更新して評価に保存する（資料が未登録なら None）
+
+    資料が前回の要約から変わっていなければ保存済みの要約をそのまま返す。
+    force=True ではキャッシュを使わずにすべて要約し直す。
+    """
+    chunks, hashes = await load_chunks(db, proposal_id)
+    if not chunks:
+        return None
+    summary_plan = plan(chunks, hashes)
+    evaluation = await get_evaluation(db, proposal_id)
+    if evaluation is not None and evaluation.summary_hash == summary_plan.root_key and not force:
+        return evaluation
+
+    # LLM の呼び出し中はDB接続を保持しない
+    await db.commit()
+    result = await summarize(summary_plan, use_cache=not force)
+    return await save_report(db, proposal_id, result)
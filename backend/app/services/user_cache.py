@@ -0,0 +1,226 @@
+"""
+ユーザー情報キャッシュ
+認証時のユーザー解決をプロセス内LRUとRedisでキャッシュし、DBアクセスを省く
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.redis import redis_client
+from app.db.session import async_session_maker
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+USER_KEY_PREFIX = "auth:user:"
+# ユーザーごとの世代番号（破棄のたびに加算し、破棄前に読んだ内容を書き戻させない）
+GENERATION_KEY_PREFIX = "auth:user-gen:"
+_INVALIDATE_PENDING_KEY = "user_cache_invalidations"
+
+# 認証で参照する属性（変更されたらキャッシュを破棄）
+CACHED_FIELDS = ("id", "email", "name", "role", "is_active", "organization_id")
+
+_background_tasks: Set[asyncio.Task] = set()
+
+# プロセス内LRUの世代番号（いずれかのユーザーの破棄で加算）
+_local_generation = 0
+
+# 読み込み開始時から世代番号が変わっていなければ保存する
+_SET_IF_CURRENT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+
+class TTLCache:
+    """TTL付きLRUキャッシュ（イベントループ内でのみ使用）"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_LOCAL_CACHE_TTL_SECONDS)
+
+
+def user_key(user_id: int) -> str:
+    """ユーザーキャッシュのキー"""
+    return f"{USER_KEY_PREFIX}{user_id}"
+
+
+def generation_key(user_id: int) -> str:
+    """ユーザーキャッシュの世代番号のキー"""
+    return f"{GENERATION_KEY_PREFIX}{user_id}"
+
+
+def _to_user(data: dict) -> User:
+    """キャッシュ内容からUserを復元
+
+    どのセッションにも属さない一時的なインスタンスで、CACHED_FIELDS 以外の属性や
+    リレーションは読めない。変更して保存する場合は db.get で読み直したものを使う
+    （このインスタンスを db.add / db.merge しない）。
+    """
+    return User(
+        id=data["id"],
+        email=data["email"],
+        name=data["name"],
+        role=UserRole(data["role"]),
+        is_active=data["is_active"],
+        organization_id=data["organization_id"],
+    )
+
+
+async def _load_from_db(user_id: int) -> Optional[dict]:
+    # リクエストのセッションとは別に短命のセッションを使い、接続を保持し続けない
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(User.id, User.email, User.name, User.role, User.is_active, User.organization_id)
+            .where(User.id == user_id)
+        )
+        row = result.first()
+    if row is None:
+        return None
+    data = dict(row._mapping)
+    data["role"] = data["role"].value
+    return data
+
+
+async def get_user(user_id: int) -> Optional[User]:
+    """ユーザーを取得（プロセス内LRU → Redis → DB の順、戻り値はセッション非所属）
+
+    読み込み中にキャッシュが破棄された場合は、読んだ内容をキャッシュに保存しない
+    （無効化されたユーザーの情報が TTL の間残らないようにする）。
+    """
+    local_generation = _local_generation
+    data = _local_cache.get(user_id)
+    if data is None:
+        cached = generation = None
+        try:
+            cached, generation = await redis_client.mget(user_key(user_id), generation_key(user_id))
+            generation = generation or "0"
+        except Exception:
+            logger.exception("ユーザーキャッシュの取得に失敗しました")
+
+        if cached is not None:
+            data = json.loads(cached)
+        else:
+            data = await _load_from_db(user_id)
+            if data is None:
+                return None
+            if generation is not None:
+                try:
+                    await redis_client.eval(
+                        _SET_IF_CURRENT_SCRIPT, 2, user_key(user_id), generation_key(user_id),
+                        generation, json.dumps(data), settings.AUTH_REDIS_CACHE_TTL_SECONDS,
+                    )
+                except Exception:
+                    logger.exception("ユーザーキャッシュの保存に失敗しました")
+        if _local_generation == local_generation:
+            _local_cache.set(user_id, data)
+    return _to_user(data)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """ユーザーキャッシュを破棄
+
+    他ワーカーのプロセス内LRUは AUTH_LOCAL_CACHE_TTL_SECONDS 以内に失効する。
+    """
+    _discard_local([user_id])
+    await _invalidate_redis([user_id])
+
+
+def _discard_local(user_ids: Iterable[int]) -> None:
+    global _local_generation
+    _local_generation += 1
+    for user_id in user_ids:
+        _local_cache.pop(user_id)
+
+
+async def _invalidate_redis(user_ids: Iterable[int]) -> None:
+    """Redisのキャッシュを削除し、世代番号を進める"""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for user_id in user_ids:
+            # 世代番号はキャッシュと同じ期間だけ保持すれば足りる
+            pipe.incr(generation_key(user_id))
+            pipe.expire(generation_key(user_id), settings.AUTH_REDIS_CACHE_TTL_SECONDS)
+        pipe.delete(*[user_key(user_id) for user_id in user_ids])
+        await pipe.execute()
+
+
+# ============ 権限・有効状態の変更に連動した破棄 ============
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session, flush_context):
+    """キャッシュ対象属性が変わったユーザーを記録"""
+    user_ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in CACHED_FIELDS):
+                user_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+    if user_ids:
+        session.info.setdefault(_INVALIDATE_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    user_ids = session.info.pop(_INVALIDATE_PENDING_KEY, None)
+    if not user_ids:
+        return
+    _discard_local(user_ids)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_invalidate_many(user_ids))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop(_INVALIDATE_PENDING_KEY, None)
+
+
+async def _invalidate_many(user_ids: Set[int]) -> None:
+    try:
+        await _invalidate_redis(user_ids)
+    except Exception:
+        logger.exception("ユーザーキャッシュの破棄に失敗しました")
@@ -0,0 +1,47 @@
+"""
+重い依存ライブラリの遅延インポート
+
+langchain / openai / pypdf / python-pptx などは読み込みに数百ms以上かかるため、
+モジュール読み込み時ではなく初回利用時にインポートする。
+
+    openai = lazy_import("openai")
+    client = openai.AsyncOpenAI()   # ここで初めて import される
+"""
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule(ModuleType):
+    """属性アクセス時に実モジュールを読み込むプロキシ"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module: Optional[ModuleType] = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> LazyModule:
+    """初回の属性アクセスまでインポートを遅らせる"""
+    return LazyModule(name)
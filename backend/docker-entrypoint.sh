@@ -0,0 +1,10 @@
+#!/bin/sh
+# 起動前にマイグレーションを適用する（DB_STARTUP_MODE=check は未適用だと起動しない）
+# リリース時に別途 alembic upgrade head を実行する場合は RUN_MIGRATIONS=false にする
+set -e
+
+if [ "${RUN_MIGRATIONS:-true}" != "false" ]; then
+    alembic upgrade head
+fi
+
+exec "$@"
@@ -0,0 +1,58 @@
+"""
+認証オーバーヘッドのベンチマーク
+
+deps.get_current_user 相当の処理（JWT検証 + ユーザー解決）について、
+キャッシュなし（毎回DB）・Redisのみ・プロセス内LRUヒットの1リクエストあたり時間を比較する。
+
+    python -m scripts.bench_auth --user-id 1 --iterations 5000
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+from app.api import deps
+from app.api.v1.auth import create_access_token
+from app.services import user_cache
+
+
+async def _measure(label: str, iterations: int, func) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16}: {elapsed / iterations * 1e6:>8.1f} us/request")
+
+
+async def run(user_id: int, iterations: int) -> None:
+    token = create_access_token({"sub": str(user_id)}, expires_delta=timedelta(minutes=30))
+
+    async def db_only():
+        deps._token_cache.clear()
+        user_cache._local_cache.clear()
+        await user_cache.invalidate_user(user_id)
+        await deps.get_current_user(token)
+
+    async def redis_hit():
+        deps._token_cache.clear()
+        user_cache._local_cache.clear()
+        await deps.get_current_user(token)
+
+    async def local_hit():
+        await deps.get_current_user(token)
+
+    await _measure("db (no cache)", iterations, db_only)
+    await _measure("redis hit", iterations, redis_hit)
+    await _measure("local LRU hit", iterations, local_hit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="認証オーバーヘッドのベンチマーク")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+文脈選択（検索）と全文投入の比較
+
+合成した100ページの提案資料（フィクスチャ）に対し、バイヤー要件ごとの
+ギャップ分析プロンプトを組み立てる場合について、
+- 全文投入: 資料全体をプロンプトに入れる
+- 文脈選択: 要件ごとの上位チャンクだけをトークン予算内で入れる
+のトークン数・所要時間（検索＋LLM）・要件に対応する記述の取りこぼし率を比較する。
+
+LLM の所要時間は既定ではトークン数から見積もる（--prefill-tps）。
+--openai を付けると実際に OPENAI_API_KEY で呼び出して計測する。
+
+    python -m scripts.bench_context_selection --pages 100 --budget 4000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.context import (
+    Chunk, ChunkIndex, estimate_tokens, format_context, select_chunks, split_page,
+)
+from app.services.embedding import HashingEmbeddingModel
+from app.utils.lazy import lazy_import
+
+openai = lazy_import("openai")
+
+# (要件, 資料中に埋め込む根拠の文)
+REQUIREMENTS = [
+    ("最小ロットは何個からか", "最小ロットは100個から対応可能です。"),
+    ("納期は何週間か", "標準納期はご発注から4週間です。"),
+    ("ISO認証の取得状況", "ISO9001およびISO14001の認証を取得しています。"),
+    ("価格と値引き条件", "年間1万個以上のご契約で単価を15%値引きします。"),
+    ("保守サポート体制", "24時間365日のコールセンターで保守サポートを提供します。"),
+    ("導入実績", "大手自動車メーカー3社で量産ラインに導入済みです。"),
+    ("品質保証と不良率", "出荷前全数検査により不良率は0.01%以下です。"),
+    ("環境対応", "梱包材はすべて再生紙を使用しCO2排出量を30%削減しました。"),
+]
+
+FILLER = [
+    "当社は創業以来、製造業のお客様の課題解決に取り組んでまいりました。",
+    "本製品はIoTセンサーとクラウド分析基盤を組み合わせたソリューションです。",
+    "現場の作業者が直感的に操作できるユーザーインターフェースを備えています。",
+    "導入にあたっては専任の担当者が要件定義から運用定着まで伴走します。",
+    "市場環境の変化に合わせて継続的に機能改善を行っています。",
+    "データはすべて国内のデータセンターで暗号化して保管されます。",
+    "既存の生産管理システムとの連携用APIを標準で提供しています。",
+    "詳細な仕様については別紙の技術資料をご参照ください。",
+]
+
+
+def build_corpus(pages: int, seed: int) -> List[str]:
+    """フィラー文で構成した資料に、要件の根拠となる文を1ページずつ埋め込む"""
+    rng = random.Random(seed)
+    corpus = ["\n".join(rng.choice(FILLER) for _ in range(rng.randint(12, 20))) for _ in range(pages)]
+    for _, fact in REQUIREMENTS:
+        page = rng.randrange(pages)
+        lines = corpus[page].split("\n")
+        lines.insert(rng.randrange(len(lines)), fact)
+        corpus[page] = "\n".join(lines)
+    return corpus
+
+
+def prompt(requirement: str, context: str) -> str:
+    return f"以下の提案資料について、バイヤー要件「{requirement}」への適合状況を分析してください。\n\n{context}"
+
+
+async def llm_seconds(text: str, args) -> float:
+    if not args.openai:
+        return args.llm_overhead + estimate_tokens(text) / args.prefill_tps
+    client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    started = time.perf_counter()
+    await client.chat.completions.create(
+        model=args.model, messages=[{"role": "user", "content": text}], max_tokens=64
+    )
+    return time.perf_counter() - started
+
+
+async def run(args) -> None:
+    corpus = build_corpus(args.pages, args.seed)
+    model = HashingEmbeddingModel()
+
+    started = time.perf_counter()
+    chunks: List[Chunk] = []
+    for page_no, page_text in enumerate(corpus, start=1):
+        for chunk_index, text in enumerate(split_page(page_text, args.chunk_tokens)):
+            chunks.append(Chunk(len(chunks), "deck.pdf", page_no, chunk_index, text, estimate_tokens(text)))
+    embeddings = np.array(await model.embed([c.text for c in chunks]), dtype=np.float32)
+    index = ChunkIndex(chunks, embeddings)
+    print(f"indexed {len(chunks)} chunks from {args.pages} pages in {time.perf_counter() - started:.2f}s")
+
+    full_context = format_context(chunks)
+    full: List[Tuple[int, float]] = []
+    selected: List[Tuple[int, float, float]] = []
+    misses = 0
+    for requirement, fact in REQUIREMENTS:
+        full_prompt = prompt(requirement, full_context)
+        full.append((estimate_tokens(full_prompt), await llm_seconds(full_prompt, args)))
+
+        started = time.perf_counter()
+        [vector] = await model.embed([requirement])
+        picked = select_chunks(index, [requirement], [vector], k=args.k, token_budget=args.budget)
+        retrieval = time.perf_counter() - started
+        context = format_context(picked)
+        if fact not in context:
+            misses += 1
+        small_prompt = prompt(requirement, context)
+        selected.append((estimate_tokens(small_prompt), retrieval, await llm_seconds(small_prompt, args)))
+
+    n = len(REQUIREMENTS)
+    full_tokens = sum(t for t, _ in full) / n
+    full_latency = sum(s for _, s in full) / n
+    sel_tokens = sum(t for t, _, _ in selected) / n
+    sel_retrieval = sum(r for _, r, _ in selected) / n
+    sel_latency = sum(r + s for _, r, s in selected) / n
+    print(f"{'':<10} {'tokens/prompt':>14} {'retrieval ms':>13} {'latency s':>10}")
+    print(f"{'full':<10} {full_tokens:>14,.0f} {'-':>13} {full_latency:>10.2f}")
+    print(f"{'selected':<10} {sel_tokens:>14,.0f} {sel_retrieval * 1000:>13.1f} {sel_latency:>10.2f}")
+    print(f"token reduction: {1 - sel_tokens / full_tokens:.1%}  "
+          f"speedup: x{full_latency / sel_latency:.1f}  missed facts: {misses}/{n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文脈選択と全文投入の比較")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--chunk-tokens", type=int, default=settings.CONTEXT_CHUNK_MAX_TOKENS)
+    parser.add_argument("--k", type=int, default=settings.CONTEXT_TOP_K)
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--prefill-tps", type=float, default=5000.0, help="見積もり用の入力トークン処理速度")
+    parser.add_argument("--llm-overhead", type=float, default=0.5, help="見積もり用の固定オーバーヘッド（秒）")
+    parser.add_argument("--openai", action="store_true", help="実際にLLMを呼び出して計測する")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
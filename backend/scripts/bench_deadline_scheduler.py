@@ -0,0 +1,86 @@
+"""
+期限スケジューラの計測
+
+専用のキーに期限を分散させたジョブを登録し、複数のワーカー（DeadlineScheduler）で
+同時に処理して、期限からの遅れ・重複処理・取りこぼしを確認する。
+--fail-rate を指定すると、その割合のバッチでハンドラが失敗し、リース切れ後に再実行される。
+Redis（REDIS_URL）が必要。DBは使わない。
+
+    python -m scripts.bench_deadline_scheduler --jobs 20000 --workers 4 --spread 10
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import List
+
+from app.db.redis import redis_client
+from app.services.scheduler import DeadlineScheduler
+
+KIND = "bench"
+
+
+async def run(args) -> None:
+    key = f"scheduler:bench:{int(time.time())}"
+    processed: Counter = Counter()
+    lateness: List[float] = []
+    start = time.time() + 1.0
+    due = {ref: start + random.random() * args.spread for ref in range(args.jobs)}
+
+    def make_handler():
+        async def handler(refs: List[int]) -> None:
+            if random.random() < args.fail_rate:
+                raise RuntimeError("simulated failure")
+            now = time.time()
+            for ref in refs:
+                processed[ref] += 1
+                lateness.append(now - due[ref])
+            await asyncio.sleep(args.handler_ms / 1000)
+        return handler
+
+    workers = []
+    for _ in range(args.workers):
+        scheduler = DeadlineScheduler(
+            key=key, lease_seconds=args.lease, batch_size=args.batch, max_sleep_seconds=args.max_sleep
+        )
+        scheduler.register(KIND, make_handler())
+        workers.append(scheduler)
+
+    await workers[0].schedule((KIND, ref, at) for ref, at in due.items())
+    for scheduler in workers:
+        await scheduler.start()
+    try:
+        deadline = start + args.spread + args.lease * 3 + 5
+        while len(processed) < args.jobs and time.time() < deadline:
+            await asyncio.sleep(0.2)
+    finally:
+        for scheduler in workers:
+            await scheduler.stop()
+        await redis_client.delete(key)
+
+    lateness.sort()
+    duplicates = sum(1 for count in processed.values() if count > 1)
+    print(f"jobs {args.jobs}  processed {len(processed)}  duplicates {duplicates}  "
+          f"missing {args.jobs - len(processed)}")
+    if lateness:
+        p = lambda q: lateness[min(len(lateness) - 1, int(len(lateness) * q))] * 1000
+        print(f"lateness p50 {p(0.5):.1f} ms  p99 {p(0.99):.1f} ms  max {lateness[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="期限スケジューラの複数ワーカー計測")
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--spread", type=float, default=10.0, help="期限を分散させる秒数")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--lease", type=float, default=2.0)
+    parser.add_argument("--max-sleep", type=float, default=1.0)
+    parser.add_argument("--handler-ms", type=float, default=20.0, help="1バッチの処理時間")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+JSONレスポンスのシリアライズコスト比較
+
+1k件の SupplierProposalResponse を返す場合について、
+FastAPI 標準経路（response_model で再検証 → jsonable_encoder → json.dumps）と
+orjson 経路（再検証なし）、分割ストリーミング経路を比較する。
+
+    python -m scripts.bench_json_response --items 1000 --repeat 200
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.responses import FastJSONResponse, iter_json_array
+from app.api.v1.supplier import SupplierProposalResponse
+
+
+def build_items(n: int) -> List[SupplierProposalResponse]:
+    now = datetime.utcnow()
+    return [
+        SupplierProposalResponse(
+            id=i,
+            title=f"IoTセンサーのご提案 #{i}",
+            description="製造現場向けIoTセンサーの提案です。" * 4,
+            status="evaluated",
+            points_used=300,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+            comment_count=i % 17,
+        )
+        for i in range(n)
+    ]
+
+
+async def run(items: int, repeat: int, chunk_items: int) -> None:
+    data = build_items(items)
+    field = create_response_field(name="bench", type_=List[SupplierProposalResponse])
+
+    async def standard() -> int:
+        content = await serialize_response(field=field, response_content=data, is_coroutine=True)
+        return len(JSONResponse(content).body)
+
+    async def fast() -> int:
+        return len(FastJSONResponse(data).body)
+
+    async def streaming() -> int:
+        return sum(len(chunk) for chunk in iter_json_array(data, chunk_items))
+
+    print(f"items={items} repeat={repeat}")
+    baseline = None
+    for label, fn in (("standard", standard), ("orjson", fast), ("streaming", streaming)):
+        size = await fn()  # ウォームアップ
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fn()
+        per_call = (time.perf_counter() - started) / repeat * 1000
+        baseline = baseline or per_call
+        print(f"{label:<10} {per_call:8.2f} ms/response  x{baseline / per_call:5.1f}  ({size:,} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONレスポンスのシリアライズコスト比較")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--chunk-items", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.repeat, args.chunk_items))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+ログイン集中時のイベントループ遅延の計測
+
+bcrypt をイベントループ上で直接実行した場合と、PasswordHasher の
+スレッドプール経由で実行した場合について、同時に動く軽量リクエスト
+（他エンドポイント相当）の応答遅延を比較する。
+
+    python -m scripts.bench_login_storm --logins 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.password import PasswordHasher, PasswordHasherBusy, pwd_context
+
+
+async def _probe(stop: asyncio.Event, latencies: list) -> None:
+    """10msごとに起きる軽量処理の遅延を記録"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        latencies.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+def _report(label: str, latencies: list, elapsed: float) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<10} storm={elapsed:.2f}s  probe lag ms: "
+          f"p50={statistics.median(latencies):.1f} p99={p99:.1f} max={latencies[-1]:.1f}")
+
+
+async def _storm(label: str, login) -> None:
+    stop = asyncio.Event()
+    latencies: list = []
+    probe = asyncio.create_task(_probe(stop, latencies))
+    await asyncio.sleep(0.1)
+    started = time.perf_counter()
+    await login()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    _report(label, latencies, elapsed)
+
+
+async def run(logins: int, workers: int) -> None:
+    hashed = pwd_context.hash("password")
+
+    async def inline():
+        async def one():
+            pwd_context.verify("password", hashed)
+        await asyncio.gather(*[one() for _ in range(logins)])
+
+    hasher = PasswordHasher(max_workers=workers, max_queue=logins)
+
+    async def pooled():
+        async def one():
+            try:
+                await hasher.verify("password", hashed)
+            except PasswordHasherBusy:
+                pass
+        await asyncio.gather(*[one() for _ in range(logins)])
+
+    await _storm("inline", inline)
+    await _storm("executor", pooled)
+    print(f"executor stats: {hasher.stats()}")
+    hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ログイン集中時のイベントループ遅延の計測")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args.logins, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+通知一括書き込みのベンチマーク
+
+ローカルのPostgreSQL/Redisに対して、行ごとの db.add と
+bulk_create_notifications（executemany / COPY）のスループットを比較する。
+
+    python -m scripts.bench_notifications --users 5000 --notifications 100000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select
+
+from app.db.session import async_session_maker
+from app.models.comment import Notification
+from app.models.user import User, UserRole
+from app.services import notification as notification_service
+from app.services.notification import build_notification, bulk_create_notifications
+
+
+async def _create_users(count: int, tag: str) -> list:
+    async with async_session_maker() as db:
+        await db.execute(insert(User), [
+            {
+                "email": f"bench-{tag}-{i}@example.com",
+                "hashed_password": "x",
+                "name": f"bench-{i}",
+                "role": UserRole.SUPPLIER,
+                "is_active": True,
+            }
+            for i in range(count)
+        ])
+        await db.commit()
+        result = await db.execute(
+            select(User.id).where(User.email.like(f"bench-{tag}-%"))
+        )
+        return list(result.scalars())
+
+
+async def _cleanup(user_ids: list) -> None:
+    async with async_session_maker() as db:
+        await db.execute(delete(Notification).where(Notification.user_id.in_(user_ids)))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+
+def _rows(user_ids: list, count: int) -> list:
+    return [
+        build_notification(
+            user_ids[i % len(user_ids)], "ベンチマーク", "通知本文",
+            notification_type="status_change", reference_id=i,
+        )
+        for i in range(count)
+    ]
+
+
+async def _bench_orm(user_ids: list, count: int) -> float:
+    started = time.perf_counter()
+    async with async_session_maker() as db:
+        for row in _rows(user_ids, count):
+            db.add(Notification(**row))
+        await db.commit()
+    return time.perf_counter() - started
+
+
+async def _bench_bulk(user_ids: list, count: int, batch: int) -> float:
+    rows = _rows(user_ids, count)
+    started = time.perf_counter()
+    for i in range(0, count, batch):
+        async with async_session_maker() as db:
+            await bulk_create_notifications(db, rows[i:i + batch], coalesce=False)
+            await db.commit()
+    return time.perf_counter() - started
+
+
+async def run(users: int, count: int, orm_count: int) -> None:
+    tag = uuid.uuid4().hex[:8]
+    user_ids = await _create_users(users, tag)
+    try:
+        elapsed = await _bench_orm(user_ids, orm_count)
+        print(f"db.add per row : {orm_count / elapsed:>10.0f} rows/s")
+
+        # executemany（COPY閾値未満のバッチ）
+        elapsed = await _bench_bulk(user_ids, count, notification_service.COPY_THRESHOLD - 1)
+        print(f"executemany    : {count / elapsed:>10.0f} rows/s")
+
+        elapsed = await _bench_bulk(user_ids, count, 20000)
+        print(f"COPY           : {count / elapsed:>10.0f} rows/s")
+    finally:
+        await _cleanup(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知一括書き込みのベンチマーク")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--orm-notifications", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.notifications, args.orm_notifications))
+
+
+if __name__ == "__main__":
+    main()
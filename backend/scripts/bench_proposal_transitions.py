@@ -0,0 +1,167 @@
+"""
+提案ステータス遷移の並行実行の検証
+
+計測用の提案を作成し、複数のワーカーが古い状態をもとにして同じ提案を奪い合うように
+PATH の順に遷移させる（バッチは bulk_transition、一部は transition）。終了後に
+- ワーカーが成功とした遷移の数 = 提案の version = 進捗履歴の件数（遷移の取りこぼしがない）
+- 同じ遷移が2回成功していない（進捗履歴のステータスに重複がない）
+を確認する。テーブルロックを取らず proposals.version の比較交換だけで整合することを見る。
+DB（DATABASE_URL）と、既存のサプライヤーユーザーが1人必要。
+
+    python -m scripts.bench_proposal_transitions --proposals 2000 --workers 8 --batch 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import delete, insert, select
+
+from app.db.session import async_session_maker
+from app.models.comment import ProposalProgress
+from app.models.outbox import OutboxEvent
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.user import User, UserRole
+from app.services import outbox
+from app.services import proposal_status
+
+PATH = [
+    ProposalStatus.DRAFT,
+    ProposalStatus.SUBMITTED,
+    ProposalStatus.ANALYZING,
+    ProposalStatus.EVALUATED,
+    ProposalStatus.UNDER_REVIEW,
+    ProposalStatus.ACCEPTED,
+]
+NEXT = dict(zip(PATH, PATH[1:]))
+
+
+async def create_proposals(count: int) -> List[int]:
+    async with async_session_maker() as db:
+        supplier = (await db.execute(
+            select(User.id, User.organization_id)
+            .where(User.role == UserRole.SUPPLIER, User.organization_id.is_not(None))
+            .limit(1)
+        )).one()
+        ids = (await db.scalars(
+            insert(Proposal).returning(Proposal.id),
+            [
+                {
+                    "title": f"transition bench {i}",
+                    "status": ProposalStatus.DRAFT,
+                    "supplier_org_id": supplier.organization_id,
+                    "supplier_user_id": supplier.id,
+                }
+                for i in range(count)
+            ],
+        )).all()
+        await db.commit()
+    return list(ids)
+
+
+async def worker(ids: List[int], args, succeeded: Counter, stats: Counter, deadline: float) -> None:
+    # 開始時点の状態を持ち続け、他のワーカーの遷移は失敗してから知る
+    view: Dict[int, ProposalStatus] = {proposal_id: ProposalStatus.DRAFT for proposal_id in ids}
+    while view and time.time() < deadline:
+        target = random.choice(sorted({NEXT[status] for status in view.values()}, key=PATH.index))
+        candidates = [proposal_id for proposal_id, status in view.items() if NEXT[status] == target]
+        batch = random.sample(candidates, min(args.batch, len(candidates)))
+        async with async_session_maker() as db:
+            if len(batch) == 1 or random.random() < args.single_ratio:
+                proposal = await db.get(Proposal, batch[0])
+                try:
+                    transition = await proposal_status.transition(db, proposal, target, retries=args.retries)
+                    transitioned, invalid = [transition], {}
+                except proposal_status.InvalidTransition as e:
+                    transitioned, invalid = [], {e.proposal_id: e.current}
+                except proposal_status.StaleProposal:
+                    transitioned, invalid = [], {}
+                    stats["stale"] += 1
+            else:
+                result = await proposal_status.bulk_transition(db, batch, target, retries=args.retries)
+                transitioned, invalid = result.transitioned, result.invalid
+                stats["stale"] += len(result.stale)
+            await db.commit()
+
+        for t in transitioned:
+            succeeded[t.proposal_id] += 1
+            view[t.proposal_id] = t.to_status
+        for proposal_id, current in invalid.items():
+            view[proposal_id] = current
+        stats["transitioned"] += len(transitioned)
+        stats["invalid"] += len(invalid)
+        for proposal_id in batch:
+            if view[proposal_id] not in NEXT:
+                del view[proposal_id]
+
+
+async def verify(ids: List[int], succeeded: Counter) -> None:
+    async with async_session_maker() as db:
+        versions = dict((await db.execute(
+            select(Proposal.id, Proposal.version).where(Proposal.id.in_(ids))
+        )).all())
+        history = (await db.execute(
+            select(ProposalProgress.proposal_id, ProposalProgress.status)
+            .where(ProposalProgress.proposal_id.in_(ids))
+        )).all()
+
+    statuses: Dict[int, List[ProposalStatus]] = {proposal_id: [] for proposal_id in ids}
+    for proposal_id, status in history:
+        statuses[proposal_id].append(status)
+    lost = [p for p in ids if versions[p] != succeeded[p]]
+    unrecorded = [p for p in ids if len(statuses[p]) != versions[p]]
+    duplicated = [p for p in ids if len(set(statuses[p])) != len(statuses[p])]
+    out_of_path = [p for p in ids if set(statuses[p]) != set(PATH[1:versions[p] + 1])]
+    completed = sum(1 for p in ids if versions[p] == len(PATH) - 1)
+    print(f"proposals {len(ids)}  completed {completed}  transitions {sum(versions.values())}")
+    print(f"lost {len(lost)}  unrecorded {len(unrecorded)}  duplicated {len(duplicated)}  "
+          f"out of path {len(out_of_path)}")
+
+
+async def cleanup(ids: List[int]) -> None:
+    async with async_session_maker() as db:
+        await db.execute(delete(OutboxEvent).where(
+            OutboxEvent.topic == outbox.PROPOSAL_STATUS_CHANGED,
+            OutboxEvent.key.in_([str(proposal_id) for proposal_id in ids]),
+        ))
+        await db.execute(delete(ProposalProgress).where(ProposalProgress.proposal_id.in_(ids)))
+        await db.execute(delete(Proposal).where(Proposal.id.in_(ids)))
+        await db.commit()
+
+
+async def run(args) -> None:
+    ids = await create_proposals(args.proposals)
+    succeeded: Counter = Counter()
+    stats: Counter = Counter()
+    started = time.time()
+    try:
+        await asyncio.gather(*(
+            worker(ids, args, succeeded, stats, started + args.timeout) for _ in range(args.workers)
+        ))
+        elapsed = time.time() - started
+        print(f"workers {args.workers}  elapsed {elapsed:.1f} s  "
+              f"{stats['transitioned'] / elapsed:.0f} transitions/s  "
+              f"invalid {stats['invalid']}  stale {stats['stale']}")
+        await verify(ids, succeeded)
+    finally:
+        if not args.keep:
+            await cleanup(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提案ステータス遷移の並行実行の検証")
+    parser.add_argument("--proposals", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--single-ratio", type=float, default=0.2, help="transition（1件）で遷移させる割合")
+    parser.add_argument("--retries", type=int, default=proposal_status.DEFAULT_RETRIES)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--keep", action="store_true", help="作成した提案を削除しない")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
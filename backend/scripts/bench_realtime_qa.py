@@ -0,0 +1,124 @@
+"""
+リアルタイムQ&A: 発話終了から質問までの遅延の計測
+
+台本どおりに話すプレゼンを合成し（文字単位の途中結果 → 確定文 → 無音 → 発話終了）、
+RealtimeQASession に流して、発話終了から質問を返すまでの時間を
+- speculative: 発話中に質問候補を先読みする（既定の動作）
+- on-demand: 発話終了後にLLMで質問を生成する
+の2通りで比較する。発話末尾から質問までの時間には無音判定（--silence-ms）も含む。
+
+LLM の所要時間は既定では入出力トークン数から見積もった時間だけ待つ。
+--openai を付けると実際に OPENAI_API_KEY で呼び出して計測する。
+
+    python -m scripts.bench_realtime_qa --chars-per-second 8 --silence-ms 700
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import List
+
+from app.config import settings
+from app.services.asr import TranscriptEvent
+from app.services.context import estimate_tokens
+from app.services.llm import LLMClient
+from app.services.realtime_qa import DEFAULT_GAPS, Gap, RealtimeQASession
+
+# 発話（発話終了ごとの区切り）と、その中の確定文
+SCRIPT = [
+    ["本日は製造現場向けのIoTセンサーをご紹介します。", "工場の設備にセンサーを後付けするだけで稼働状況を可視化できます。"],
+    ["最小ロットは100個から対応可能です。", "単価は1個あたり12,000円で、年間契約で15%値引きします。"],
+    ["大手自動車メーカー3社で量産ラインに導入済みです。", "データは国内のデータセンターで暗号化して保管します。"],
+    ["ISO9001の認証を取得しています。", "ご質問があればお願いします。"],
+]
+
+GAPS = [
+    Gap("min_lot", "最小ロット", 3, "最小ロットは何個からご対応いただけますか？", ()),
+    Gap("iso_certified", "ISO認証", 3, "ISO認証の取得状況を教えていただけますか？", ()),
+    Gap("keyword:セキュリティ", "セキュリティ", 2, "セキュリティについて詳しく教えていただけますか？", ("セキュリティ",)),
+    *DEFAULT_GAPS,
+]
+
+
+class SimulatedLLMClient(LLMClient):
+    """トークン数から見積もった時間だけ待って、未確認項目ごとの質問を返すクライアント"""
+
+    def __init__(self, args):
+        super().__init__("simulated", settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_TIMEOUT_SECONDS)
+        self.args = args
+
+    async def _create(self, messages, max_tokens, json_mode):
+        body = messages[-1]["content"]
+        keys = re.findall(r"^- ([^:]+):", body, flags=re.MULTILINE)
+        questions = [{"key": key, "question": f"{key} についてもう少し詳しく伺えますか？"} for key in keys]
+        text = json.dumps({"questions": questions}, ensure_ascii=False)
+        await asyncio.sleep(
+            self.args.llm_overhead
+            + estimate_tokens(body) / self.args.prefill_tps
+            + estimate_tokens(text) / self.args.decode_tps
+        )
+        return text
+
+
+async def present(session: RealtimeQASession, args) -> None:
+    """台本を話す速度で流し、発話ごとに無音の後で発話終了を送る"""
+    step = max(1, args.partial_chars)
+    for utterance in SCRIPT:
+        for sentence in utterance:
+            for end in range(step, len(sentence) + step, step):
+                await asyncio.sleep(step / args.chars_per_second)
+                if end < len(sentence):
+                    await session.handle(TranscriptEvent("partial", sentence[:end], time.perf_counter()))
+            await session.handle(TranscriptEvent("final", sentence, time.perf_counter()))
+        await asyncio.sleep(args.silence_ms / 1000)
+        await session.handle(TranscriptEvent("end_of_utterance", "", time.perf_counter()))
+
+
+async def run_mode(speculate: bool, client: LLMClient, args) -> None:
+    questions: List[dict] = []
+
+    async def send(message: dict) -> None:
+        if message["type"] == "question":
+            questions.append(message)
+
+    session = RealtimeQASession(GAPS, send, client=client, speculate=speculate)
+    try:
+        await present(session, args)
+    finally:
+        await session.close()
+    name = "speculative" if speculate else "on-demand"
+    for q in questions:
+        latency = q["latency_ms"]
+        print(f"  {name:<12} eou→question {latency['end_of_utterance_to_question']:>7.1f} ms  "
+              f"speech end→question {latency['speech_end_to_question'] or 0:>7.1f} ms  "
+              f"[{q['source']}] {q['question']}")
+    stats = session.stats()
+    print(f"{name:<12} p50 {stats['p50_ms']} ms  max {stats['max_ms']} ms  extracted {stats['extracted']}")
+
+
+async def run(args) -> None:
+    if args.openai:
+        client = LLMClient(args.model, settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_TIMEOUT_SECONDS)
+    else:
+        client = SimulatedLLMClient(args)
+    await run_mode(True, client, args)
+    await run_mode(False, client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リアルタイムQ&Aの発話終了→質問の遅延計測")
+    parser.add_argument("--chars-per-second", type=float, default=8.0, help="話す速さ（文字/秒）")
+    parser.add_argument("--partial-chars", type=int, default=4, help="途中結果を送る文字数の間隔")
+    parser.add_argument("--silence-ms", type=int, default=settings.QA_SILENCE_MS)
+    parser.add_argument("--prefill-tps", type=float, default=5000.0, help="見積もり用の入力トークン処理速度")
+    parser.add_argument("--decode-tps", type=float, default=80.0, help="見積もり用の出力トークン生成速度")
+    parser.add_argument("--llm-overhead", type=float, default=0.4, help="見積もり用の固定オーバーヘッド（秒）")
+    parser.add_argument("--openai", action="store_true", help="実際にLLMを呼び出して計測する")
+    parser.add_argument("--model", default=settings.LLM_MODEL)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
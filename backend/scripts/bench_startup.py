@@ -0,0 +1,63 @@
+"""
+起動時間のベンチマーク
+
+1. `import app.main` にかかる時間（別プロセスで計測）
+2. uvicorn 起動から最初のリクエストに応答するまでの時間
+
+    python -m scripts.bench_startup --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import() -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(port: int, timeout: float) -> float:
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=0.5) as res:
+                    if res.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("サーバーが応答しませんでした")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間のベンチマーク")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import app.main     : median {statistics.median(imports) * 1000:.0f} ms")
+
+    firsts = [measure_first_request(args.port, args.timeout) for _ in range(args.runs)]
+    print(f"time to first request: median {statistics.median(firsts) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
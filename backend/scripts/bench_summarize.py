@@ -0,0 +1,118 @@
+"""
+資料要約: 1回の長文コンテキスト呼び出しと階層要約（map-reduce）の比較
+
+合成した提案資料（既定300ページ）について
+- single: 資料全体を1回で要約する場合（コンテキスト上限の超過も判定）
+- map-reduce: 葉を並列に要約し木で統合する場合（初回）
+- revision: 数ページだけ変更した改訂版を、キャッシュを使って要約し直す場合
+の所要時間とLLM呼び出し回数を比較する。
+
+LLM の所要時間は既定では入出力トークン数から見積もった時間だけ待つ。
+--openai を付けると実際に OPENAI_API_KEY で呼び出して計測する。
+
+    python -m scripts.bench_summarize --pages 300 --changed 3 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.config import settings
+from app.services.context import Chunk, estimate_tokens, split_page
+from app.services.llm import LLMClient
+from app.services.summarizer import FINAL_MAX_TOKENS, MemorySummaryCache, content_hashes, plan, summarize
+from scripts.bench_context_selection import FILLER, build_corpus
+
+
+class SimulatedLLMClient(LLMClient):
+    """トークン数から見積もった時間だけ待って、入力の一部を返すクライアント"""
+
+    def __init__(self, args):
+        super().__init__("simulated", args.concurrency, max_queue=100000, timeout=settings.LLM_TIMEOUT_SECONDS)
+        self.args = args
+
+    async def _create(self, messages, max_tokens, json_mode):
+        body = messages[-1]["content"]
+        await asyncio.sleep(estimate_seconds(estimate_tokens(body), max_tokens, self.args))
+        if json_mode:
+            return json.dumps({"three_line_summary": body[:120], "key_points": [], "strengths": [], "concerns": []})
+        return body[: max_tokens // 2]
+
+
+def estimate_seconds(input_tokens: int, output_tokens: int, args) -> float:
+    return args.llm_overhead + input_tokens / args.prefill_tps + output_tokens / args.decode_tps
+
+
+def chunk_corpus(corpus, chunk_tokens):
+    chunks = []
+    for page_no, page_text in enumerate(corpus, start=1):
+        for chunk_index, text in enumerate(split_page(page_text, chunk_tokens)):
+            chunks.append(Chunk(len(chunks), "deck.pdf", page_no, chunk_index, text, estimate_tokens(text)))
+    return chunks
+
+
+async def run_tree(chunks, client, cache):
+    summary_plan = plan(chunks, content_hashes(chunks), model=client.model)
+    started = time.perf_counter()
+    result = await summarize(summary_plan, client=client, cache=cache)
+    return time.perf_counter() - started, result, summary_plan
+
+
+async def run(args) -> None:
+    if args.openai:
+        client = LLMClient(args.model, args.concurrency, max_queue=100000, timeout=settings.LLM_TIMEOUT_SECONDS)
+    else:
+        client = SimulatedLLMClient(args)
+    corpus = build_corpus(args.pages, args.seed)
+    chunks = chunk_corpus(corpus, args.chunk_tokens)
+    total_tokens = sum(c.token_count for c in chunks)
+
+    # 1回で要約する場合
+    if total_tokens > args.context_limit:
+        single = f"exceeds context ({total_tokens:,} > {args.context_limit:,} tokens)"
+    elif args.openai:
+        started = time.perf_counter()
+        await client.complete(
+            [{"role": "user", "content": "\n".join(corpus)}], max_tokens=FINAL_MAX_TOKENS, json_mode=True
+        )
+        single = f"{time.perf_counter() - started:.2f}s"
+    else:
+        single = f"{estimate_seconds(total_tokens, FINAL_MAX_TOKENS, args):.2f}s (estimated)"
+    print(f"document: {args.pages} pages, {len(chunks)} chunks, {total_tokens:,} tokens")
+    print(f"{'single':<12} 1 call  {single}")
+
+    cache = MemorySummaryCache()
+    seconds, result, summary_plan = await run_tree(chunks, client, cache)
+    print(f"{'map-reduce':<12} {result.llm_calls} calls  {seconds:.2f}s  "
+          f"(nodes {summary_plan.node_count}, concurrency {args.concurrency})")
+
+    # 数ページだけ変更した改訂版
+    rng = random.Random(args.seed + 1)
+    revised = list(corpus)
+    for page in rng.sample(range(args.pages), args.changed):
+        revised[page] += "\n" + rng.choice(FILLER) + f"（改訂 {page + 1}）"
+    seconds, result, summary_plan = await run_tree(chunk_corpus(revised, args.chunk_tokens), client, cache)
+    print(f"{'revision':<12} {result.llm_calls} calls  {seconds:.2f}s  "
+          f"({args.changed} pages changed, {result.cache_hits} cached nodes reused)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="階層要約と1回要約の比較")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--changed", type=int, default=3, help="改訂版で変更するページ数")
+    parser.add_argument("--chunk-tokens", type=int, default=settings.CONTEXT_CHUNK_MAX_TOKENS)
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--context-limit", type=int, default=128000, help="1回の呼び出しの入力上限")
+    parser.add_argument("--prefill-tps", type=float, default=5000.0, help="見積もり用の入力トークン処理速度")
+    parser.add_argument("--decode-tps", type=float, default=80.0, help="見積もり用の出力トークン生成速度")
+    parser.add_argument("--llm-overhead", type=float, default=0.5, help="見積もり用の固定オーバーヘッド（秒）")
+    parser.add_argument("--openai", action="store_true", help="実際にLLMを呼び出して計測する")
+    parser.add_argument("--model", default=settings.LLM_MODEL)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+提案の埋め込みの一括作成
+
+埋め込みが無い提案、または内容ハッシュ・モデルが変わった提案だけを
+ID 順のバッチで更新する（何度実行しても差分だけが処理される）。
+
+    python -m scripts.build_proposal_embeddings --batch-size 500
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.db.session import async_session_maker, engine
+from app.models.proposal import Proposal
+from app.services.embedding import ensure_embeddings, get_model
+
+
+async def run(batch_size: int) -> None:
+    model = get_model()
+    print(f"model: {model.name}")
+    last_id = 0
+    scanned = embedded = 0
+    started = time.perf_counter()
+    while True:
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Proposal).where(Proposal.id > last_id).order_by(Proposal.id).limit(batch_size)
+            )
+            proposals = result.scalars().all()
+            if not proposals:
+                break
+            embedded += await ensure_embeddings(db, proposals)
+            await db.commit()
+
+        last_id = proposals[-1].id
+        scanned += len(proposals)
+        elapsed = time.perf_counter() - started
+        print(f"scanned {scanned:,} proposals, embedded {embedded:,} ({scanned / elapsed:,.0f}/s)")
+
+    await engine.dispose()
+    print("done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提案の埋め込みの一括作成")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+ポイント有効期限の夜間バッチ
+
+有効期限を過ぎたロットの残りを全ユーザー分失効させ、EXPIRED 取引を作成する。
+cron 等で1日1回実行する。再実行しても二重に失効させることはない。
+
+    python -m scripts.expire_points
+    python -m scripts.expire_points --verify   # ロットと残高・取引履歴の照合のみ
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.db.session import async_session_maker, engine
+from app.services.points import expire_points, verify_lots
+
+
+async def run(args) -> None:
+    if args.verify:
+        async with async_session_maker() as db:
+            count, samples = await verify_lots(db, limit=args.limit)
+        for row in samples:
+            print(
+                f"balance {row['id']} (user {row['user_id']}): balance {row['balance']} "
+                f"lots {row['lots_remaining']}  credited {row['credited']}/{row['lot_credits']}  "
+                f"debited {row['debited']}/{row['consumed']}"
+            )
+        print(f"{count} mismatched balances")
+    else:
+        now = datetime.fromisoformat(args.now).replace(tzinfo=timezone.utc) if args.now else None
+        started = time.perf_counter()
+        result = await expire_points(now=now, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(
+            f"expired {result.points:,} points for {result.users:,} users "
+            f"in {result.batches} batches ({elapsed:.1f}s)"
+        )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ポイント有効期限の夜間バッチ")
+    parser.add_argument("--batch-size", type=int, default=None, help="1トランザクションあたりのユーザー数")
+    parser.add_argument("--now", default=None, help="基準時刻（UTC, ISO形式。検証用）")
+    parser.add_argument("--verify", action="store_true", help="失効させずにロットと履歴を照合する")
+    parser.add_argument("--limit", type=int, default=20, help="--verify で表示する不一致の件数")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
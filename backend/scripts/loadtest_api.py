@@ -0,0 +1,235 @@
+"""
+APIエンドツーエンド負荷試験
+
+seed_scale_data で投入したユーザーでログインし、サプライヤー／バイヤーの
+トラフィック比率を再現してエンドポイント別の p50/p95/p99 とスループットを出力する。
+
+    python -m scripts.loadtest_api --base-url http://localhost:8000 \\
+        --suppliers 50 --buyers 10 --concurrency 64 --duration 60 --output result.json
+
+--baseline に前回の結果を渡すと p95 の悪化率を比較し、
+閾値を超えたエンドポイントがあれば終了コード 1 を返す（リリース前チェック用）。
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from scripts.seed_scale_data import SEED_DOMAIN
+
+API = "/api/v1"
+
+# (重み, ラベル, メソッド, パステンプレート)
+SUPPLIER_MIX = [
+    (25, "GET /supplier/dashboard", "GET", "/supplier/dashboard"),
+    (20, "GET /supplier/proposals", "GET", "/supplier/proposals"),
+    (15, "GET /supplier/notifications", "GET", "/supplier/notifications"),
+    (10, "GET /supplier/proposals/{id}", "GET", "/supplier/proposals/{proposal_id}"),
+    (10, "GET /supplier/proposals/{id}/comments", "GET", "/supplier/proposals/{proposal_id}/comments"),
+    (5, "GET /supplier/proposals/{id}/progress", "GET", "/supplier/proposals/{proposal_id}/progress"),
+    (5, "GET /supplier/points/balance", "GET", "/supplier/points/balance"),
+    (5, "GET /supplier/points/transactions", "GET", "/supplier/points/transactions"),
+    (3, "POST /supplier/proposals/{id}/comments", "POST", "/supplier/proposals/{proposal_id}/comments"),
+    (2, "POST /supplier/notifications/read-all", "POST", "/supplier/notifications/read-all"),
+]
+BUYER_MIX = [
+    (40, "GET /proposals", "GET", "/proposals/"),
+    (20, "GET /proposals/{id}", "GET", "/proposals/{proposal_id}"),
+    (25, "GET /evaluations", "GET", "/evaluations/"),
+    (15, "GET /summaries/{id}", "GET", "/summaries/{proposal_id}"),
+]
+
+
+class Actor:
+    """ログイン済みの仮想ユーザー"""
+
+    def __init__(self, role: str, token: str, mix: list):
+        self.role = role
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.mix = mix
+        self.weights = [w for w, *_ in mix]
+        self.proposal_ids: List[int] = []
+
+    def next_request(self, rng: random.Random) -> Tuple[str, str, str, Optional[dict]]:
+        _, label, method, template = rng.choices(self.mix, weights=self.weights)[0]
+        if "{proposal_id}" in template:
+            if not self.proposal_ids:
+                # 詳細系は自分の提案が無ければ一覧に置き換える
+                _, label, method, template = self.mix[1] if self.role == "supplier" else self.mix[0]
+            else:
+                template = template.format(proposal_id=rng.choice(self.proposal_ids))
+        body = {"content": "負荷試験コメント"} if method == "POST" and "comments" in template else None
+        return label, method, API + template, body
+
+
+class Recorder:
+    """エンドポイント別の計測値"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool) -> None:
+        self.latencies[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        result = {}
+        for label, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            result[label] = {
+                "count": len(values),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+            }
+        return result
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * q))
+    return round(sorted_values[index] * 1000, 1)
+
+
+async def _login(client: httpx.AsyncClient, email: str) -> Optional[str]:
+    response = await client.post(f"{API}/auth/login", data={"username": email, "password": "password"})
+    if response.status_code != 200:
+        print(f"login failed: {email} ({response.status_code})", file=sys.stderr)
+        return None
+    return response.json()["access_token"]
+
+
+async def prepare_actors(client: httpx.AsyncClient, suppliers: int, buyers: int) -> List[Actor]:
+    """シードユーザーでログインし、詳細系で使う提案IDを集める"""
+    actors: List[Actor] = []
+    for i in range(suppliers):
+        token = await _login(client, f"supplier{i}@{SEED_DOMAIN}")
+        if token is None:
+            continue
+        actor = Actor("supplier", token, SUPPLIER_MIX)
+        response = await client.get(f"{API}/supplier/proposals", headers=actor.headers)
+        if response.status_code == 200:
+            actor.proposal_ids = [p["id"] for p in response.json()]
+        actors.append(actor)
+    for i in range(buyers):
+        token = await _login(client, f"buyer{i}@{SEED_DOMAIN}")
+        if token is None:
+            continue
+        actor = Actor("buyer", token, BUYER_MIX)
+        response = await client.get(f"{API}/proposals/", params={"per_page": 100}, headers=actor.headers)
+        if response.status_code == 200:
+            actor.proposal_ids = [p["id"] for p in response.json()["items"]]
+        actors.append(actor)
+    return actors
+
+
+async def _worker(client: httpx.AsyncClient, actors: List[Actor], recorder: Recorder,
+                  deadline: float, rng: random.Random) -> None:
+    while time.monotonic() < deadline:
+        actor = rng.choice(actors)
+        label, method, path, body = actor.next_request(rng)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, headers=actor.headers, json=body)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        recorder.record(label, time.perf_counter() - started, ok)
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """p95 がベースラインより threshold 以上悪化したエンドポイント"""
+    regressions = []
+    for label, stats in current.items():
+        base = baseline.get(label)
+        if not base or not base["p95_ms"]:
+            continue
+        ratio = stats["p95_ms"] / base["p95_ms"] - 1
+        if ratio > threshold:
+            regressions.append(f"{label}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms (+{ratio:.0%})")
+    return regressions
+
+
+def _print_table(summary: Dict[str, dict], elapsed: float) -> None:
+    print(f"{'endpoint':<42} {'count':>8} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    total = 0
+    for label, s in summary.items():
+        total += s["count"]
+        print(f"{label:<42} {s['count']:>8} {s['errors']:>5} {s['rps']:>8} "
+              f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+    print(f"total: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+
+async def run(args) -> int:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        actors = await prepare_actors(client, args.suppliers, args.buyers)
+        if not actors:
+            print("no actors logged in (run scripts.seed_scale_data first)", file=sys.stderr)
+            return 2
+
+        if args.warmup:
+            warmup = Recorder()
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*[
+                _worker(client, actors, warmup, deadline, random.Random(rng.random()))
+                for _ in range(args.concurrency)
+            ])
+
+        recorder = Recorder()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            _worker(client, actors, recorder, deadline, random.Random(rng.random()))
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.monotonic() - started
+
+    summary = recorder.summary(elapsed)
+    _print_table(summary, elapsed)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": elapsed, "concurrency": args.concurrency, "endpoints": summary},
+                      f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["endpoints"]
+        regressions = compare(summary, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="APIエンドツーエンド負荷試験")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--suppliers", type=int, default=50, help="ログインするサプライヤー数")
+    parser.add_argument("--buyers", type=int, default=10, help="ログインするバイヤー数")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60.0, help="計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=5.0, help="ウォームアップ時間（秒）")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="結果JSONの出力先")
+    parser.add_argument("--baseline", help="比較対象の結果JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95悪化の許容率")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
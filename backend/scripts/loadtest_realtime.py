@@ -0,0 +1,100 @@
+"""
+リアルタイム配信の負荷試験ハーネス
+
+ワーカー内の RealtimeHub に多数のアイドル接続を張り、
+1接続あたりのメモリ使用量とファンアウト遅延を計測する（要Redis）。
+
+    python -m scripts.loadtest_realtime --connections 10000 --events 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.services.realtime import RealtimeHub, publish_events
+
+
+async def _consumer(hub: RealtimeHub, user_id: int, ready: asyncio.Event,
+                    latencies: list, stop: asyncio.Event):
+    """SSEハンドラ相当の受信ループ"""
+    async with hub.subscribe(user_id) as queue:
+        ready.set()
+        while not stop.is_set():
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            sent_ns = json.loads(data)["data"]["sent_ns"]
+            latencies.append((time.perf_counter_ns() - sent_ns) / 1e6)
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run(connections: int, users: int, events: int, rate: int) -> None:
+    hub = RealtimeHub(queue_size=100)
+    await hub.start()
+    latencies: list = []
+    stop = asyncio.Event()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    tasks = []
+    for i in range(connections):
+        ready = asyncio.Event()
+        tasks.append(asyncio.create_task(
+            _consumer(hub, i % users, ready, latencies, stop)
+        ))
+        await ready.wait()
+    connect_sec = time.perf_counter() - started
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"connections: {hub.connection_count} ({users} users)")
+    print(f"connect time: {connect_sec:.2f}s")
+    print(f"memory per connection: {(after - before) / connections / 1024:.2f} KiB")
+
+    interval = 1.0 / rate if rate else 0
+    for _ in range(events):
+        user_id = random.randrange(users)
+        await publish_events([(user_id, {
+            "type": "loadtest",
+            "data": {"sent_ns": time.perf_counter_ns()},
+        })])
+        if interval:
+            await asyncio.sleep(interval)
+
+    # 配信しきるまで待つ
+    await asyncio.sleep(2.0)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await hub.stop()
+
+    if latencies:
+        print(f"deliveries: {len(latencies)}")
+        print(f"fan-out latency ms: p50={statistics.median(latencies):.2f} "
+              f"p95={_percentile(latencies, 0.95):.2f} "
+              f"p99={_percentile(latencies, 0.99):.2f} "
+              f"max={max(latencies):.2f}")
+    else:
+        print("no events delivered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リアルタイム配信の負荷試験")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--rate", type=int, default=500, help="1秒あたりの発行数")
+    args = parser.parse_args()
+    asyncio.run(run(args.connections, args.users, args.events, args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+履歴テーブルの月次パーティションの保守
+
+1. 当月から PARTITION_PREMAKE_MONTHS か月先までのパーティションを作成する
+   （デフォルトパーティションに入った行があれば、その月のパーティションへ移す）
+2. 保持期間（PARTITION_RETENTION_MONTHS）を過ぎたパーティションを gzip 圧縮の CSV で
+   MinIO（{PARTITION_ARCHIVE_PREFIX}/{テーブル}/{パーティション}.csv.gz）に保存し、
+   保存を確認してから切り離して削除する
+
+cron 等で1日1回実行する。作成・アーカイブ済みのものは何もしないため再実行してよい。
+
+    python -m scripts.maintain_partitions
+    python -m scripts.maintain_partitions --dry-run      # アーカイブ対象の確認のみ
+    python -m scripts.maintain_partitions --no-archive   # パーティションの作成のみ
+"""
+import argparse
+import asyncio
+import time
+
+from app.db.session import engine
+from app.services.partitions import archive_expired, ensure_partitions
+
+
+async def run(args) -> None:
+    started = time.perf_counter()
+    created = await ensure_partitions(months_ahead=args.months_ahead)
+    print(f"created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+
+    if args.archive:
+        result = await archive_expired(dry_run=args.dry_run)
+        if args.dry_run:
+            print(f"would archive {len(result.planned)} partitions: {', '.join(result.planned)}")
+        else:
+            print(f"archived {len(result.archived)} partitions ({result.rows:,} rows)")
+    await engine.dispose()
+    print(f"done ({time.perf_counter() - started:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="履歴テーブルの月次パーティションの保守")
+    parser.add_argument("--months-ahead", type=int, default=None, help="先行して作成する月数")
+    parser.add_argument("--no-archive", dest="archive", action="store_false", help="アーカイブを行わない")
+    parser.add_argument("--dry-run", action="store_true", help="アーカイブ対象を表示するだけ")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+期限スケジューラの再構築
+
+回答待ちのQ&Aラウンドの期限切れ・リマインドを Redis に登録し直す。
+Redis のデータを失った場合や、スケジューラ導入前のラウンドを取り込む場合に実行する。
+
+    python -m scripts.rebuild_deadline_schedule
+"""
+import asyncio
+
+from app.services.qa_rounds import rebuild_schedule
+
+
+async def run() -> None:
+    count = await rebuild_schedule()
+    print(f"scheduled deadlines for {count} open Q&A rounds")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+"""
+マッチング候補の全件再構築
+
+1. 提案の特徴量（match_features）をバッチで作り直す
+2. 有効なバイヤー要件ごとに提案候補を作り直す
+3. 提案ごとのバイヤー候補を作り直す（--proposals 指定時、件数が多いので任意）
+
+通常は保存時の差分更新で最新に保たれる。特徴量の定義変更後や
+COPY での一括投入後、または定期的な整合のために実行する。
+
+    python -m scripts.rebuild_match_candidates --batch-size 2000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select, update
+
+from app.db.session import async_session_maker, engine
+from app.models.matching import BuyerConfig
+from app.models.organization import Organization
+from app.models.proposal import Proposal
+from app.services.matching import (
+    EXCLUDED_STATUSES, proposal_features, refresh_buyer_candidates, refresh_proposal_candidates,
+)
+
+
+async def rebuild_features(batch_size: int) -> None:
+    last_id = 0
+    total = 0
+    started = time.perf_counter()
+    while True:
+        async with async_session_maker() as db:
+            rows = (await db.execute(
+                select(Proposal.id, Proposal.extracted_info, Organization.industry)
+                .join(Organization, Organization.id == Proposal.supplier_org_id)
+                .where(Proposal.id > last_id)
+                .order_by(Proposal.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            await db.execute(update(Proposal), [
+                {"id": proposal_id, "match_features": proposal_features(industry, extracted_info)}
+                for proposal_id, extracted_info, industry in rows
+            ])
+            await db.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
+        print(f"features: {total:,} proposals ({total / (time.perf_counter() - started):,.0f}/s)")
+
+
+async def rebuild_buyers() -> None:
+    async with async_session_maker() as db:
+        config_ids = (await db.execute(select(BuyerConfig.id).order_by(BuyerConfig.id))).scalars().all()
+    for config_id in config_ids:
+        async with async_session_maker() as db:
+            count = await refresh_buyer_candidates(db, [config_id])
+            await db.commit()
+        print(f"buyer config {config_id}: {count} candidates")
+
+
+async def rebuild_proposals(batch_size: int) -> None:
+    last_id = 0
+    total = 0
+    while True:
+        async with async_session_maker() as db:
+            proposal_ids = (await db.execute(
+                select(Proposal.id)
+                .where(Proposal.id > last_id)
+                .where(Proposal.status.not_in(EXCLUDED_STATUSES))
+                .order_by(Proposal.id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not proposal_ids:
+                break
+            total += await refresh_proposal_candidates(db, proposal_ids)
+            await db.commit()
+        last_id = proposal_ids[-1]
+        print(f"proposals up to id {last_id}: {total:,} candidates")
+
+
+async def run(batch_size: int, proposals: bool) -> None:
+    await rebuild_features(batch_size)
+    await rebuild_buyers()
+    if proposals:
+        await rebuild_proposals(batch_size)
+    await engine.dispose()
+    print("done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="マッチング候補の全件再構築")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--proposals", action="store_true", help="提案ごとのバイヤー候補も作り直す")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size, args.proposals))
+
+
+if __name__ == "__main__":
+    main()
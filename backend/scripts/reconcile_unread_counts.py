@@ -0,0 +1,19 @@
+"""
+未読通知数カウンタの照合ジョブ
+
+Redisの未読数カウンタをDBの実数で補正する。cron等で定期実行する。
+
+    python -m scripts.reconcile_unread_counts
+"""
+import asyncio
+
+from app.services.notification import reconcile_unread_counts
+
+
+async def run() -> None:
+    fixed = await reconcile_unread_counts()
+    print(f"reconciled {fixed} unread counters")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
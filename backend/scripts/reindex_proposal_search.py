@@ -0,0 +1,65 @@
+"""
+提案の検索トークン再構築
+
+マイグレーション直後や COPY で投入した行など、ORM を経由せずに書き込まれた
+提案の search_text / search_tokens を ID 順にバッチで埋める。
+
+    python -m scripts.reindex_proposal_search --batch-size 2000
+    python -m scripts.reindex_proposal_search --all   # 既存トークンも作り直す
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select, update
+
+from app.db.session import async_session_maker, engine
+from app.models.proposal import Proposal
+from app.services.search import build_search_text, tokenize
+
+
+async def run(batch_size: int, rebuild_all: bool) -> None:
+    last_id = 0
+    total = 0
+    started = time.perf_counter()
+    while True:
+        async with async_session_maker() as db:
+            stmt = (
+                select(Proposal.id, Proposal.title, Proposal.description, Proposal.extracted_info)
+                .where(Proposal.id > last_id)
+                .order_by(Proposal.id)
+                .limit(batch_size)
+            )
+            if not rebuild_all:
+                stmt = stmt.where(Proposal.search_tokens.is_(None))
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+
+            params = []
+            for proposal_id, title, description, extracted_info in rows:
+                text = build_search_text(title, description, extracted_info)
+                params.append({"id": proposal_id, "search_text": text, "search_tokens": tokenize(text)})
+            # 主キー指定の一括UPDATE（before_flush フックは通らない）
+            await db.execute(update(Proposal), params)
+            await db.commit()
+
+        last_id = rows[-1][0]
+        total += len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"indexed {total:,} proposals (last id {last_id}, {total / elapsed:,.0f}/s)")
+
+    await engine.dispose()
+    print("done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提案の検索トークン再構築")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--all", action="store_true", help="既存のトークンも作り直す")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size, args.all))
+
+
+if __name__ == "__main__":
+    main()
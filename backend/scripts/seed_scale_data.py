@@ -0,0 +1,320 @@
+"""
+大規模テストデータ生成
+
+COPY で合成データを一括投入する。提案・コメント・通知・ポイント取引の件数は
+サプライヤーごとに偏り（Zipf分布）を持たせ、実運用に近い分布にする。
+ポイント残高はロットに分けて投入し、一部は有効期限切れにする（scripts.expire_points の計測用）。
+
+    python -m scripts.seed_scale_data --suppliers 10000 --proposals 1000000 \\
+        --comments 20000000 --notifications 20000000 --transactions 5000000
+
+全ユーザーのパスワードは "password"。
+メールアドレスは supplier{n}@seed.example.com / buyer{n}@seed.example.com。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Sequence
+
+from app.db.session import engine
+from app.services.partitions import ensure_partitions
+from app.services.password import pwd_context
+
+CHUNK_SIZE = 100_000
+SEED_DOMAIN = "seed.example.com"
+
+PROPOSAL_STATUSES = (
+    "DRAFT", "SUBMITTED", "ANALYZING", "QA_PENDING", "QA_COMPLETED",
+    "EVALUATED", "ACCEPTED", "REJECTED",
+)
+PROPOSAL_STATUS_WEIGHTS = (5, 10, 5, 10, 10, 35, 10, 15)
+INDUSTRIES = ("製造", "物流", "小売", "IT", "食品", "化学", "医療", "建設")
+TITLE_WORDS = (
+    "IoTセンサー", "物流最適化", "省エネ照明", "梱包資材", "在庫管理SaaS",
+    "AI検品", "産業用ロボット", "クラウド会計", "冷凍食品", "環境配慮素材",
+)
+
+
+class Seeder:
+    def __init__(self, conn, rng: random.Random):
+        self.conn = conn
+        self.rng = rng
+        self.now = datetime.utcnow()
+
+    async def next_id(self, table: str) -> int:
+        return (await self.conn.fetchval(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}"))
+
+    async def copy(self, table: str, columns: Sequence[str], records: Iterable[tuple]) -> int:
+        """チャンク単位で COPY する"""
+        total = 0
+        started = time.perf_counter()
+        iterator = iter(records)
+        while True:
+            chunk = list(itertools.islice(iterator, CHUNK_SIZE))
+            if not chunk:
+                break
+            await self.conn.copy_records_to_table(table, records=chunk, columns=list(columns))
+            total += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"  {table:<20} {total:>12,} rows  {elapsed:7.1f}s  ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+        return total
+
+    def past(self, days: int = 365) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def past_tz(self, days: int = 365) -> datetime:
+        return self.past(days).replace(tzinfo=timezone.utc)
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    """順位に対する Zipf 重み（累積）"""
+    return list(itertools.accumulate(1.0 / (i + 1) ** s for i in range(n)))
+
+
+def skewed_choices(rng: random.Random, population: Sequence[int], cum_weights: List[float],
+                   total: int) -> Iterator[int]:
+    """偏りを持たせた抽選（チャンクごとに生成してメモリを抑える）"""
+    remaining = total
+    while remaining > 0:
+        k = min(CHUNK_SIZE, remaining)
+        yield from rng.choices(population, cum_weights=cum_weights, k=k)
+        remaining -= k
+
+
+async def _seed(conn, args) -> None:
+    rng = random.Random(args.seed)
+    seeder = Seeder(conn, rng)
+    hashed_password = pwd_context.hash("password")
+    now = seeder.now
+
+    print("seeding...")
+
+    # 過去1年分の履歴が入る月次パーティション（デフォルトパーティションに溜めない）
+    await ensure_partitions(months_back=13)
+
+    # 組織
+    org_start = await seeder.next_id("organizations")
+    supplier_orgs = list(range(org_start, org_start + args.suppliers))
+    buyer_orgs = list(range(org_start + args.suppliers, org_start + args.suppliers + args.buyer_orgs))
+    await seeder.copy(
+        "organizations",
+        ("id", "name", "type", "industry", "created_at", "updated_at"),
+        itertools.chain(
+            ((oid, f"サプライヤー{oid}株式会社", "SUPPLIER", rng.choice(INDUSTRIES), now, now)
+             for oid in supplier_orgs),
+            ((oid, f"バイヤー{oid}株式会社", "BUYER", rng.choice(INDUSTRIES), now, now)
+             for oid in buyer_orgs),
+        ),
+    )
+
+    # ユーザー（サプライヤー組織ごとに1名、バイヤーは組織に均等配置）
+    user_start = await seeder.next_id("users")
+    supplier_users = list(range(user_start, user_start + args.suppliers))
+    buyer_users = list(range(user_start + args.suppliers, user_start + args.suppliers + args.buyers))
+    await seeder.copy(
+        "users",
+        ("id", "email", "hashed_password", "name", "role", "is_active", "organization_id",
+         "created_at", "updated_at"),
+        itertools.chain(
+            ((uid, f"supplier{i}@{SEED_DOMAIN}", hashed_password, f"サプライヤー担当{i}",
+              "SUPPLIER", True, supplier_orgs[i], now, now)
+             for i, uid in enumerate(supplier_users)),
+            ((uid, f"buyer{i}@{SEED_DOMAIN}", hashed_password, f"バイヤー担当{i}",
+              "BUYER", True, buyer_orgs[i % len(buyer_orgs)], now, now)
+             for i, uid in enumerate(buyer_users)),
+        ),
+    )
+
+    # ポイント残高
+    balance_start = await seeder.next_id("point_balances")
+    balance_ids = list(range(balance_start, balance_start + args.suppliers))
+    balances = [rng.randrange(0, 30000) for _ in balance_ids]
+    await seeder.copy(
+        "point_balances",
+        ("id", "user_id", "balance", "total_purchased", "total_used", "created_at", "updated_at"),
+        ((bid, supplier_users[i], balances[i], 0, 0, now.replace(tzinfo=timezone.utc),
+          now.replace(tzinfo=timezone.utc))
+         for i, bid in enumerate(balance_ids)),
+    )
+
+    # ポイントロット（移行分と同じく付与取引なし。残高を1〜3ロットに分け、一部は期限切れ）
+    def lot_rows():
+        created = now.replace(tzinfo=timezone.utc)
+        for bid, balance in zip(balance_ids, balances):
+            cuts = sorted(rng.randrange(0, balance + 1) for _ in range(rng.randrange(0, 3)))
+            for amount in (b - a for a, b in zip([0, *cuts], [*cuts, balance])):
+                if amount > 0:
+                    expires = created + timedelta(days=rng.uniform(-args.expired_days, 365 - args.expired_days))
+                    yield (bid, amount, amount, expires, created)
+
+    await seeder.copy(
+        "point_lots",
+        ("point_balance_id", "amount", "remaining", "expires_at", "created_at"),
+        lot_rows(),
+    )
+
+    # サプライヤーごとの偏り（順位はシャッフルして組織IDと相関させない）
+    supplier_index = list(range(args.suppliers))
+    rng.shuffle(supplier_index)
+    supplier_cum = zipf_weights(args.suppliers, args.skew)
+
+    # 提案
+    proposal_start = await seeder.next_id("proposals")
+    proposal_owner: List[int] = []
+
+    def extracted_info() -> str:
+        # 必須条件（ノックアウト条件）・マッチングで使う属性
+        return json.dumps({
+            "categories": rng.sample(TITLE_WORDS, 2),
+            "keywords": rng.sample(INDUSTRIES, 2),
+            "min_lot": rng.choice((1, 10, 100, 500, 1000, 5000)),
+            "lead_time_weeks": rng.randint(1, 12),
+            "iso_certified": rng.random() < 0.4,
+        }, ensure_ascii=False)
+
+    def proposal_rows():
+        statuses = rng.choices(PROPOSAL_STATUSES, weights=PROPOSAL_STATUS_WEIGHTS, k=args.proposals)
+        owners = skewed_choices(rng, supplier_index, supplier_cum, args.proposals)
+        for n, (owner, status) in enumerate(zip(owners, statuses)):
+            proposal_owner.append(owner)
+            created = seeder.past()
+            yield (
+                proposal_start + n,
+                f"{rng.choice(TITLE_WORDS)}のご提案 #{proposal_start + n}",
+                f"{rng.choice(INDUSTRIES)}業界向けの{rng.choice(TITLE_WORDS)}に関する提案です。",
+                status, supplier_orgs[owner], supplier_users[owner], None, extracted_info(),
+                300, created, created,
+            )
+
+    await seeder.copy(
+        "proposals",
+        ("id", "title", "description", "status", "supplier_org_id", "supplier_user_id",
+         "buyer_config_id", "extracted_info", "points_used", "created_at", "updated_at"),
+        proposal_rows(),
+    )
+    proposal_ids = range(proposal_start, proposal_start + args.proposals)
+
+    # 評価（提案の一部）
+    evaluated = rng.sample(proposal_ids, int(args.proposals * args.evaluated_ratio))
+    await seeder.copy(
+        "evaluations",
+        ("proposal_id", "total_score", "trust_score", "trust_rank", "rank", "summary",
+         "created_at", "updated_at"),
+        ((pid, round(rng.uniform(30, 100), 1), round(rng.uniform(30, 100), 1),
+          rng.choice("ABCD"), rng.choice(("CANDIDATE", "CONSIDER", "HOLD", "REJECTED")),
+          "合成データの要約", now, now)
+         for pid in evaluated),
+    )
+
+    # 提案ごとの偏り（人気提案にコメントが集中する）
+    proposal_cum = zipf_weights(args.proposals, args.skew)
+    proposal_offsets = list(range(args.proposals))
+
+    def comment_rows():
+        for offset in skewed_choices(rng, proposal_offsets, proposal_cum, args.comments):
+            by_buyer = rng.random() < 0.5
+            user_id = rng.choice(buyer_users) if by_buyer else supplier_users[proposal_owner[offset]]
+            yield (
+                proposal_start + offset, user_id, "合成コメントです。ご確認ください。",
+                by_buyer and rng.random() < 0.1, None, seeder.past_tz(), seeder.past_tz(),
+            )
+
+    await seeder.copy(
+        "comments",
+        ("proposal_id", "user_id", "content", "is_internal", "parent_id", "created_at", "updated_at"),
+        comment_rows(),
+    )
+
+    def progress_rows():
+        for offset in skewed_choices(rng, proposal_offsets, proposal_cum, args.progress):
+            yield (
+                proposal_start + offset, rng.choice(PROPOSAL_STATUSES),
+                supplier_users[proposal_owner[offset]], "合成進捗", seeder.past_tz(),
+            )
+
+    await seeder.copy(
+        "proposal_progress",
+        ("proposal_id", "status", "changed_by", "note", "created_at"),
+        progress_rows(),
+    )
+
+    def notification_rows():
+        for owner in skewed_choices(rng, supplier_index, supplier_cum, args.notifications):
+            yield (
+                supplier_users[owner], "新しいコメント", "提案に新しいコメントがあります",
+                None, rng.random() < 0.7, rng.choice(("comment", "status_change", "point")),
+                rng.choice(proposal_ids), seeder.past_tz(),
+            )
+
+    await seeder.copy(
+        "notifications",
+        ("user_id", "title", "message", "link", "is_read", "notification_type",
+         "reference_id", "created_at"),
+        notification_rows(),
+    )
+
+    def transaction_rows():
+        for owner in skewed_choices(rng, supplier_index, supplier_cum, args.transactions):
+            if rng.random() < 0.2:
+                tx_type, amount = "PURCHASE", rng.choice((3000, 10000, 30000))
+            else:
+                tx_type, amount = "PROPOSAL_SUBMIT", -300
+            yield (
+                balance_ids[owner], tx_type, amount, rng.randrange(0, 30000),
+                "合成取引", None, None, seeder.past_tz(),
+            )
+
+    await seeder.copy(
+        "point_transactions",
+        ("point_balance_id", "transaction_type", "amount", "balance_after", "description",
+         "reference_id", "payment_id", "created_at"),
+        transaction_rows(),
+    )
+
+    # 明示IDで投入したテーブルのシーケンスを進め、統計情報を更新
+    for table in ("organizations", "users", "point_balances", "proposals", "evaluations",
+                  "comments", "proposal_progress", "notifications", "point_transactions",
+                  "point_lots"):
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        )
+        await conn.execute(f"ANALYZE {table}")
+
+
+async def seed(args) -> None:
+    try:
+        # COPY は asyncpg の接続で直接行う（接続はプールに返してから破棄する）
+        async with engine.connect() as connection:
+            raw = await connection.get_raw_connection()
+            await _seed(raw.driver_connection, args)
+    finally:
+        await engine.dispose()
+    print("done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大規模テストデータ生成")
+    parser.add_argument("--suppliers", type=int, default=10_000)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--buyer-orgs", type=int, default=100)
+    parser.add_argument("--proposals", type=int, default=1_000_000)
+    parser.add_argument("--evaluated-ratio", type=float, default=0.6)
+    parser.add_argument("--comments", type=int, default=20_000_000)
+    parser.add_argument("--progress", type=int, default=3_000_000)
+    parser.add_argument("--notifications", type=int, default=20_000_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument("--expired-days", type=float, default=30.0,
+                        help="ポイントロットの有効期限を現在からこの日数前〜1年後に分布させる")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf分布の指数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed(args))
+
+
+if __name__ == "__main__":
+    main()
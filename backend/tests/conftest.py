@@ -0,0 +1,72 @@
+"""
+テスト共通の設定
+
+DBを使うテストは TEST_DATABASE_URL（マイグレーション済みのPostgreSQL）が設定されている場合だけ
+実行する。db フィクスチャのセッションの書き込みはテスト終了時にロールバックする。
+"""
+import os
+import uuid
+
+import pytest
+import pytest_asyncio
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+requires_db = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db(db_engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with db_engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture
+def no_background_refresh(monkeypatch):
+    """コミット後にアプリのDB接続で動く再計算（マッチング候補・埋め込み）を止める
+
+    コミットするテストで、テスト用DBとは別の接続先へ書き込みに行かないようにする。
+    """
+    from app.services import embedding, matching
+
+    async def skip(*args):
+        pass
+
+    monkeypatch.setattr(matching, "_refresh", skip)
+    monkeypatch.setattr(embedding, "refresh_embeddings", skip)
+
+
+async def create_supplier(db, name: str = "test"):
+    """サプライヤー組織とユーザーを作成して (組織, ユーザー) を返す"""
+    from app.models.organization import Organization, OrganizationType
+    from app.models.user import User, UserRole
+
+    organization = Organization(name=name, type=OrganizationType.SUPPLIER)
+    db.add(organization)
+    await db.flush()
+    user = User(
+        email=f"{uuid.uuid4().hex}@example.com", hashed_password="x", name=name,
+        role=UserRole.SUPPLIER, organization_id=organization.id,
+    )
+    db.add(user)
+    await db.flush()
+    return organization, user
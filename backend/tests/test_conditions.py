@@ -0,0 +1,126 @@
+"""
+必須条件の評価
+check_conditions（Python）と compile_conditions（SQL）が同じ結果になることを、
+型の違う値を含む抽出データと条件の組み合わせで確認する。
+"""
+import pytest
+from sqlalchemy import select
+
+from app.models.proposal import Proposal
+from app.services.conditions import check_conditions, compile_condition
+from tests.conftest import create_supplier, requires_db
+
+INFOS = {
+    "typed": {
+        "min_lot": 100, "lead_time_weeks": 4, "iso_certified": True,
+        "categories": ["IoT", "物流"], "name": "IoTセンサー", "spec": {"a": 1, "b": [1, 2]},
+        "note": None, "count": 3, "ratio": 0.5,
+    },
+    "strings": {
+        "min_lot": "100", "lead_time_weeks": 4.5, "iso_certified": 1,
+        "categories": "IoT", "name": "物流_100%", "spec": {"IoT": 1}, "count": "3", "ratio": "0.5",
+    },
+    "nested": {
+        "min_lot": 1000, "iso_certified": False, "categories": [["IoT"], {"a": 1}, 3],
+        "name": "Zeta", "spec": [{"a": 1, "b": 2}], "count": 3.0,
+    },
+    "empty": {},
+    "missing": None,
+}
+
+CONDITIONS = [
+    {"key": "min_lot", "op": "==", "value": 100},
+    {"key": "min_lot", "op": "!=", "value": 100},
+    {"key": "min_lot", "op": "<=", "value": 1000},
+    {"key": "min_lot", "op": ">", "value": 100},
+    {"key": "min_lot", "op": "==", "value": "100"},
+    {"key": "min_lot", "op": "!=", "value": "100"},
+    {"key": "min_lot", "op": "<", "value": "2"},
+    {"key": "lead_time_weeks", "op": "<=", "value": 4},
+    {"key": "lead_time_weeks", "op": ">=", "value": 4.5},
+    {"key": "iso_certified", "op": "==", "value": True},
+    {"key": "iso_certified", "op": "!=", "value": True},
+    {"key": "iso_certified", "op": "==", "value": 1},
+    {"key": "iso_certified", "op": "!=", "value": 1},
+    {"key": "iso_certified", "op": "<", "value": True},
+    {"key": "count", "op": "==", "value": 3},
+    {"key": "count", "op": "!=", "value": 3},
+    {"key": "count", "op": ">=", "value": 3},
+    {"key": "count", "op": "==", "value": True},
+    {"key": "ratio", "op": "<", "value": 1},
+    {"key": "ratio", "op": "<", "value": "1"},
+    {"key": "name", "op": "<", "value": "a"},
+    {"key": "name", "op": ">=", "value": "Z"},
+    {"key": "name", "op": "contains", "value": "_100%"},
+    {"key": "name", "op": "contains", "value": "IoT"},
+    {"key": "name", "op": "in", "value": ["Zeta", "物流"]},
+    {"key": "name", "op": "in", "value": []},
+    {"key": "name", "op": "in", "value": "Zeta"},
+    {"key": "categories", "op": "contains", "value": "IoT"},
+    {"key": "categories", "op": "contains", "value": ["IoT"]},
+    {"key": "categories", "op": "contains", "value": {"a": 1}},
+    {"key": "categories", "op": "contains", "value": 3},
+    {"key": "categories", "op": "==", "value": ["物流"]},
+    {"key": "categories", "op": "==", "value": "IoT"},
+    {"key": "categories", "op": "in", "value": [["IoT"], "IoT"]},
+    {"key": "spec", "op": "contains", "value": "IoT"},
+    {"key": "spec", "op": "contains", "value": {"a": 1}},
+    {"key": "spec", "op": "==", "value": {"a": 1}},
+    {"key": "spec", "op": "==", "value": {"b": [2]}},
+    {"key": "spec", "op": "!=", "value": {"a": 1}},
+    {"key": "note", "op": "exists"},
+    {"key": "note", "op": "==", "value": None},
+    {"key": "note", "op": "!=", "value": None},
+    {"key": "count", "op": "exists"},
+    {"key": "absent", "op": "!=", "value": 1},
+    {"key": "count", "op": "~", "value": 3},
+]
+
+
+def _id(condition):
+    return f"{condition['key']} {condition.get('op')} {condition.get('value')!r}"
+
+
+@pytest.mark.parametrize("condition, info, expected", [
+    # 型の違う値は SQL で NULL（不成立）になる
+    ({"key": "min_lot", "op": "!=", "value": 100}, {"min_lot": "100"}, False),
+    ({"key": "iso_certified", "op": "==", "value": 1}, {"iso_certified": True}, False),
+    ({"key": "spec", "op": "contains", "value": "a"}, {"spec": {"a": 1}}, False),
+    ({"key": "categories", "op": "contains", "value": "IoT"}, {"categories": ["IoT", "物流"]}, True),
+    ({"key": "count", "op": "==", "value": 3}, {"count": 3.0}, True),
+])
+def test_check_condition_types(condition, info, expected):
+    assert check_conditions([condition], info) is expected
+
+
+def test_all_conditions_must_hold():
+    info = INFOS["typed"]
+    assert check_conditions([], info)
+    assert check_conditions([{"key": "min_lot", "op": "<=", "value": 100}, {"key": "count", "op": "exists"}], info)
+    assert not check_conditions([{"key": "min_lot", "op": "<=", "value": 100}, {"key": "absent", "op": "exists"}], info)
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_python_and_sql_agree(db):
+    organization, user = await create_supplier(db)
+    proposals = {}
+    for name, info in INFOS.items():
+        proposal = Proposal(title=name, supplier_org_id=organization.id, supplier_user_id=user.id)
+        if info is not None:
+            proposal.extracted_info = info
+        db.add(proposal)
+        proposals[name] = proposal
+    await db.flush()
+    ids = {proposal.id: name for name, proposal in proposals.items()}
+
+    mismatches = []
+    for condition in CONDITIONS:
+        matched = set((await db.scalars(
+            select(Proposal.id).where(Proposal.id.in_(ids), compile_condition(condition))
+        )).all())
+        for proposal_id, name in ids.items():
+            python = check_conditions([condition], INFOS[name])
+            if python != (proposal_id in matched):
+                mismatches.append(f"{_id(condition)} on {name}: python={python}")
+    assert mismatches == []
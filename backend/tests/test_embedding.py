@@ -0,0 +1,58 @@
+"""
+埋め込み・類似提案検索
+ローカルモデル（HashingEmbeddingModel）で計算し、外部APIは使わない。
+"""
+import math
+
+import pytest
+
+from app.models.proposal import Proposal, ProposalStatus
+from app.services import embedding
+from tests.conftest import create_supplier, requires_db
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+@pytest.mark.asyncio
+async def test_hashing_model_is_deterministic_and_normalized():
+    model = embedding.HashingEmbeddingModel(dim=256)
+    first, again, similar, other = await model.embed([
+        "IoTセンサーによる在庫管理", "IoTセンサーによる在庫管理", "IoTセンサーで在庫管理", "冷凍食品の物流最適化",
+    ])
+    assert first == again
+    assert math.isclose(math.sqrt(sum(v * v for v in first)), 1.0)
+    assert _cosine(first, similar) > _cosine(first, other)
+
+
+@pytest.fixture
+def hashing_model():
+    embedding.set_model(embedding.HashingEmbeddingModel())
+    yield
+    embedding.set_model(None)
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_find_similar_excludes_drafts(db, hashing_model):
+    organization, user = await create_supplier(db)
+
+    def proposal(title, status):
+        return Proposal(
+            title=title, description="工場向けのIoTセンサーで在庫を自動で管理します", status=status,
+            supplier_org_id=organization.id, supplier_user_id=user.id,
+        )
+
+    target = proposal("IoTセンサー在庫管理", ProposalStatus.SUBMITTED)
+    submitted = proposal("IoTセンサー在庫管理のご提案", ProposalStatus.EVALUATED)
+    draft = proposal("IoTセンサー在庫管理（下書き）", ProposalStatus.DRAFT)
+    db.add_all([target, submitted, draft])
+    await db.flush()
+    await embedding.ensure_embeddings(db, [target, submitted, draft])
+
+    rows = await embedding.find_similar(db, target.id, limit=50)
+    ids = [p.id for p, _, _ in rows]
+    assert submitted.id in ids
+    assert draft.id not in ids
+    assert target.id not in ids
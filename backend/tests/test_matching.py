@@ -0,0 +1,99 @@
+"""
+マッチング候補の再計算
+提案側の再計算で、バイヤーごとの候補数の上限を守ること、特徴量が変わらない提案を
+書き換えないこと（updated_at を進めず、並行するステータス遷移を競合させない）を確認する。
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.models.matching import BuyerConfig, MatchCandidate
+from app.models.organization import Organization, OrganizationType
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.user import User
+from app.services import matching, proposal_status
+from tests.conftest import create_supplier, requires_db
+
+INFO = {"categories": ["IoTセンサー"], "keywords": ["在庫管理"]}
+
+
+async def _setup(db, proposals: int = 3):
+    organization, user = await create_supplier(db, "matching")
+    buyer_org = Organization(name="matching buyer", type=OrganizationType.BUYER)
+    db.add(buyer_org)
+    await db.flush()
+    config = BuyerConfig(organization_id=buyer_org.id, name="test", categories=["IoTセンサー"])
+    db.add(config)
+    rows = [
+        Proposal(
+            title=f"matching {i}", status=ProposalStatus.SUBMITTED, extracted_info=INFO,
+            supplier_org_id=organization.id, supplier_user_id=user.id,
+        )
+        for i in range(proposals)
+    ]
+    db.add_all(rows)
+    await db.flush()
+    return organization, user, buyer_org, config, rows
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_proposal_refresh_keeps_buyer_candidate_limit(db, monkeypatch):
+    monkeypatch.setattr(settings, "MATCH_CANDIDATES_PER_BUYER", 2)
+    _, _, _, config, proposals = await _setup(db)
+
+    await matching.refresh_proposal_candidates(db, [p.id for p in proposals])
+    candidates = (await db.scalars(
+        select(MatchCandidate.proposal_id).where(MatchCandidate.buyer_config_id == config.id)
+    )).all()
+    # 同点のため新しい提案（ID の大きい方）が残る
+    assert sorted(candidates) == sorted(p.id for p in proposals)[-2:]
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_unchanged_features_are_not_rewritten(db):
+    _, _, _, _, proposals = await _setup(db, proposals=1)
+    proposal = proposals[0]
+    await matching.refresh_proposal_candidates(db, [proposal.id])
+
+    stamp = datetime(2020, 1, 1)
+    proposal.updated_at = stamp
+    await db.flush()
+    await matching.refresh_proposal_candidates(db, [proposal.id])
+    await db.refresh(proposal)
+    assert proposal.updated_at == stamp
+    assert proposal.match_features == matching.proposal_features(None, INFO)
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_refresh_does_not_block_status_transition(db_engine, no_background_refresh):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with maker() as db:
+        organization, user, buyer_org, config, proposals = await _setup(db, proposals=1)
+        await matching.refresh_proposal_candidates(db, [proposals[0].id])
+        await db.commit()
+    proposal_id = proposals[0].id
+
+    try:
+        async with maker() as refresher, maker() as worker:
+            # 再計算のトランザクションが開いている間に、別のトランザクションで遷移させる
+            await matching.refresh_proposal_candidates(refresher, [proposal_id])
+            result = await proposal_status.bulk_transition(worker, [proposal_id], ProposalStatus.ANALYZING)
+            assert [t.proposal_id for t in result.transitioned] == [proposal_id]
+            assert result.stale == []
+            await worker.rollback()
+            await refresher.rollback()
+    finally:
+        async with maker() as db:
+            await db.execute(delete(MatchCandidate).where(MatchCandidate.proposal_id == proposal_id))
+            await db.execute(delete(BuyerConfig).where(BuyerConfig.id == config.id))
+            await db.execute(delete(Proposal).where(Proposal.id == proposal_id))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.execute(delete(Organization).where(Organization.id.in_([organization.id, buyer_org.id])))
+            await db.commit()
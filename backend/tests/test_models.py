@@ -0,0 +1,26 @@
+"""
+ORM マッパーの構成
+リレーションの名前参照・外部キー指定の誤りは最初にクエリを実行するまで表に出ないため、
+configure_mappers() で全モデルを構成できることを確認する。
+"""
+from sqlalchemy.orm import configure_mappers
+
+from app.models.comment import Notification
+from app.models.proposal import Proposal
+from app.models.user import User
+
+
+def test_configure_mappers():
+    configure_mappers()
+
+
+def test_user_proposals_join_on_supplier_user_id():
+    configure_mappers()
+    assert set(User.proposals.property.local_columns) == {User.__table__.c.id}
+    assert [c.name for c in User.proposals.property.remote_side] == ["supplier_user_id"]
+    assert Proposal.supplier.property.mapper.class_ is User
+
+
+def test_notification_user_relationship():
+    configure_mappers()
+    assert Notification.user.property.mapper.class_ is User
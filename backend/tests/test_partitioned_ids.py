@@ -0,0 +1,49 @@
+"""
+パーティション分割テーブルの主キー
+主キーが (id, created_at) でも id が連番（SERIAL）のまま採番されることを確認する。
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.models.comment import Comment, Notification, ProposalProgress
+from app.models.point import PointBalance, PointTransaction, TransactionType
+from app.models.proposal import Proposal, ProposalStatus
+from tests.conftest import create_supplier, requires_db
+
+PARTITIONED_MODELS = [Comment, ProposalProgress, Notification, PointTransaction]
+
+
+@pytest.mark.parametrize("model", PARTITIONED_MODELS, ids=lambda m: m.__tablename__)
+def test_id_is_autoincrement_column(model):
+    table = model.__table__
+    assert [c.name for c in table.primary_key.columns] == ["id", "created_at"]
+    assert table.autoincrement_column is table.c.id
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+    assert "id SERIAL NOT NULL" in ddl
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_insert_returns_id(db):
+    organization, user = await create_supplier(db)
+    proposal = Proposal(title="test", supplier_org_id=organization.id, supplier_user_id=user.id)
+    db.add(proposal)
+    await db.flush()
+    balance = PointBalance(user_id=user.id)
+    notification = Notification(user_id=user.id, title="test", message="test")
+    comment = Comment(proposal_id=proposal.id, user_id=user.id, content="test")
+    progress = ProposalProgress(proposal_id=proposal.id, status=ProposalStatus.SUBMITTED)
+    db.add_all([balance, notification, comment, progress])
+    await db.flush()
+    point_transaction = PointTransaction(
+        point_balance_id=balance.id, transaction_type=TransactionType.BONUS,
+        amount=1, balance_after=1,
+    )
+    db.add(point_transaction)
+    await db.flush()
+
+    for row in (notification, comment, progress, point_transaction):
+        assert row.id is not None
+    await db.refresh(notification)
+    assert notification.created_at is not None
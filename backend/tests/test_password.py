@@ -0,0 +1,60 @@
+"""
+パスワードハッシュの有界スレッドプール
+ログインが集中しても bcrypt の計算がイベントループを止めず、同時に動く軽量な処理
+（他のエンドポイント相当）の遅延が小さいままであることを確認する。
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.password import PasswordHasher, PasswordHasherBusy
+
+# 軽量な処理の遅延の上限（bcrypt 1回分をループ上で実行すると数百ミリ秒止まる）
+MAX_PROBE_LAG_SECONDS = 0.1
+
+
+async def _probe(stop: asyncio.Event, lags: list) -> None:
+    """10msごとに起き、予定より遅れた時間を記録する"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+@pytest.mark.asyncio
+async def test_login_burst_does_not_block_event_loop():
+    hasher = PasswordHasher(max_workers=2, max_queue=64)
+    try:
+        hashed = await hasher.hash("password")
+        stop = asyncio.Event()
+        lags: list = []
+        probe = asyncio.create_task(_probe(stop, lags))
+        results = await asyncio.gather(
+            *(hasher.verify("password", hashed) for _ in range(6)),
+            *(hasher.hash(f"password-{i}") for i in range(2)),
+        )
+        stop.set()
+        await probe
+    finally:
+        hasher.shutdown()
+
+    assert results[:6] == [True] * 6
+    assert len(lags) >= 5
+    assert max(lags) < MAX_PROBE_LAG_SECONDS
+    assert hasher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_requests_over_queue_limit_are_rejected():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(
+            *(hasher.hash("password") for _ in range(3)), return_exceptions=True,
+        )
+    finally:
+        hasher.shutdown()
+
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    assert hasher.rejected == 1
+    assert hasher.in_flight == 0
@@ -0,0 +1,256 @@
+"""
+提案ステータスの状態遷移
+遷移表と、比較交換（proposals.version）の再試行・競合・不正遷移の判定を確認する。
+DBを使うテストでは複数のワーカーが同じ提案を並行して遷移させ、遷移の取りこぼしや
+二重の遷移がないこと（成功した遷移の数 = version = 進捗履歴の件数）を確認する。
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from app.models.comment import ProposalProgress
+from app.models.organization import Organization
+from app.models.outbox import OutboxEvent
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.user import User
+from app.services import outbox, proposal_status
+from app.services.proposal_status import TRANSITIONS, InvalidTransition, StaleProposal, can_transition
+from tests.conftest import create_supplier, requires_db
+
+S = ProposalStatus
+
+
+# ============ 遷移表 ============
+
+def test_transitions_cover_every_status():
+    assert set(TRANSITIONS) == set(ProposalStatus)
+    for current, targets in TRANSITIONS.items():
+        assert current not in targets
+        assert targets <= set(ProposalStatus)
+
+
+def test_terminal_statuses():
+    assert TRANSITIONS[S.ACCEPTED] == frozenset()
+    assert TRANSITIONS[S.REJECTED] == frozenset()
+    # 提出後はどの状態からでも不採用にできる
+    for current, targets in TRANSITIONS.items():
+        if current not in (S.DRAFT, S.ACCEPTED, S.REJECTED):
+            assert S.REJECTED in targets
+
+
+def test_can_transition():
+    assert can_transition(S.DRAFT, S.SUBMITTED)
+    assert not can_transition(S.SUBMITTED, S.DRAFT)
+    assert not can_transition(S.DRAFT, S.ACCEPTED)
+    assert not can_transition(None, S.SUBMITTED)
+
+
+# ============ 再試行・競合・不正遷移（DBなし） ============
+
+class FakeProposals:
+    """_read / _swap の代わりに使うメモリ上の提案
+
+    interference に入れた更新（提案ID → ステータス）は、次の _swap の直前に
+    他のワーカーの遷移として適用される。
+    """
+
+    def __init__(self, rows: Dict[int, tuple]):
+        self.rows = dict(rows)   # 提案ID → (ステータス, バージョン)
+        self.interference: List[Dict[int, ProposalStatus]] = []
+        self.swaps = 0
+
+    async def read(self, db, proposal_ids):
+        return {i: self.rows[i] for i in proposal_ids if i in self.rows}
+
+    async def swap(self, db, expected, target):
+        self.swaps += 1
+        if self.interference:
+            for proposal_id, status in self.interference.pop(0).items():
+                self.rows[proposal_id] = (status, self.rows[proposal_id][1] + 1)
+        swapped = set()
+        for proposal_id, version in expected.items():
+            if self.rows[proposal_id][1] == version:
+                self.rows[proposal_id] = (target, version + 1)
+                swapped.add(proposal_id)
+        return swapped
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(rows):
+        store = FakeProposals(rows)
+        store.recorded = []
+        monkeypatch.setattr(proposal_status, "_read", store.read)
+        monkeypatch.setattr(proposal_status, "_swap", store.swap)
+        monkeypatch.setattr(
+            proposal_status, "_record", lambda db, transitions, *args: store.recorded.extend(transitions)
+        )
+        monkeypatch.setattr(proposal_status, "RETRY_BACKOFF_SECONDS", 0)
+        return store
+    return install
+
+
+@pytest.mark.asyncio
+async def test_bulk_transition_succeeds(fake):
+    store = fake({1: (S.DRAFT, 0), 2: (S.DRAFT, 3)})
+    result = await proposal_status.bulk_transition(None, [1, 2, 1], S.SUBMITTED)
+    assert sorted(result.transitioned) == [(1, S.DRAFT, S.SUBMITTED, 1), (2, S.DRAFT, S.SUBMITTED, 4)]
+    assert result.invalid == {} and result.stale == []
+    assert store.recorded == result.transitioned
+    assert store.rows == {1: (S.SUBMITTED, 1), 2: (S.SUBMITTED, 4)}
+
+
+@pytest.mark.asyncio
+async def test_invalid_and_missing_are_not_swapped(fake):
+    store = fake({1: (S.ACCEPTED, 5), 2: (S.DRAFT, 0)})
+    result = await proposal_status.bulk_transition(None, [1, 2, 9], S.SUBMITTED)
+    assert result.invalid == {1: S.ACCEPTED, 9: None}
+    assert [t.proposal_id for t in result.transitioned] == [2]
+    assert store.rows[1] == (S.ACCEPTED, 5)
+
+
+@pytest.mark.asyncio
+async def test_expected_version_mismatch_is_stale(fake):
+    store = fake({1: (S.EVALUATED, 2)})
+    result = await proposal_status.bulk_transition(None, [1], S.ACCEPTED, expected_versions={1: 1})
+    assert result.stale == [1]
+    assert result.transitioned == []
+    assert store.swaps == 0
+
+
+@pytest.mark.asyncio
+async def test_conflict_is_retried_with_fresh_version(fake):
+    store = fake({1: (S.EVALUATED, 0)})
+    # 他の遷移で version だけ進んだ（ステータスは遷移可能なまま）
+    store.interference.append({1: S.EVALUATED})
+    result = await proposal_status.bulk_transition(None, [1], S.UNDER_REVIEW)
+    assert result.transitioned == [(1, S.EVALUATED, S.UNDER_REVIEW, 2)]
+    assert store.swaps == 2
+
+
+@pytest.mark.asyncio
+async def test_conflict_reread_detects_invalid(fake):
+    store = fake({1: (S.DRAFT, 0)})
+    # 他のワーカーが先に提出した
+    store.interference.append({1: S.SUBMITTED})
+    result = await proposal_status.bulk_transition(None, [1], S.SUBMITTED)
+    assert result.invalid == {1: S.SUBMITTED}
+    assert result.transitioned == [] and result.stale == []
+    assert store.rows[1] == (S.SUBMITTED, 1)
+
+
+@pytest.mark.asyncio
+async def test_conflict_after_expected_version_is_stale(fake):
+    store = fake({1: (S.EVALUATED, 0)})
+    store.interference.append({1: S.EVALUATED})
+    result = await proposal_status.bulk_transition(None, [1], S.ACCEPTED, expected_versions={1: 0})
+    assert result.stale == [1]
+    assert store.swaps == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted_is_stale(fake):
+    store = fake({1: (S.EVALUATED, 0)})
+    store.interference.extend({1: S.EVALUATED} for _ in range(3))
+    result = await proposal_status.bulk_transition(None, [1], S.ACCEPTED, retries=2)
+    assert result.stale == [1]
+    assert result.transitioned == []
+    assert store.swaps == 3
+    assert store.recorded == []
+
+
+@pytest.mark.asyncio
+async def test_transition_raises(fake):
+    fake({1: (S.ACCEPTED, 4), 2: (S.EVALUATED, 1)})
+    with pytest.raises(InvalidTransition) as e:
+        await proposal_status.transition(None, Proposal(id=1, status=S.ACCEPTED, version=4), S.REJECTED)
+    assert e.value.current == S.ACCEPTED
+    with pytest.raises(StaleProposal):
+        await proposal_status.transition(
+            None, Proposal(id=2, status=S.EVALUATED, version=1), S.ACCEPTED, expected_version=0,
+        )
+
+
+# ============ 並行実行（DB） ============
+
+PATH = [S.DRAFT, S.SUBMITTED, S.ANALYZING, S.EVALUATED, S.UNDER_REVIEW, S.ACCEPTED]
+NEXT = dict(zip(PATH, PATH[1:]))
+
+
+async def _race_worker(maker, ids: List[int], succeeded: Counter, deadline: float, rng: random.Random) -> None:
+    # 開始時点の状態を持ち続け、他のワーカーの遷移は失敗してから知る
+    view = {proposal_id: S.DRAFT for proposal_id in ids}
+    while view and time.monotonic() < deadline:
+        target = rng.choice(sorted({NEXT[status] for status in view.values()}, key=PATH.index))
+        candidates = [proposal_id for proposal_id, status in view.items() if NEXT[status] == target]
+        batch = rng.sample(candidates, min(10, len(candidates)))
+        async with maker() as db:
+            result = await proposal_status.bulk_transition(db, batch, target)
+            await db.commit()
+        for t in result.transitioned:
+            succeeded[t.proposal_id] += 1
+            view[t.proposal_id] = t.to_status
+        for proposal_id, current in result.invalid.items():
+            view[proposal_id] = current
+        for proposal_id in batch:
+            if view[proposal_id] not in NEXT:
+                del view[proposal_id]
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_parallel_bulk_transitions_do_not_lose_updates(db_engine, no_background_refresh):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with maker() as db:
+        organization, user = await create_supplier(db, "transition race")
+        ids = list((await db.scalars(
+            insert(Proposal).returning(Proposal.id),
+            [
+                {"title": f"race {i}", "status": S.DRAFT,
+                 "supplier_org_id": organization.id, "supplier_user_id": user.id}
+                for i in range(100)
+            ],
+        )).all())
+        await db.commit()
+
+    succeeded: Counter = Counter()
+    try:
+        deadline = time.monotonic() + 60
+        await asyncio.gather(*(
+            _race_worker(maker, ids, succeeded, deadline, random.Random(seed)) for seed in range(6)
+        ))
+
+        async with maker() as db:
+            versions = dict((await db.execute(
+                select(Proposal.id, Proposal.version).where(Proposal.id.in_(ids))
+            )).all())
+            history = (await db.execute(
+                select(ProposalProgress.proposal_id, ProposalProgress.status)
+                .where(ProposalProgress.proposal_id.in_(ids))
+            )).all()
+        statuses: Dict[int, list] = {proposal_id: [] for proposal_id in ids}
+        for proposal_id, status in history:
+            statuses[proposal_id].append(status)
+
+        for proposal_id in ids:
+            assert versions[proposal_id] == len(PATH) - 1
+            assert succeeded[proposal_id] == versions[proposal_id]
+            assert sorted(statuses[proposal_id], key=PATH.index) == PATH[1:]
+    finally:
+        async with maker() as db:
+            await db.execute(delete(OutboxEvent).where(
+                OutboxEvent.topic == outbox.PROPOSAL_STATUS_CHANGED,
+                OutboxEvent.key.in_([str(proposal_id) for proposal_id in ids]),
+            ))
+            await db.execute(delete(ProposalProgress).where(ProposalProgress.proposal_id.in_(ids)))
+            await db.execute(delete(Proposal).where(Proposal.id.in_(ids)))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.execute(delete(Organization).where(Organization.id == organization.id))
+            await db.commit()
@@ -0,0 +1,96 @@
+"""
+Q&Aラウンドの回答
+回答でラウンドが回答済みになり期限のジョブが取り消されること、回答済み・期限切れの
+ラウンドには回答できないことを確認する。
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.qa import QASession, QASessionStatus
+from app.models.proposal import Proposal, ProposalStatus
+from app.services import qa_rounds
+from tests.conftest import create_supplier, requires_db
+
+QUESTIONS = [{"key": "min_lot", "question": "最小ロットを教えてください"}]
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """コミット後のスケジューラへの登録・取り消し（Redis へは送らない）"""
+    calls = []
+
+    async def record(schedule, cancel):
+        calls.append((schedule, cancel))
+
+    monkeypatch.setattr(qa_rounds, "_apply", record)
+    return calls
+
+
+async def _settle():
+    """コミット後に作成された登録・取り消しのタスクを待つ"""
+    await asyncio.gather(*qa_rounds._background_tasks)
+
+
+async def _open(db):
+    organization, user = await create_supplier(db, "qa")
+    proposal = Proposal(
+        title="qa", status=ProposalStatus.SUBMITTED,
+        supplier_org_id=organization.id, supplier_user_id=user.id,
+    )
+    db.add(proposal)
+    await db.flush()
+    return await qa_rounds.open_round(db, proposal.id, QUESTIONS)
+
+
+def test_deadline_jobs():
+    due_at = datetime(2026, 1, 10, 0, 0, tzinfo=timezone.utc)
+    jobs = qa_rounds.deadline_jobs(7, due_at, None)
+    assert jobs == [
+        (qa_rounds.EXPIRE_KIND, 7, due_at.timestamp()),
+        (qa_rounds.REMIND_KIND, 7, (due_at - timedelta(hours=24)).timestamp()),
+    ]
+    assert qa_rounds.deadline_jobs(7, due_at, 3) == [(qa_rounds.EXPIRE_KIND, 7, due_at.timestamp())]
+
+
+def test_deadline_is_shown_in_jst():
+    due_at = datetime(2026, 1, 9, 15, 30, tzinfo=timezone.utc)
+    assert qa_rounds.format_deadline(due_at) == "2026-01-10 00:30（日本時間）"
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_answer_round(db, applied):
+    qa_round = await _open(db)
+    await _settle()
+    assert qa_round.round_number == 1
+    assert [kind for kind, _, _ in applied[-1][0]] == [qa_rounds.EXPIRE_KIND, qa_rounds.REMIND_KIND]
+
+    answered = await qa_rounds.answer_round(db, qa_round, {"min_lot": 500})
+    await _settle()
+    assert answered.status == QASessionStatus.ANSWERED
+    assert answered.answers == {"min_lot": 500}
+    assert answered.closed_at is not None
+    assert applied[-1] == ([], [(qa_rounds.EXPIRE_KIND, qa_round.id), (qa_rounds.REMIND_KIND, qa_round.id)])
+
+    with pytest.raises(qa_rounds.RoundClosed) as e:
+        await qa_rounds.answer_round(db, qa_round, {"min_lot": 100})
+    assert e.value.status == QASessionStatus.ANSWERED
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_answer_after_deadline_is_rejected(db, applied):
+    qa_round = await _open(db)
+    # 期限切れのジョブが実行される前に回答が届いた
+    await db.execute(
+        update(QASession).where(QASession.id == qa_round.id)
+        .values(due_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    with pytest.raises(qa_rounds.RoundClosed) as e:
+        await qa_rounds.answer_round(db, qa_round, {"min_lot": 500})
+    assert e.value.status == QASessionStatus.EXPIRED
+    assert qa_round.status == QASessionStatus.OPEN
+    assert qa_round.answers is None
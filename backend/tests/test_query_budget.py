@@ -0,0 +1,117 @@
+"""
+SQLクエリ予算
+インメモリのSQLiteエンジンに計測フックを登録し、raise モードで予算の超過が例外になること、
+入れ子の予算・デコレータでも文数が数えられることを確認する。
+"""
+import json
+import logging
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.config import settings
+from app.monitoring import query_budget as qb
+from app.monitoring.query_budget import QueryBudget, QueryBudgetExceeded, fingerprint
+
+
+@pytest_asyncio.fixture
+async def engine(monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    qb.instrument_engine(engine)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+async def _select(engine, times: int) -> None:
+    async with engine.connect() as conn:
+        for i in range(times):
+            await conn.execute(text(f"SELECT {i}"))
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id IN ($1, $2, $3) AND name = 'x'") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    )
+    assert fingerprint("SELECT 1 -- comment\n  FROM t") == "SELECT ? FROM t"
+
+
+@pytest.mark.asyncio
+async def test_within_budget(engine):
+    async with qb.query_budget(3, name="within") as budget:
+        await _select(engine, 3)
+    assert budget.count == 3
+
+
+@pytest.mark.asyncio
+async def test_exceeded_raises(engine):
+    with pytest.raises(QueryBudgetExceeded) as e:
+        async with qb.query_budget(2, name="exceeded"):
+            await _select(engine, 3)
+    detail = json.loads(str(e.value))
+    assert detail["budget"] == "exceeded"
+    assert detail["limit"] == 2 and detail["count"] == 3
+    assert detail["fingerprints"] == [{"sql": "SELECT ?", "count": 3}]
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_is_counted(engine):
+    async with qb.query_budget(5) as budget:
+        with pytest.raises(Exception):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT * FROM missing_table"))
+    assert budget.count == 1
+
+
+@pytest.mark.asyncio
+async def test_nested_budget_counts_to_parent(engine):
+    with pytest.raises(QueryBudgetExceeded) as e:
+        async with qb.query_budget(2, name="outer") as outer:
+            async with qb.query_budget(2, name="inner") as inner:
+                await _select(engine, 2)
+            await _select(engine, 1)
+    assert inner.count == 2 and outer.count == 3
+    assert json.loads(str(e.value))["budget"] == "outer"
+
+
+@pytest.mark.asyncio
+async def test_decorator(engine):
+    @qb.query_budget(1)
+    async def handler():
+        await _select(engine, 2)
+
+    with pytest.raises(QueryBudgetExceeded) as e:
+        await handler()
+    assert json.loads(str(e.value))["budget"].endswith("handler")
+
+
+@pytest.mark.asyncio
+async def test_body_exception_takes_precedence(engine):
+    with pytest.raises(ValueError):
+        async with qb.query_budget(0):
+            await _select(engine, 1)
+            raise ValueError
+
+
+def test_warn_mode_logs(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "warn")
+    budget = QueryBudget(1, name="warn")
+    with caplog.at_level(logging.WARNING, logger=qb.__name__):
+        with budget:
+            budget.record("SELECT 1")
+            budget.record("SELECT 2")
+    assert json.loads(caplog.records[-1].getMessage())["count"] == 2
+
+
+def test_off_mode_is_noop(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "off")
+
+    async def handler():
+        pass
+
+    assert qb.query_budget(0)(handler) is handler
@@ -0,0 +1,30 @@
+"""
+起動時のインポート
+重い依存ライブラリ（LLM・資料解析・ストレージ・プロファイラ）は初回利用時に読み込む
+（app/utils/lazy.py）。アプリの読み込みだけでこれらがインポートされないことを確認する。
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = (
+    "openai", "langchain", "langchain_openai",
+    "pypdf", "pptx", "docx",
+    "minio", "pyinstrument",
+)
+
+# 別プロセスで読み込み、読み込まれた重いモジュールを返す（テストの他の import の影響を受けない）
+IMPORT_SNIPPET = (
+    "import json, sys; import app.main; "
+    f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+)
+
+
+def test_importing_app_does_not_load_heavy_modules():
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, text=True,
+    )
+    assert json.loads(output.strip().splitlines()[-1]) == []
@@ -0,0 +1,27 @@
+"""
+要約のストリーミング（SSE）
+クライアントが途中で切断した場合に、要約生成のストリームがその場で閉じられることを確認する。
+"""
+import pytest
+
+from app.api.v1 import summaries
+from app.services import summarizer
+
+
+@pytest.mark.asyncio
+async def test_summary_stream_closes_generation_on_disconnect(monkeypatch):
+    closed = []
+
+    async def stream_summary(summary_plan, use_cache=True):
+        try:
+            yield "progress", {"done": 0, "total": 1}
+            yield "token", "{"
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(summarizer, "stream_summary", stream_summary)
+    stream = summaries._summary_stream(1, None, force=False)
+    assert (await stream.__anext__()).startswith("event: progress")
+    # StreamingResponse は切断時にジェネレータを閉じる
+    await stream.aclose()
+    assert closed == [True]
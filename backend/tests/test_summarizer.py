@@ -0,0 +1,90 @@
+"""
+要約の保存
+別のトランザクションが同じ提案の評価を作成中でも一意制約（evaluations.proposal_id）で失敗せず、
+評価が1件に保たれることを確認する。
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.models.evaluation import Evaluation
+from app.models.organization import Organization
+from app.models.proposal import Proposal, ProposalStatus
+from app.models.user import User
+from app.services import summarizer
+from app.services.summarizer import SummaryResult
+from tests.conftest import create_supplier, requires_db
+
+
+def _result(summary: str) -> SummaryResult:
+    report = {
+        "three_line_summary": summary,
+        "key_points": ["要点"],
+        "strengths": ["強み"],
+        "concerns": [],
+        "confirmation_items": [],
+    }
+    return SummaryResult(report=report, root_key=summary.ljust(64, "0")[:64], llm_calls=1, cache_hits=0)
+
+
+async def _create_proposal(db):
+    organization, user = await create_supplier(db, "summary")
+    proposal = Proposal(
+        title="summary", status=ProposalStatus.SUBMITTED,
+        supplier_org_id=organization.id, supplier_user_id=user.id,
+    )
+    db.add(proposal)
+    await db.flush()
+    return organization, user, proposal
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_save_report_updates_loaded_evaluation(db):
+    _, _, proposal = await _create_proposal(db)
+    first = await summarizer.save_report(db, proposal.id, _result("first"))
+    loaded = await summarizer.get_evaluation(db, proposal.id)
+    assert loaded is first
+
+    second = await summarizer.save_report(db, proposal.id, _result("second"))
+    assert second is first
+    assert first.summary == "second"
+    assert first.summary_hash == _result("second").root_key
+    assert await db.scalar(select(func.count()).where(Evaluation.proposal_id == proposal.id)) == 1
+
+
+@requires_db
+@pytest.mark.asyncio
+async def test_save_report_while_another_creates_evaluation(db_engine, no_background_refresh):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    maker = async_sessionmaker(db_engine, expire_on_commit=False)
+    async with maker() as db:
+        organization, user, proposal = await _create_proposal(db)
+        await db.commit()
+
+    async def save(summary: str) -> Evaluation:
+        async with maker() as db:
+            return await summarizer.save_report(db, proposal.id, _result(summary))
+
+    try:
+        async with maker() as other:
+            # 別のトランザクションが同じ提案の評価を作成中（未コミット）に保存を始める
+            other.add(Evaluation(proposal_id=proposal.id, summary="other"))
+            await other.flush()
+            saving = asyncio.create_task(save("mine"))
+            await asyncio.sleep(0.3)
+            await other.commit()
+        evaluation = await saving
+        assert evaluation.summary == "mine"
+        async with maker() as db:
+            rows = (await db.scalars(select(Evaluation).where(Evaluation.proposal_id == proposal.id))).all()
+        assert [row.summary for row in rows] == ["mine"]
+    finally:
+        async with maker() as db:
+            await db.execute(delete(Evaluation).where(Evaluation.proposal_id == proposal.id))
+            await db.execute(delete(Proposal).where(Proposal.id == proposal.id))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.execute(delete(Organization).where(Organization.id == organization.id))
+            await db.commit()